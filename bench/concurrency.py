@@ -0,0 +1,150 @@
+"""
+Замер отзывчивости event loop при одновременной работе N пользователей.
+
+Каждый «пользователь» в цикле добавляет расход и запрашивает список,
+параллельно фоновая задача периодически сбрасывает книгу на диск.
+Отдельный «пульс» каждые 10 мс проверяет, насколько event loop опаздывает —
+это время, на которое зависают апдейты остальных пользователей.
+
+Запуск:
+    python -m bench.concurrency --users 1 10 50 --rows 2000 --months 12
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Данные бенчмарка живут во временной папке, а не в data/ бота
+os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="expense-bench-")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from openpyxl import Workbook  # noqa: E402
+
+from config import CATEGORIES  # noqa: E402
+from repository import excel_repo  # noqa: E402
+from services import expense_service, async_expense_service  # noqa: E402
+
+TICK = 0.01
+
+
+def generate_workbook(path: Path, months: int, rows: int) -> None:
+    """Создаёт книгу с months листами по rows записей в каждом."""
+    wb = Workbook()
+    wb.remove(wb.active)
+    for month_idx in range(months):
+        year, month = 2020 + month_idx // 12, month_idx % 12 + 1
+        ws = wb.create_sheet(title=f"{year}_{month:02d}")
+        ws.append(excel_repo.HEADER_ROW)
+        for row_id in range(1, rows + 1):
+            ws.append([
+                row_id,
+                f"{row_id % 28 + 1:02d}.{month:02d}.{year}",
+                CATEGORIES[row_id % len(CATEGORIES)],
+                round(100 + row_id * 1.5, 2),
+                f"Комментарий {row_id}",
+            ])
+    wb.save(path)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Перцентиль по отсортированной выборке."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def _heartbeat(lags: list[float], stop: asyncio.Event) -> None:
+    """Измеряет опоздание event loop относительно ожидаемого тика."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - started - TICK)
+
+
+async def _user_sync(ops: int, latencies: list[float]) -> None:
+    """Пользователь, который вызывает синхронный сервис прямо в event loop."""
+    for _ in range(ops):
+        started = time.perf_counter()
+        expense_service.add_expense(CATEGORIES[0], 100.0, "bench")
+        expense_service.get_all_expenses()
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(0)
+
+
+async def _user_async(ops: int, latencies: list[float]) -> None:
+    """Пользователь, который работает через асинхронный сервис."""
+    for _ in range(ops):
+        started = time.perf_counter()
+        await async_expense_service.add_expense(CATEGORIES[0], 100.0, "bench")
+        await async_expense_service.get_all_expenses()
+        latencies.append(time.perf_counter() - started)
+
+
+async def _flusher(mode: str, interval: float, stop: asyncio.Event) -> None:
+    """Фоновая запись книги, как в main.flush_periodically."""
+    while not stop.is_set():
+        await asyncio.sleep(interval)
+        if mode == "sync":
+            expense_service.flush_storage()
+        else:
+            await async_expense_service.flush_storage()
+
+
+async def run_scenario(mode: str, users: int, ops: int, flush_interval: float) -> dict:
+    """Запускает users пользователей по ops операций и собирает метрики."""
+    latencies: list[float] = []
+    lags: list[float] = []
+    stop = asyncio.Event()
+
+    heartbeat = asyncio.create_task(_heartbeat(lags, stop))
+    flusher = asyncio.create_task(_flusher(mode, flush_interval, stop))
+
+    user = _user_sync if mode == "sync" else _user_async
+    started = time.perf_counter()
+    await asyncio.gather(*(user(ops, latencies) for _ in range(users)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await asyncio.gather(heartbeat, flusher)
+
+    return {
+        "mode": mode,
+        "users": users,
+        "ops_per_sec": users * ops / elapsed,
+        "op_p50_ms": statistics.median(latencies) * 1000,
+        "op_p95_ms": percentile(latencies, 0.95) * 1000,
+        "loop_lag_p95_ms": percentile(lags, 0.95) * 1000 if lags else 0.0,
+        "loop_lag_max_ms": max(lags) * 1000 if lags else 0.0,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--ops", type=int, default=20, help="операций на пользователя")
+    parser.add_argument("--rows", type=int, default=2000, help="записей на лист")
+    parser.add_argument("--months", type=int, default=12, help="листов в книге")
+    parser.add_argument("--flush-interval", type=float, default=0.2)
+    args = parser.parse_args()
+
+    generate_workbook(excel_repo.EXPENSES_FILE, args.months, args.rows)
+    await async_expense_service.load_storage()
+
+    print(f"{'mode':<6} {'users':>5} {'ops/s':>8} {'op p50':>9} {'op p95':>9} {'lag p95':>9} {'lag max':>9}")
+    for users in args.users:
+        for mode in ("sync", "async"):
+            r = await run_scenario(mode, users, args.ops, args.flush_interval)
+            print(
+                f"{r['mode']:<6} {r['users']:>5} {r['ops_per_sec']:>8.1f} "
+                f"{r['op_p50_ms']:>7.1f}ms {r['op_p95_ms']:>7.1f}ms "
+                f"{r['loop_lag_p95_ms']:>7.1f}ms {r['loop_lag_max_ms']:>7.1f}ms"
+            )
+
+    await async_expense_service.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+"""
+Генератор синтетических книг expenses.xlsx для бенчмарков.
+
+Строки распределяются по months листам, последний лист — текущий месяц
+(в него пишет add_expense). Записи похожи на настоящие: категории из
+config.CATEGORIES с неравными долями, суммы с длинным хвостом, даты по
+возрастанию внутри месяца, часть комментариев пустая, в ID есть пропуски
+от удалённых записей. Генерация детерминирована (seed).
+
+Запуск:
+    python -m bench.generator --rows 200000 --months 60 --out /tmp/expenses.xlsx
+"""
+import argparse
+import calendar
+import random
+import sys
+from datetime import date
+from pathlib import Path
+from typing import Iterator
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import CATEGORIES  # noqa: E402
+from repository.xlsx_export import write_workbook  # noqa: E402
+
+# Относительная частота категорий (по порядку CATEGORIES): мелких расходов больше, чем зарплат
+CATEGORY_WEIGHTS: list[float] = [1, 3, 8, 5, 4, 2]
+
+COMMENTS: list[str] = [
+    "", "", "", "закупка коробок", "аренда склада", "доставка СДЭК", "реклама ВКонтакте",
+    "упаковочная плёнка", "оплата поставщику", "канцелярия", "такси", "фотосессия товара",
+]
+
+# Доля удалённых записей: их ID пропускаются, как после /delete
+DELETED_SHARE = 0.03
+
+
+def month_keys(months: int, last: date | None = None) -> list[tuple[int, int]]:
+    """(год, месяц) для months месяцев подряд, заканчивая месяцем last (по умолчанию текущим)."""
+    last = last or date.today()
+    index = last.year * 12 + last.month - 1
+    return [(i // 12, i % 12 + 1) for i in range(index - months + 1, index + 1)]
+
+
+def _month_rows(rng: random.Random, year: int, month: int, rows: int) -> Iterator[list]:
+    """Строки одного листа: ID с пропусками, даты по возрастанию."""
+    days = calendar.monthrange(year, month)[1]
+    day_of = sorted(rng.randint(1, days) for _ in range(rows))
+    expense_id = 0
+    for i in range(rows):
+        expense_id += 1
+        while rng.random() < DELETED_SHARE:
+            expense_id += 1
+        category = rng.choices(CATEGORIES, weights=CATEGORY_WEIGHTS[:len(CATEGORIES)])[0]
+        amount = round(min(rng.lognormvariate(7, 1.2), 500_000), 2)
+        yield [expense_id, date(year, month, day_of[i]), category, amount, rng.choice(COMMENTS)]
+
+
+def generate(path: Path, rows: int, months: int, seed: int = 0) -> Path:
+    """Записывает книгу из rows записей, равномерно разложенных по months листам."""
+    rng = random.Random(seed)
+    per_month, extra = divmod(rows, months)
+    sheets = (
+        (f"{year}_{month:02d}", _month_rows(rng, year, month, per_month + (i < extra)))
+        for i, (year, month) in enumerate(month_keys(months))
+    )
+    return write_workbook(path, sheets)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000, help="записей всего")
+    parser.add_argument("--months", type=int, default=12, help="листов месяцев")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=Path, required=True)
+    args = parser.parse_args()
+
+    generate(args.out, args.rows, args.months, args.seed)
+    print(f"{args.out}: {args.rows} записей, {args.months} листов, {args.out.stat().st_size / 1024:.0f} КБ")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Пропускная способность записи при N одновременных писателях.
+
+Сравниваются два режима:
+  single — каждое изменение фиксируется отдельно (свой fsync журнала / свой commit);
+  group  — изменения идут через WriteCoordinator и фиксируются пачками.
+
+Запуск:
+    python -m bench.group_commit --writers 10 50 100 --ops 20 --backend excel
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Данные бенчмарка живут во временной папке, а не в data/ бота
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="expense-bench-"))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench.concurrency import generate_workbook, percentile  # noqa: E402
+from config import CATEGORIES  # noqa: E402
+from repository import excel_repo, sqlite_repo  # noqa: E402
+from services import expense_service, async_expense_service  # noqa: E402
+
+
+async def _writer_single(ops: int, latencies: list[float]) -> None:
+    """Писатель, у которого каждое изменение — отдельная фиксация в потоке-писателе."""
+    for _ in range(ops):
+        started = time.perf_counter()
+        await async_expense_service._run_write(expense_service.add_expense, CATEGORIES[0], 100.0, "bench")
+        latencies.append(time.perf_counter() - started)
+
+
+async def _writer_group(ops: int, latencies: list[float]) -> None:
+    """Писатель, изменения которого проходят через групповую фиксацию."""
+    for _ in range(ops):
+        started = time.perf_counter()
+        await async_expense_service.add_expense(CATEGORIES[0], 100.0, "bench")
+        latencies.append(time.perf_counter() - started)
+
+
+async def run_scenario(mode: str, writers: int, ops: int) -> dict:
+    """Запускает writers писателей по ops изменений и собирает метрики."""
+    latencies: list[float] = []
+    writer = _writer_single if mode == "single" else _writer_group
+
+    started = time.perf_counter()
+    await asyncio.gather(*(writer(ops, latencies) for _ in range(writers)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "mode": mode,
+        "writers": writers,
+        "ops_per_sec": writers * ops / elapsed,
+        "op_p50_ms": statistics.median(latencies) * 1000,
+        "op_p95_ms": percentile(latencies, 0.95) * 1000,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, nargs="+", default=[10, 50, 100])
+    parser.add_argument("--ops", type=int, default=20, help="изменений на писателя")
+    parser.add_argument("--rows", type=int, default=2000, help="записей на лист")
+    parser.add_argument("--months", type=int, default=12, help="листов в книге")
+    parser.add_argument("--backend", choices=("excel", "sqlite"), default="excel")
+    args = parser.parse_args()
+
+    if args.backend == "excel":
+        generate_workbook(excel_repo.EXPENSES_FILE, args.months, args.rows)
+    else:
+        expense_service.repo = sqlite_repo
+    await async_expense_service.load_storage()
+
+    print(f"{'mode':<6} {'writers':>7} {'ops/s':>9} {'op p50':>9} {'op p95':>9}")
+    for writers in args.writers:
+        for mode in ("single", "group"):
+            r = await run_scenario(mode, writers, args.ops)
+            print(
+                f"{r['mode']:<6} {r['writers']:>7} {r['ops_per_sec']:>9.1f} "
+                f"{r['op_p50_ms']:>7.1f}ms {r['op_p95_ms']:>7.1f}ms"
+            )
+
+    await async_expense_service.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,251 @@
+"""
+Как excel_repo деградирует с ростом expenses.xlsx.
+
+Для каждого размера (записей × листов) генерируется синтетическая книга
+(bench/generator.py), и в отдельном процессе замеряются:
+  load            — загрузка книги в память (load_workbook, агрегаты, журнал);
+  _get_next_id, add_expense, get_all_expenses, update_expense_*, delete_expense
+                  — задержка каждой операции (p50/p95/среднее) на листе текущего месяца;
+  flush           — перенос журнала в xlsx (перезапись книги целиком);
+а также пиковый RSS процесса и байты, записанные на диск при операциях и при flush.
+
+Результаты сохраняются в JSON. С --baseline каждый показатель сравнивается
+с сохранённым прогоном: рост больше --threshold помечается как регрессия,
+и скрипт завершается с кодом 1.
+
+Запуск:
+    python -m bench.repository --sizes 1000x1 10000x12 50000x24 200000x60 --output bench.json
+    python -m bench.repository --sizes 1000x1 10000x12 --baseline bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Операции, задержка которых замеряется на каждом размере книги
+OPERATIONS: list[str] = [
+    "_get_next_id", "add_expense", "get_all_expenses",
+    "update_expense_category", "update_expense_amount", "update_expense_comment",
+    "delete_expense",
+]
+
+# Показатели для сравнения с базовым прогоном (чем больше, тем хуже)
+COMPARED_FIELDS: list[str] = ["load_s", "flush_s", "peak_rss_mb"]
+
+# Абсолютный рост по единице измерения, меньше которого разница считается шумом:
+# у операций в доли миллисекунды относительный порог срабатывает на случайных колебаниях
+NOISE_FLOOR: dict[str, float] = {"_ms": 0.5, "_s": 0.05, "_mb": 5.0}
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Перцентиль по отсортированной выборке."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def _written_bytes() -> int | None:
+    """Сколько байт процесс передал в write() — из /proc/self/io (только Linux)."""
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _peak_rss_mb() -> float:
+    """Пиковый RSS процесса в МБ."""
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux отдаёт килобайты, macOS — байты
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _time_calls(func: Callable[[int], object], count: int) -> dict:
+    """Вызывает func(i) count раз и возвращает статистику задержек в миллисекундах."""
+    latencies = []
+    for i in range(count):
+        started = time.perf_counter()
+        func(i)
+        latencies.append(time.perf_counter() - started)
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+    }
+
+
+def run_case(rows: int, months: int, ops: int, seed: int) -> dict:
+    """
+    Замер одного размера книги. Вызывается в отдельном процессе (--run-case):
+    DATA_DIR и JOURNAL_MAX_ENTRIES задаются до импорта репозитория, а пиковый RSS
+    относится только к этому размеру.
+    """
+    from bench.generator import generate
+    from config import CATEGORIES
+    from repository import excel_repo
+
+    generate(excel_repo.EXPENSES_FILE, rows, months, seed)
+    file_bytes = excel_repo.EXPENSES_FILE.stat().st_size
+
+    started = time.perf_counter()
+    excel_repo.load()
+    load_s = time.perf_counter() - started
+
+    month = excel_repo.get_current_month()
+    rng = random.Random(seed)
+    # Существующие ID листа: обновляются и удаляются случайные записи, а не только последние
+    existing = [expense["id"] for expense in excel_repo.iter_expenses(month)]
+    rng.shuffle(existing)
+    targets = existing[:ops]
+
+    def pick(i: int) -> int:
+        return targets[i % len(targets)] if targets else i + 1
+
+    calls: dict[str, Callable[[int], object]] = {
+        "_get_next_id": lambda i: excel_repo._get_next_id(month),
+        "add_expense": lambda i: excel_repo.add_expense(CATEGORIES[i % len(CATEGORIES)], 100.0 + i, "bench"),
+        "get_all_expenses": lambda i: excel_repo.get_all_expenses(month),
+        "update_expense_category": lambda i: excel_repo.update_expense_category(pick(i), CATEGORIES[0], month),
+        "update_expense_amount": lambda i: excel_repo.update_expense_amount(pick(i), 1.0 + i, month),
+        "update_expense_comment": lambda i: excel_repo.update_expense_comment(pick(i), f"bench {i}", month),
+        "delete_expense": lambda i: excel_repo.delete_expense(pick(i), month),
+    }
+
+    written_before = _written_bytes()
+    operations = {name: _time_calls(calls[name], ops) for name in OPERATIONS}
+    written_ops = _written_bytes()
+
+    started = time.perf_counter()
+    excel_repo.flush()
+    flush_s = time.perf_counter() - started
+    written_flush = _written_bytes()
+
+    return {
+        "rows": rows,
+        "months": months,
+        "ops": ops,
+        "file_bytes": file_bytes,
+        "load_s": load_s,
+        "flush_s": flush_s,
+        "peak_rss_mb": _peak_rss_mb(),
+        "bytes_written": {
+            "ops": written_ops - written_before if written_before is not None else None,
+            "flush": written_flush - written_ops if written_ops is not None else None,
+        },
+        "operations": operations,
+    }
+
+
+def _run_case_subprocess(rows: int, months: int, ops: int, seed: int) -> dict:
+    """Запускает замер одного размера в чистом процессе с собственной временной DATA_DIR."""
+    env = dict(
+        os.environ,
+        DATA_DIR=tempfile.mkdtemp(prefix="expense-bench-"),
+        # Журнал не переносится в xlsx посреди замера — flush меряется отдельно
+        JOURNAL_MAX_ENTRIES=str(10 ** 9),
+    )
+    result = subprocess.run(
+        [sys.executable, "-m", "bench.repository", "--run-case", f"{rows}x{months}",
+         "--ops", str(ops), "--seed", str(seed)],
+        cwd=Path(__file__).resolve().parent.parent, env=env, check=True, capture_output=True, text=True,
+    )
+    return json.loads(result.stdout)
+
+
+def _case_metrics(case: dict) -> dict[str, float]:
+    """Плоский набор сравниваемых показателей одного размера."""
+    flat = {field: case[field] for field in COMPARED_FIELDS}
+    for name, stats in case["operations"].items():
+        flat[f"{name}.p50_ms"] = stats["p50_ms"]
+    return flat
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Сравнивает прогон с базовым по совпадающим размерам. Возвращает описания регрессий."""
+    baseline_cases = {(c["rows"], c["months"]): c for c in baseline["cases"]}
+    regressions = []
+    for case in results["cases"]:
+        base = baseline_cases.get((case["rows"], case["months"]))
+        if base is None:
+            continue
+        base_metrics = _case_metrics(base)
+        for name, value in _case_metrics(case).items():
+            before = base_metrics.get(name)
+            floor = next(delta for suffix, delta in NOISE_FLOOR.items() if name.endswith(suffix))
+            if before and value > before * (1 + threshold) and value - before > floor:
+                regressions.append(
+                    f"{case['rows']}x{case['months']} {name}: {before:.3f} → {value:.3f} (+{(value / before - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+def _parse_size(text: str) -> tuple[int, int]:
+    rows, _, months = text.partition("x")
+    return int(rows), int(months or 1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", default=["1000x1", "10000x12", "50000x24", "200000x60"],
+                        help="размеры книги: ЗАПИСЕЙxЛИСТОВ")
+    parser.add_argument("--ops", type=int, default=100, help="вызовов каждой операции")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="куда сохранить результаты (JSON)")
+    parser.add_argument("--baseline", type=Path, help="базовый прогон для поиска регрессий (JSON)")
+    parser.add_argument("--threshold", type=float, default=0.2, help="допустимый рост показателя (0.2 = +20%%)")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        print(json.dumps(run_case(*_parse_size(args.run_case), args.ops, args.seed)))
+        return
+
+    results = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cases": [],
+    }
+
+    print(f"{'size':>10} {'file':>8} {'load':>8} {'flush':>8} {'rss':>7}  " + " ".join(f"{op[:12]:>12}" for op in OPERATIONS))
+    for size in args.sizes:
+        rows, months = _parse_size(size)
+        case = _run_case_subprocess(rows, months, args.ops, args.seed)
+        results["cases"].append(case)
+        print(
+            f"{size:>10} {case['file_bytes'] / 1024 / 1024:>6.1f}MB {case['load_s']:>7.2f}s {case['flush_s']:>7.2f}s "
+            f"{case['peak_rss_mb']:>5.0f}MB  "
+            + " ".join(f"{case['operations'][op]['p50_ms']:>10.3f}ms" for op in OPERATIONS)
+        )
+
+    if args.output:
+        args.output.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"Результаты сохранены в {args.output}")
+
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text(encoding="utf-8")), args.threshold)
+        if regressions:
+            print(f"\n⚠️ Регрессии относительно {args.baseline} (порог +{args.threshold * 100:.0f}%):")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nРегрессий относительно {args.baseline} нет.")
+
+
+if __name__ == "__main__":
+    main()
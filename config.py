@@ -1,25 +1,154 @@
 import os
+from datetime import time
 
 from dotenv import load_dotenv
 from pathlib import Path
 
+# Файл с переменными окружения (в Docker его можно смонтировать, чтобы менять доступ без перезапуска)
+ENV_FILE: Path = Path(os.getenv("ENV_FILE") or Path(__file__).parent / ".env")
+
 # Загружаем переменные окружения из .env файла
-load_dotenv()
+load_dotenv(ENV_FILE)
 
 # Токен Telegram бота
 TELEGRAM_BOT_TOKEN: str = os.getenv("TELEGRAM_BOT_TOKEN", "")
 
-# Список допустимых user_id
-ALLOWED_USER_IDS: list[int] = [
-    int(user_id.strip())
-    for user_id in os.getenv("ALLOWED_USER_IDS", "").split(",")
-    if user_id.strip().isdigit()
-]
 
-# Путь к папке с данными
-DATA_DIR: Path = Path(__file__).parent / "data"
+def parse_user_ids(raw: str) -> frozenset[int]:
+    """Разбирает список user_id через запятую; некорректные значения пропускаются."""
+    return frozenset(
+        int(user_id.strip())
+        for user_id in raw.split(",")
+        if user_id.strip().isdigit()
+    )
+
+
+# Множество допустимых user_id (при изменении ENV_FILE перечитывается в AccessMiddleware)
+ALLOWED_USER_IDS: frozenset[int] = parse_user_ids(os.getenv("ALLOWED_USER_IDS", ""))
+
+# Администраторы: им доступна команда /metrics
+ADMIN_USER_IDS: frozenset[int] = parse_user_ids(os.getenv("ADMIN_USER_IDS", ""))
+
+# Адрес и порт HTTP-эндпоинта /metrics в формате Prometheus; порт 0 — эндпоинт выключен
+METRICS_HOST: str = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT: int = int(os.getenv("METRICS_PORT", "0"))
+
+# Как часто (в секундах) проверять, не изменился ли ENV_FILE
+ALLOWLIST_CHECK_INTERVAL: float = float(os.getenv("ALLOWLIST_CHECK_INTERVAL", "5"))
+
+# Пополнение токенов пользователя в секунду и ёмкость его «ведра» (сколько запросов можно сделать подряд)
+THROTTLE_RATE: float = float(os.getenv("THROTTLE_RATE", "1"))
+THROTTLE_BURST: float = float(os.getenv("THROTTLE_BURST", "10"))
+
+# Режим получения обновлений: "polling" (long polling) или "webhook" (встроенный aiohttp-сервер)
+BOT_MODE: str = os.getenv("BOT_MODE", "polling").strip().lower()
+
+# Публичный адрес, на который Telegram шлёт обновления (без пути), например https://bot.example.com.
+# Пустой — вебхук у Telegram не регистрируется: так сервер можно проверять локально
+WEBHOOK_URL: str = os.getenv("WEBHOOK_URL", "").rstrip("/")
+
+# Путь, по которому сервер принимает обновления
+WEBHOOK_PATH: str = os.getenv("WEBHOOK_PATH", "/webhook")
+
+# Секрет из заголовка X-Telegram-Bot-Api-Secret-Token: запросы без него отклоняются
+WEBHOOK_SECRET: str = os.getenv("WEBHOOK_SECRET", "")
+
+# Адрес и порт, на которых слушает сервер вебхука
+WEBHOOK_HOST: str = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT: int = int(os.getenv("WEBHOOK_PORT", "8080"))
+
+# Сколько обновлений обрабатывается одновременно
+HANDLER_CONCURRENCY: int = int(os.getenv("HANDLER_CONCURRENCY", "16"))
+
+# Через сколько секунд бездействия незавершённый сценарий (/add, /edit, /delete) считается брошенным
+FSM_TTL: float = float(os.getenv("FSM_TTL", str(24 * 60 * 60)))
+
+# Сколько сессий FSM держать в памяти; остальные читаются с диска по запросу
+FSM_CACHE_SIZE: int = int(os.getenv("FSM_CACHE_SIZE", "1000"))
+
+# Интервал (в секундах) фоновой записи изменённых сессий FSM на диск
+FSM_FLUSH_INTERVAL: float = float(os.getenv("FSM_FLUSH_INTERVAL", "1"))
+
+# Путь к папке с данными (можно переопределить через DATA_DIR, например для бенчмарков)
+DATA_DIR: Path = Path(os.getenv("DATA_DIR") or Path(__file__).parent / "data")
 DATA_DIR.mkdir(exist_ok=True)
 
+# База состояний FSM: незавершённые сценарии переживают перезапуск бота
+FSM_FILE: Path = DATA_DIR / "fsm.db"
+
+# Хранилище расходов: "excel" (expenses.xlsx) или "sqlite" (expenses.db, xlsx собирается только для /export)
+STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "excel").strip().lower()
+
+# Разделение учёта: "single" — один общий учёт в DATA_DIR,
+# "chat" — у каждого чата (магазина, отдела) свой, в DATA_DIR/tenants/<chat_id>
+TENANT_MODE: str = os.getenv("TENANT_MODE", "single").strip().lower()
+
+# Сколько хранилищ арендаторов держать открытыми; давно не использованные сбрасываются на диск и закрываются
+TENANT_CACHE_SIZE: int = int(os.getenv("TENANT_CACHE_SIZE", "32"))
+
+# Интервал (в секундах) фонового переноса журнала изменений в xlsx
+FLUSH_INTERVAL: float = float(os.getenv("FLUSH_INTERVAL", "60"))
+
+# Интервал (в секундах) проверки, не пора ли перенести закрытые месяцы в архив
+ARCHIVE_INTERVAL: float = float(os.getenv("ARCHIVE_INTERVAL", "3600"))
+
+# Сколько месяцев хранилища держать в памяти в колоночном виде (архивные и открытые, по LRU)
+MONTH_TABLE_CACHE_SIZE: int = int(os.getenv("MONTH_TABLE_CACHE_SIZE", "12"))
+
+# Сколько операций может накопиться в журнале до внеочередного переноса в xlsx
+JOURNAL_MAX_ENTRIES: int = int(os.getenv("JOURNAL_MAX_ENTRIES", "500"))
+
+# Дополнительное окно (в секундах) ожидания попутных изменений перед групповой фиксацией.
+# 0 — без ожидания: в пачку попадает всё, что пришло, пока фиксировалась предыдущая
+WRITE_BATCH_WINDOW: float = float(os.getenv("WRITE_BATCH_WINDOW", "0"))
+
+# Максимальный размер пачки изменений: полная пачка фиксируется, не дожидаясь конца окна
+WRITE_BATCH_MAX: int = int(os.getenv("WRITE_BATCH_MAX", "100"))
+
+# Размер пула потоков для чтения данных вне event loop
+IO_WORKERS: int = int(os.getenv("IO_WORKERS", "4"))
+
+# Сколько записей показывать на одной странице /list
+LIST_PAGE_SIZE: int = int(os.getenv("LIST_PAGE_SIZE", "20"))
+
+# Сколько строк выписки /import фиксируется за раз (одна запись в хранилище на порцию)
+IMPORT_CHUNK_SIZE: int = int(os.getenv("IMPORT_CHUNK_SIZE", "500"))
+
+# Категория для строк выписки, категория банка в которых не совпала ни с одной из CATEGORIES
+IMPORT_DEFAULT_CATEGORY: str = os.getenv("IMPORT_DEFAULT_CATEGORY", "Доп расход")
+
+# Плановая сводка расходов: "daily" — за вчера, "weekly" — по понедельникам за прошлую неделю, "off" — выключена
+REPORT_DIGEST: str = os.getenv("REPORT_DIGEST", "off").strip().lower()
+
+# Итоги закрытого месяца 1-го числа (1 — включены, 0 — выключены)
+REPORT_MONTH_CLOSE: bool = os.getenv("REPORT_MONTH_CLOSE", "0").strip() == "1"
+
+# Время рассылки отчётов (ЧЧ:ММ, местное время сервера)
+REPORT_TIME: time = time.fromisoformat(os.getenv("REPORT_TIME", "09:00").strip())
+
+# Как часто (в секундах) проверять, не наступило ли время отчётов
+REPORT_CHECK_INTERVAL: float = float(os.getenv("REPORT_CHECK_INTERVAL", "60"))
+
+# Что и за какой период уже разослано: отчёты не дублируются после перезапуска
+REPORTS_FILE: Path = DATA_DIR / "reports.json"
+
+# Очередь исходящих сообщений: не больше SEND_RATE сообщений в секунду всего
+# (ниже лимита Telegram ~30/с, чтобы оставался запас для ответов на команды)
+# и не чаще раза в SEND_CHAT_INTERVAL секунд в личный чат, SEND_GROUP_INTERVAL — в группу
+SEND_RATE: float = float(os.getenv("SEND_RATE", "20"))
+SEND_CHAT_INTERVAL: float = float(os.getenv("SEND_CHAT_INTERVAL", "1"))
+SEND_GROUP_INTERVAL: float = float(os.getenv("SEND_GROUP_INTERVAL", "3"))
+
+# Стоимость команд в токенах: тяжёлые запросы к книге дороже шагов сценариев (они стоят 1)
+COMMAND_COSTS: dict[str, float] = {
+    "export": 5,
+    "list": 3,
+    "stats": 3,
+    "find": 3,
+    "bulk": 3,
+    "import": 5,
+}
+
 # Предопределённые категории расходов
 CATEGORIES: list[str] = [
     "ЗП",
@@ -4,7 +4,7 @@ from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKe
 from aiogram.fsm.context import FSMContext
 
 from config import CATEGORIES
-from services import expense_service
+from services import expense_service, async_expense_service
 from states import AddExpense
 
 router = Router()
@@ -74,7 +74,7 @@ async def handle_add_comment(message: Message, state: FSMContext) -> None:
     comment = None if message.text.strip().lower() == "/skip" else message.text.strip()
 
     # Сохраняем расход, получаем ID
-    new_id = expense_service.add_expense(category=category, amount=amount, comment=comment)
+    new_id = await async_expense_service.add_expense(category=category, amount=amount, comment=comment)
 
     # Сбрасываем состояние
     await state.clear()
@@ -0,0 +1,72 @@
+from aiogram import Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message
+
+from services import expense_service, async_expense_service
+
+router = Router()
+
+# Сколько строк принимается за раз — отчёт по всем строкам должен влезть в одно сообщение
+MAX_BULK_LINES = 50
+
+# Длинные строки в отчёте обрезаем
+MAX_LINE_PREVIEW = 40
+
+BULK_USAGE = (
+    "📥 Пакетное добавление: отправьте /bulk и ниже по расходу на строку:\n"
+    "категория; сумма; комментарий\n\n"
+    "Например:\n"
+    "/bulk\n"
+    "Товарка; 1500; закупка коробок\n"
+    "ЗП; 30000\n"
+    "доп; 250,50; такси"
+)
+
+
+def _preview(line: str) -> str:
+    """Укороченная строка ввода для отчёта."""
+    return line if len(line) <= MAX_LINE_PREVIEW else line[:MAX_LINE_PREVIEW] + "…"
+
+
+@router.message(Command("bulk"))
+async def handle_bulk(message: Message, command: CommandObject) -> None:
+    """
+    Добавляет сразу несколько расходов из одного сообщения.
+    Каждая строка проверяется отдельно; корректные сохраняются одной
+    операцией хранилища, в ответ — отчёт по каждой строке.
+    """
+    lines = [line.strip() for line in (command.args or "").splitlines() if line.strip()]
+
+    if not lines:
+        await message.answer(BULK_USAGE)
+        return
+
+    if len(lines) > MAX_BULK_LINES:
+        await message.answer(f"❌ Слишком много строк: {len(lines)}. За раз можно добавить до {MAX_BULK_LINES}.")
+        return
+
+    # Номер строки → разобранная запись или текст ошибки
+    parsed: dict[int, tuple[str, float, str | None]] = {}
+    errors: dict[int, str] = {}
+    for number, line in enumerate(lines, start=1):
+        try:
+            parsed[number] = expense_service.parse_bulk_line(line)
+        except ValueError as e:
+            errors[number] = str(e)
+
+    new_ids = await async_expense_service.add_expenses(list(parsed.values()))
+    ids_by_number = dict(zip(parsed, new_ids))
+
+    report = [f"📥 Добавлено {len(new_ids)} из {len(lines)}:\n"]
+    for number, line in enumerate(lines, start=1):
+        if number in parsed:
+            category, amount, _ = parsed[number]
+            report.append(f"  ✅ {number}. #{ids_by_number[number]} {category} — {amount:.2f} руб.")
+        else:
+            report.append(f"  ❌ {number}. «{_preview(line)}»: {errors[number]}")
+
+    if new_ids:
+        total = sum(amount for _, amount, _ in parsed.values())
+        report.append(f"\n💰 Итого добавлено: {total:.2f} руб.")
+
+    await message.answer("\n".join(report))
@@ -1,25 +1,33 @@
-from aiogram import Router
+from aiogram import Router, F
 from aiogram.filters import Command
-from aiogram.types import Message
+from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
-from services import expense_service
+from services import expense_service, async_expense_service
 
 
 class DeleteExpense(StatesGroup):
-    """Состояние ожидания ввода ID для удаления."""
-    wait_id = State()
+    """Состояния сценария удаления."""
+    wait_id = State()       # Ожидаем ввод ID записи
+    wait_confirm = State()  # Ожидаем подтверждение удаления показанной записи
 
 
 router = Router()
 
 
+def _build_confirm_keyboard() -> InlineKeyboardMarkup:
+    """Клавиатура подтверждения удаления."""
+    return InlineKeyboardMarkup(inline_keyboard=[[
+        InlineKeyboardButton(text="🗑️ Удалить", callback_data="delete_confirm:yes"),
+        InlineKeyboardButton(text="Отмена", callback_data="delete_confirm:no"),
+    ]])
+
+
 @router.message(Command("delete"))
 async def handle_delete_start(message: Message, state: FSMContext) -> None:
     """Начало сценария удаления — просим ввести ID записи."""
-    expenses = expense_service.get_all_expenses()
-    if not expenses:
+    if not await async_expense_service.has_expenses():
         await message.answer("📋 Пока нет записей для удаления.")
         return
 
@@ -29,7 +37,10 @@ async def handle_delete_start(message: Message, state: FSMContext) -> None:
 
 @router.message(DeleteExpense.wait_id)
 async def handle_delete_id(message: Message, state: FSMContext) -> None:
-    """Обработчик ввода ID — валидация и удаление."""
+    """
+    Обработчик ввода ID — читаем запись и показываем её для подтверждения.
+    Версия записи сохраняется в состоянии: если до подтверждения запись изменят, она не удалится.
+    """
     text = message.text.strip()
 
     if not text.isdigit() or int(text) <= 0:
@@ -37,12 +48,50 @@ async def handle_delete_id(message: Message, state: FSMContext) -> None:
         return
 
     expense_id = int(text)
-    success = expense_service.delete_expense(expense_id)
+    expense = await async_expense_service.get_expense(expense_id)
 
-    if not success:
+    if expense is None:
         await state.clear()
         await message.answer(f"❌ Запись с ID #{expense_id} не найдена.")
         return
 
-    await state.clear()
-    await message.answer(f"🗑️ Запись #{expense_id} удалена.")
\ No newline at end of file
+    await state.update_data(expense_id=expense_id, version=expense["version"])
+    await state.set_state(DeleteExpense.wait_confirm)
+    await message.answer(
+        f"🗑️ Удалить запись?\n{expense_service.format_expense(expense)}",
+        reply_markup=_build_confirm_keyboard(),
+    )
+
+
+@router.callback_query(F.data.startswith("delete_confirm:"), DeleteExpense.wait_confirm)
+async def handle_delete_confirm(callback: CallbackQuery, state: FSMContext) -> None:
+    """Обработчик подтверждения: удаляем запись, только если она не менялась после показа."""
+    answer = callback.data.split(":", 1)[1]
+    data = await state.get_data()
+    expense_id = data["expense_id"]
+
+    await callback.answer()
+
+    if answer != "yes":
+        await state.clear()
+        await callback.message.edit_text(f"Удаление записи #{expense_id} отменено.")
+        return
+
+    if await async_expense_service.delete_expense(expense_id, data.get("version")):
+        await state.clear()
+        await callback.message.edit_text(f"🗑️ Запись #{expense_id} удалена.")
+        return
+
+    # Запись удалили или изменили, пока ждали подтверждения
+    expense = await async_expense_service.get_expense(expense_id)
+    if expense is None:
+        await state.clear()
+        await callback.message.edit_text(f"❌ Запись #{expense_id} уже удалена.")
+        return
+
+    await state.update_data(version=expense["version"])
+    await callback.message.edit_text(
+        f"⚠️ Запись изменилась, пока вы подтверждали удаление. Сейчас она такая:\n"
+        f"{expense_service.format_expense(expense)}\n\nВсё равно удалить?",
+        reply_markup=_build_confirm_keyboard(),
+    )
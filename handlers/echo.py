@@ -15,8 +15,12 @@ async def handle_echo(message: Message) -> None:
         f"🤷 Не понимаю: «{message.text}»\n\n"
         f"Доступные команды:\n"
         f"  /add — добавить расход\n"
-        f"  /list — просмотр расходов\n"
+        f"  /bulk — добавить несколько расходов одним сообщением\n"
+        f"  /import — загрузить выписку банка (CSV/XLSX)\n"
+        f"  /list [период] — просмотр расходов\n"
+        f"  /stats [период] — статистика по категориям\n"
+        f"  /find текст — поиск по комментариям\n"
         f"  /edit — редактировать запись\n"
         f"  /delete — удалить запись\n"
-        f"  /export — экспорт в Excel"
+        f"  /export [период] — экспорт в Excel"
     )
\ No newline at end of file
@@ -4,7 +4,7 @@ from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKe
 from aiogram.fsm.context import FSMContext
 
 from config import CATEGORIES
-from services import expense_service
+from services import expense_service, async_expense_service
 from states import EditExpense
 
 router = Router()
@@ -32,11 +32,30 @@ def _build_category_keyboard() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+async def _handle_failed_update(message: Message, state: FSMContext, expense_id: int) -> None:
+    """
+    Изменение не выполнено: запись удалили или изменили после того, как её показали.
+    Перечитываем запись и показываем её текущий вид — правка начинается от него.
+    """
+    expense = await async_expense_service.get_expense(expense_id)
+    if expense is None:
+        await state.clear()
+        await message.answer(f"❌ Запись #{expense_id} уже удалена.")
+        return
+
+    await state.update_data(version=expense["version"])
+    await state.set_state(EditExpense.wait_field)
+    await message.answer(
+        f"⚠️ Запись изменилась, пока вы её редактировали. Сейчас она такая:\n"
+        f"{expense_service.format_expense(expense)}\n\nЧто редактировать?",
+        reply_markup=_build_field_keyboard(),
+    )
+
+
 @router.message(Command("edit"))
 async def handle_edit_start(message: Message, state: FSMContext) -> None:
     """Начало сценария редактирования — просим ввести ID записи."""
-    expenses = expense_service.get_all_expenses()
-    if not expenses:
+    if not await async_expense_service.has_expenses():
         await message.answer("📋 Пока нет записей для редактирования.")
         return
 
@@ -46,7 +65,10 @@ async def handle_edit_start(message: Message, state: FSMContext) -> None:
 
 @router.message(EditExpense.wait_id)
 async def handle_edit_id(message: Message, state: FSMContext) -> None:
-    """Обработчик ввода ID — проверяем существование и просим выбрать поле."""
+    """
+    Обработчик ввода ID — читаем запись, показываем её и просим выбрать поле.
+    Версия записи сохраняется в состоянии: изменение не затрёт чужую правку, сделанную за это время.
+    """
     text = message.text.strip()
 
     if not text.isdigit() or int(text) <= 0:
@@ -55,19 +77,17 @@ async def handle_edit_id(message: Message, state: FSMContext) -> None:
 
     expense_id = int(text)
 
-    expenses = expense_service.get_all_expenses()
-    exists = any(exp["id"] == expense_id for exp in expenses)
-
-    if not exists:
+    expense = await async_expense_service.get_expense(expense_id)
+    if expense is None:
         await state.clear()
         await message.answer(f"❌ Запись с ID #{expense_id} не найдена.")
         return
 
-    await state.update_data(expense_id=expense_id)
+    await state.update_data(expense_id=expense_id, version=expense["version"])
     await state.set_state(EditExpense.wait_field)
 
     await message.answer(
-        f"📝 Что редактировать в записи #{expense_id}?",
+        f"📝 {expense_service.format_expense(expense)}\n\nЧто редактировать?",
         reply_markup=_build_field_keyboard(),
     )
 
@@ -102,7 +122,7 @@ async def handle_edit_new_category(callback: CallbackQuery, state: FSMContext) -
     data = await state.get_data()
     expense_id = data["expense_id"]
 
-    success = expense_service.update_category(expense_id, new_category)
+    success = await async_expense_service.update_category(expense_id, new_category, data.get("version"))
 
     await callback.answer()
 
@@ -110,7 +130,7 @@ async def handle_edit_new_category(callback: CallbackQuery, state: FSMContext) -
         await state.clear()
         await callback.message.edit_text(f"✏️ Запись #{expense_id} обновлена. Категория: <b>{new_category}</b>", parse_mode="HTML")
     else:
-        await callback.message.answer("❌ Не удалось обновить запись.")
+        await _handle_failed_update(callback.message, state, expense_id)
 
 
 @router.message(EditExpense.wait_new_amount)
@@ -125,13 +145,13 @@ async def handle_edit_new_amount(message: Message, state: FSMContext) -> None:
     data = await state.get_data()
     expense_id = data["expense_id"]
 
-    success = expense_service.update_amount(expense_id, new_amount)
+    success = await async_expense_service.update_amount(expense_id, new_amount, data.get("version"))
 
     if success:
         await state.clear()
         await message.answer(f"✏️ Запись #{expense_id} обновлена.")
     else:
-        await message.answer("❌ Не удалось обновить запись.")
+        await _handle_failed_update(message, state, expense_id)
 
 
 @router.message(EditExpense.wait_new_comment)
@@ -143,7 +163,7 @@ async def handle_edit_new_comment(message: Message, state: FSMContext) -> None:
     # /skip очищает комментарий
     new_comment = "" if message.text.strip().lower() == "/skip" else message.text.strip()
 
-    success = expense_service.update_comment(expense_id, new_comment)
+    success = await async_expense_service.update_comment(expense_id, new_comment, data.get("version"))
 
     if success:
         await state.clear()
@@ -152,4 +172,4 @@ async def handle_edit_new_comment(message: Message, state: FSMContext) -> None:
         else:
             await message.answer(f"✏️ Комментарий к записи #{expense_id} очищен.")
     else:
-        await message.answer("❌ Не удалось обновить запись.")
\ No newline at end of file
+        await _handle_failed_update(message, state, expense_id)
\ No newline at end of file
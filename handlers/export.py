@@ -1,32 +1,73 @@
 from aiogram import Router
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
 from aiogram.types import Message, FSInputFile
 
-from repository import excel_repo
-from services import expense_service
+from services import expense_service, async_expense_service
 
 router = Router()
 
+# Последние выгрузки: (арендатор, ключ периода — "" для всех месяцев) → (версия данных, file_id документа в Telegram).
+# Пока данные не менялись, файл повторно не собирается и не загружается.
+_cached_exports: dict[tuple[str, str], tuple[int, str]] = {}
+
 
 @router.message(Command("export"))
-async def handle_export(message: Message) -> None:
-    """Отправляет файл expenses.xlsx как документ в Telegram."""
-    filepath = excel_repo.get_file_path()
+async def handle_export(message: Message, command: CommandObject, tenant: str) -> None:
+    """
+    Отправляет выгрузку расходов как xlsx-документ в Telegram:
+    /export — все месяцы, /export ГГГГ_ММ или /export ДД.ММ.ГГГГ-ДД.ММ.ГГГГ — только период.
+    """
+    if command.args:
+        period = expense_service.parse_period(command.args)
+        if period is None:
+            await message.answer(
+                "❌ Укажите месяц (ГГГГ_ММ) или даты (ДД.ММ.ГГГГ-ДД.ММ.ГГГГ), "
+                "например: /export 2026_02"
+            )
+            return
 
-    # Проверяем что файл существует и в нём есть хотя бы записи за текущий месяц
-    if not filepath.exists():
-        await message.answer("📋 Нет данных для экспорта.")
-        return
+        period_label = expense_service.get_period_label(period)
+        if not await async_expense_service.get_period_summary(period):
+            await message.answer(f"📋 Нет данных для экспорта за {period_label}.")
+            return
+
+        period_key = expense_service.get_period_key(period)
+        cache_key = (tenant, period_key)
+        filename = f"expenses_{period_key}.xlsx"
+        caption = f"📤 Экспорт расходов за {period_label}"
+    else:
+        period = None
+
+        # Проверяем что есть хотя бы записи за текущий месяц
+        if not await async_expense_service.has_expenses():
+            await message.answer("📋 Нет данных для экспорта за этот месяц.")
+            return
 
-    expenses = expense_service.get_all_expenses()
-    if not expenses:
-        await message.answer("📋 Нет данных для экспорта за этот месяц.")
+        cache_key = (tenant, "")
+        filename = "expenses.xlsx"
+        caption = f"📤 Экспорт расходов (текущий месяц: {expense_service.get_month_label()})"
+
+    # Версию берём до сборки файла: если данные изменятся во время сборки,
+    # следующий /export увидит новую версию и соберёт файл заново
+    version = await async_expense_service.get_data_version()
+
+    cached = _cached_exports.get(cache_key)
+    if cached is not None and cached[0] == version:
+        # Данные не менялись — пересылаем уже загруженный документ по file_id
+        await message.answer_document(document=cached[1], caption=caption)
         return
 
-    # Отправляем файл как документ
-    input_file = FSInputFile(path=filepath, filename="expenses.xlsx")
+    filepath = await async_expense_service.build_export_file(period)
+    input_file = FSInputFile(path=filepath, filename=filename)
+
+    sent = await message.answer_document(document=input_file, caption=caption)
 
-    await message.answer_document(
-        document=input_file,
-        caption=f"📤 Экспорт расходов (текущий месяц: {expense_service.get_month_label()})",
-    )
\ No newline at end of file
+    # Выгрузки по устаревшим версиям данных арендатора больше не понадобятся
+    # (версии у разных арендаторов независимы)
+    stale = [
+        key for key, (cached_version, _) in _cached_exports.items()
+        if key[0] == tenant and cached_version != version
+    ]
+    for key in stale:
+        del _cached_exports[key]
+    _cached_exports[cache_key] = (version, sent.document.file_id)
@@ -0,0 +1,115 @@
+from aiogram import Router, F
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
+
+from config import LIST_PAGE_SIZE
+from services import expense_service, async_expense_service
+
+router = Router()
+
+# Длинные комментарии обрезаем, чтобы страница гарантированно влезла в лимит сообщения
+MAX_COMMENT_LENGTH = 100
+
+# Запрос целиком кладётся в callback_data кнопок (лимит Telegram — 64 байта)
+MAX_CALLBACK_DATA = 64
+
+
+def _page_callback(query: str, page: int) -> str:
+    return f"find_page:{query}:{page}"
+
+
+def _build_page_keyboard(query: str, page: int, pages: int) -> InlineKeyboardMarkup | None:
+    """Клавиатура навигации по страницам результатов: ◀ номер ▶. Для одной страницы не нужна."""
+    if pages <= 1:
+        return None
+
+    buttons = []
+    if page > 0:
+        buttons.append(InlineKeyboardButton(text="◀", callback_data=_page_callback(query, page - 1)))
+    buttons.append(InlineKeyboardButton(text=f"{page + 1}/{pages}", callback_data="find_page:noop"))
+    if page < pages - 1:
+        buttons.append(InlineKeyboardButton(text="▶", callback_data=_page_callback(query, page + 1)))
+
+    return InlineKeyboardMarkup(inline_keyboard=[buttons])
+
+
+async def _render_page(query: str, page: int) -> tuple[str, InlineKeyboardMarkup | None] | None:
+    """
+    Формирует текст и клавиатуру одной страницы результатов поиска.
+    Совпадения берутся из поискового индекса, из хранилища читаются только
+    записи этой страницы. Возвращает None если ничего не найдено.
+    """
+    total, expenses = await async_expense_service.search_expenses(query, page * LIST_PAGE_SIZE, LIST_PAGE_SIZE)
+    if total == 0:
+        return None
+
+    pages = (total + LIST_PAGE_SIZE - 1) // LIST_PAGE_SIZE
+    if page >= pages:
+        # Записи удалили, пока листали: показываем последнюю страницу
+        page = pages - 1
+        total, expenses = await async_expense_service.search_expenses(query, page * LIST_PAGE_SIZE, LIST_PAGE_SIZE)
+
+    lines = [f"🔎 Найдено по «{query}»: {total}\n"]
+    for exp in expenses:
+        exp_date = expense_service.format_date(exp["date"])
+        lines.append(
+            f"  #{exp['id']} | {expense_service.get_month_label(exp['month'])} | {exp_date} | "
+            f"{exp['category']} | {exp['amount']:.2f} руб."
+        )
+        comment = exp["comment"]
+        if len(comment) > MAX_COMMENT_LENGTH:
+            comment = comment[:MAX_COMMENT_LENGTH] + "…"
+        lines.append(f"       💬 {comment}")
+
+    return "\n".join(lines), _build_page_keyboard(query, page, pages)
+
+
+@router.message(Command("find"))
+async def handle_find(message: Message, command: CommandObject) -> None:
+    """
+    Поиск записей всех месяцев по словам комментария: /find текст.
+    Слова ищутся по началу, без учёта регистра; должны совпасть все слова запроса.
+    """
+    query = expense_service.get_search_query(command.args or "")
+    if not query:
+        await message.answer("❌ Укажите, что искать в комментариях, например: /find аренда склада")
+        return
+    if len(_page_callback(query, 999).encode("utf-8")) > MAX_CALLBACK_DATA:
+        await message.answer("❌ Слишком длинный запрос — оставьте одно-два слова.")
+        return
+
+    rendered = await _render_page(query, 0)
+
+    if rendered is None:
+        await message.answer(f"🔎 По запросу «{query}» ничего не найдено.")
+        return
+
+    text, keyboard = rendered
+    await message.answer(text, reply_markup=keyboard)
+
+
+@router.callback_query(F.data.startswith("find_page:"))
+async def handle_find_page(callback: CallbackQuery) -> None:
+    """Обработчик кнопок ◀ ▶ — перерисовывает сообщение нужной страницей результатов."""
+    parts = callback.data.split(":")
+
+    # Кнопка с номером страницы — просто закрываем «часики»
+    if len(parts) != 3 or not parts[2].isdigit():
+        await callback.answer()
+        return
+
+    query = parts[1]
+    rendered = await _render_page(query, int(parts[2]))
+    await callback.answer()
+
+    if rendered is None:
+        await callback.message.edit_text(f"🔎 По запросу «{query}» ничего не найдено.")
+        return
+
+    text, keyboard = rendered
+    try:
+        await callback.message.edit_text(text, reply_markup=keyboard)
+    except TelegramBadRequest:
+        # Двойное нажатие на ту же страницу: «message is not modified»
+        pass
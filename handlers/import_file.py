@@ -0,0 +1,128 @@
+import os
+import tempfile
+import time
+from contextlib import closing
+from pathlib import Path
+
+from aiogram import Router
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters import Command
+from aiogram.types import Message
+
+from config import IMPORT_CHUNK_SIZE
+from services import async_expense_service, import_service
+
+router = Router()
+
+# Больше Bot API скачать не даёт
+MAX_FILE_SIZE = 20 * 1024 * 1024
+
+# Не чаще чем раз в столько секунд обновляем сообщение о ходе импорта (лимит Telegram на правки)
+PROGRESS_INTERVAL = 2.0
+
+# Сколько ошибочных строк перечислять в итоговом отчёте
+MAX_ERRORS_SHOWN = 10
+
+IMPORT_USAGE = (
+    "📄 Импорт выписки: отправьте файл CSV или XLSX с подписью /import.\n\n"
+    "Колонки находятся по заголовку: дата и сумма обязательны, "
+    "категория и описание — если есть. Категории банка, которых нет в списке, "
+    "попадают в комментарий. Если в выписке есть отрицательные суммы, "
+    "импортируются только они (списания).\n"
+    "Строки, загруженные раньше, пропускаются — выписку можно загружать повторно."
+)
+
+
+def _format_progress(rows: int, added: int, skipped: int, errors: int) -> str:
+    return (
+        f"строк: {rows}, добавлено: {added}, "
+        f"уже были или не расходы: {skipped}, с ошибками: {errors}"
+    )
+
+
+@router.message(Command("import"))
+async def handle_import(message: Message) -> None:
+    """
+    Импортирует расходы из банковской выписки (CSV/XLSX), присланной файлом с подписью /import.
+    Файл читается потоково и фиксируется порциями по IMPORT_CHUNK_SIZE строк
+    (одна запись в хранилище на порцию); уже импортированные строки
+    пропускаются по хэшу. Ход импорта показывается правками одного сообщения.
+    """
+    document = message.document
+    if document is None:
+        await message.answer(IMPORT_USAGE)
+        return
+
+    suffix = Path(document.file_name or "").suffix.lower()
+    if suffix not in import_service.SUPPORTED_EXTENSIONS:
+        await message.answer(f"❌ Поддерживаются файлы {', '.join(import_service.SUPPORTED_EXTENSIONS)}.")
+        return
+    if document.file_size and document.file_size > MAX_FILE_SIZE:
+        await message.answer("❌ Файл больше 20 МБ — Telegram не даёт боту его скачать.")
+        return
+
+    status = await message.answer("⏳ Загружаю файл…")
+
+    rows = added = skipped = error_count = 0
+    # Для отчёта храним только первые ошибки: в битом файле их может быть сколько угодно
+    errors: list[str] = []
+
+    fd, tmp_name = tempfile.mkstemp(suffix=suffix)
+    os.close(fd)
+    path = Path(tmp_name)
+    try:
+        await message.bot.download(document, destination=path)
+        last_update = time.monotonic()
+
+        # Итератор держит файл открытым — закрываем его и при ошибке посреди импорта
+        with closing(import_service.iter_statement(path)) as statement:
+            while True:
+                try:
+                    chunk = await async_expense_service.read_chunk(statement, IMPORT_CHUNK_SIZE)
+                except ValueError as e:
+                    text = f"❌ Не удалось разобрать файл: {e}"
+                    if rows:
+                        # Ошибка посреди файла: предыдущие порции уже сохранены
+                        text += f"\nДо ошибки — {_format_progress(rows, added, skipped, error_count)}"
+                    await status.edit_text(text)
+                    return
+                if not chunk:
+                    break
+
+                items = []
+                for number, item, error in chunk:
+                    rows += 1
+                    if error is not None:
+                        error_count += 1
+                        if len(errors) < MAX_ERRORS_SHOWN:
+                            errors.append(f"  {number}: {error}")
+                    elif item is not None:
+                        items.append(item)
+                    else:
+                        skipped += 1
+
+                chunk_added = await async_expense_service.import_expenses(items) if items else 0
+                added += chunk_added
+                skipped += len(items) - chunk_added
+
+                if time.monotonic() - last_update >= PROGRESS_INTERVAL:
+                    last_update = time.monotonic()
+                    try:
+                        await status.edit_text(f"⏳ Импорт: {_format_progress(rows, added, skipped, error_count)}")
+                    except TelegramBadRequest:
+                        # Текст не изменился — Telegram отклоняет такую правку
+                        pass
+    except Exception:
+        # Сообщение о ходе импорта не должно остаться «⏳»: сообщаем, сколько успело добавиться
+        await status.edit_text(f"❌ Импорт прерван из-за ошибки — {_format_progress(rows, added, skipped, error_count)}")
+        raise
+    finally:
+        path.unlink(missing_ok=True)
+
+    lines = [f"✅ Импорт завершён — {_format_progress(rows, added, skipped, error_count)}"]
+    if errors:
+        lines.append("\nСтроки с ошибками:")
+        lines.extend(errors)
+        if error_count > len(errors):
+            lines.append(f"  … и ещё {error_count - len(errors)}")
+    await status.edit_text("\n".join(lines))
@@ -1,33 +1,121 @@
-from aiogram import Router
-from aiogram.filters import Command
-from aiogram.types import Message
+from aiogram import Router, F
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 
-from services import expense_service
+from config import LIST_PAGE_SIZE
+from services import expense_service, async_expense_service
+from services.expense_service import Period
 
 router = Router()
 
+# Длинные комментарии обрезаем, чтобы страница гарантированно влезла в лимит сообщения
+MAX_COMMENT_LENGTH = 100
 
-@router.message(Command("list"))
-async def handle_list(message: Message) -> None:
-    """Отправляет текстовый список всех записей текущего месяца."""
-    expenses = expense_service.get_all_expenses()
 
-    if not expenses:
-        await message.answer("📋 Пока нет записей за этот месяц.")
-        return
+def _build_page_keyboard(period: Period, page: int, pages: int) -> InlineKeyboardMarkup | None:
+    """
+    Клавиатура навигации по страницам: ◀ номер ▶. Для одной страницы не нужна.
+    В callback_data кладётся ключ периода, чтобы листать именно его.
+    """
+    if pages <= 1:
+        return None
+
+    key = expense_service.get_period_key(period)
+    buttons = []
+    if page > 0:
+        buttons.append(InlineKeyboardButton(text="◀", callback_data=f"list_page:{key}:{page - 1}"))
+    buttons.append(InlineKeyboardButton(text=f"{page + 1}/{pages}", callback_data="list_page:noop"))
+    if page < pages - 1:
+        buttons.append(InlineKeyboardButton(text="▶", callback_data=f"list_page:{key}:{page + 1}"))
+
+    return InlineKeyboardMarkup(inline_keyboard=[buttons])
+
+
+async def _render_page(period: Period, page: int) -> tuple[str, InlineKeyboardMarkup | None] | None:
+    """
+    Формирует текст и клавиатуру одной страницы списка за период.
+    Из хранилища читаются только записи этой страницы, итог и количество
+    берутся из агрегатов (построчно — только частично задетые месяцы).
+    Возвращает None если записей нет.
+    """
+    summary = await async_expense_service.get_period_summary(period)
+    count = sum(cnt for _, cnt in summary.values())
+    if count == 0:
+        return None
 
-    month_label = expense_service.get_month_label()
+    pages = (count + LIST_PAGE_SIZE - 1) // LIST_PAGE_SIZE
+    page = max(0, min(page, pages - 1))
 
-    lines = [f"📋 Расходы за <b>{month_label}</b>:\n"]
+    expenses = await async_expense_service.get_period_page(period, page * LIST_PAGE_SIZE, LIST_PAGE_SIZE)
+    total = sum(amount for amount, _ in summary.values())
+    period_label = expense_service.get_period_label(period)
+
+    lines = [f"📋 Расходы за <b>{period_label}</b>:\n"]
     for exp in expenses:
-        line = f"  #{exp['id']} | {exp['date']} | {exp['category']} | {exp['amount']:.2f} руб."
+        exp_date = expense_service.format_date(exp["date"])
+        line = f"  #{exp['id']} | {exp_date} | {exp['category']} | {exp['amount']:.2f} руб."
         # Добавляем комментарий если он есть
         if exp["comment"]:
-            line += f"\n       💬 {exp['comment']}"
+            comment = exp["comment"]
+            if len(comment) > MAX_COMMENT_LENGTH:
+                comment = comment[:MAX_COMMENT_LENGTH] + "…"
+            line += f"\n       💬 {comment}"
         lines.append(line)
 
-    # Подсчёт общей суммы
-    total = sum(exp['amount'] for exp in expenses)
-    lines.append(f"\n💰 <b>Итого: {total:.2f} руб.</b>")
+    lines.append(f"\n💰 <b>Итого: {total:.2f} руб.</b> ({count} записей)")
+
+    return "\n".join(lines), _build_page_keyboard(period, page, pages)
+
+
+@router.message(Command("list"))
+async def handle_list(message: Message, command: CommandObject) -> None:
+    """
+    Отправляет первую страницу списка записей: /list — текущий месяц,
+    /list ГГГГ_ММ — месяц, /list ДД.ММ.ГГГГ-ДД.ММ.ГГГГ — диапазон дат.
+    """
+    if command.args:
+        period = expense_service.parse_period(command.args)
+        if period is None:
+            await message.answer(
+                "❌ Укажите месяц (ГГГГ_ММ) или даты (ДД.ММ.ГГГГ-ДД.ММ.ГГГГ), "
+                "например: /list 2026_02 или /list 01.02.2026-15.02.2026"
+            )
+            return
+    else:
+        period = expense_service.get_month_period()
+
+    rendered = await _render_page(period, 0)
+
+    if rendered is None:
+        await message.answer(f"📋 Нет записей за {expense_service.get_period_label(period)}.")
+        return
+
+    text, keyboard = rendered
+    await message.answer(text, parse_mode="HTML", reply_markup=keyboard)
+
+
+@router.callback_query(F.data.startswith("list_page:"))
+async def handle_list_page(callback: CallbackQuery) -> None:
+    """Обработчик кнопок ◀ ▶ — перерисовывает сообщение нужной страницей периода."""
+    parts = callback.data.split(":")
+
+    # Кнопка с номером страницы (или устаревшая кнопка) — просто закрываем «часики»
+    period = expense_service.parse_period_key(parts[1]) if len(parts) == 3 else None
+    if period is None or not parts[2].isdigit():
+        await callback.answer()
+        return
+
+    rendered = await _render_page(period, int(parts[2]))
+    await callback.answer()
+
+    if rendered is None:
+        await callback.message.edit_text(f"📋 Нет записей за {expense_service.get_period_label(period)}.")
+        return
 
-    await message.answer("\n".join(lines), parse_mode="HTML")
+    text, keyboard = rendered
+    try:
+        await callback.message.edit_text(text, parse_mode="HTML", reply_markup=keyboard)
+    except TelegramBadRequest:
+        # Двойное нажатие на ту же страницу: «message is not modified»
+        pass
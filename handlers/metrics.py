@@ -0,0 +1,63 @@
+from aiogram import Router
+from aiogram.filters import Command
+from aiogram.types import Message
+
+import metrics
+from config import ADMIN_USER_IDS
+
+router = Router()
+
+
+def _format_histograms(name: str, label_names: tuple[str, ...]) -> list[str]:
+    """Строки сводки по гистограмме: число вызовов, p50, p95 и среднее для каждого набора меток."""
+    lines = []
+    histograms = metrics.get_histograms(name)
+    # Сначала самые затратные по суммарному времени
+    for labels, histogram in sorted(histograms.items(), key=lambda item: item[1].sum, reverse=True):
+        title = " ".join(value for key, value in labels if key in label_names) or "все"
+        lines.append(
+            f"  {title}: {histogram.count} шт., "
+            f"p50 {histogram.quantile(0.5) * 1000:.0f} мс, "
+            f"p95 {histogram.quantile(0.95) * 1000:.0f} мс, "
+            f"сред. {histogram.sum / histogram.count * 1000:.0f} мс"
+        )
+    return lines
+
+
+@router.message(Command("metrics"))
+async def handle_metrics(message: Message) -> None:
+    """Сводка задержек хендлеров и хранилища и размеров файлов. Только для ADMIN_USER_IDS."""
+    if message.from_user.id not in ADMIN_USER_IDS:
+        await message.answer("У вас нет доступа к этой команде.")
+        return
+
+    lines = ["📈 <b>Метрики</b>"]
+
+    update_lines = _format_histograms("bot_update_seconds", ())
+    if update_lines:
+        lines.append("\nОбновления:")
+        lines.extend(update_lines)
+
+    handler_lines = _format_histograms("bot_handler_seconds", ("handler",))
+    if handler_lines:
+        lines.append("\nХендлеры:")
+        lines.extend(handler_lines)
+        errors = metrics.get_values("bot_handler_errors_total")
+        for labels, count in errors.items():
+            lines.append(f"  ⚠️ ошибки {dict(labels).get('handler')}: {count:.0f}")
+
+    storage_lines = _format_histograms("storage_operation_seconds", ("backend", "op"))
+    if storage_lines:
+        lines.append("\nХранилище:")
+        lines.extend(storage_lines)
+
+    sizes = metrics.get_values("storage_file_bytes")
+    if sizes:
+        lines.append("\nФайлы:")
+        for labels, size in sorted(sizes.items()):
+            lines.append(f"  {dict(labels).get('file')}: {size / 1024:.1f} КБ")
+
+    if len(lines) == 1:
+        lines.append("Пока нет данных.")
+
+    await message.answer("\n".join(lines), parse_mode="HTML")
@@ -17,10 +17,14 @@ async def handle_start(message: Message) -> None:
         f"📅 Текущий месяц: <b>{month_label}</b>\n\n"
         f"Доступные команды:\n"
         f"  /add — добавить расход\n"
-        f"  /list — просмотр расходов\n"
+        f"  /bulk — добавить несколько расходов одним сообщением\n"
+        f"  /import — загрузить выписку банка (CSV/XLSX)\n"
+        f"  /list [период] — просмотр расходов\n"
+        f"  /stats [период] — статистика по категориям\n"
+        f"  /find текст — поиск по комментариям\n"
         f"  /edit — редактировать запись\n"
         f"  /delete — удалить запись\n"
-        f"  /export — экспорт файла"
+        f"  /export [период] — экспорт файла"
     )
 
     await message.answer(text, parse_mode="HTML")
@@ -0,0 +1,59 @@
+from aiogram import Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message
+
+from services import expense_service, async_expense_service
+
+router = Router()
+
+
+@router.message(Command("stats"))
+async def handle_stats(message: Message, command: CommandObject) -> None:
+    """
+    Статистика за период (/stats, /stats ГГГГ_ММ или /stats ДД.ММ.ГГГГ-ДД.ММ.ГГГГ):
+    разбивка по категориям и сравнение с предыдущим месяцем (или с предшествующим
+    диапазоном той же длины). Целые месяцы берутся из готовых агрегатов,
+    построчно читаются только частично задетые.
+    """
+    if command.args:
+        period = expense_service.parse_period(command.args)
+        if period is None:
+            await message.answer(
+                "❌ Укажите месяц (ГГГГ_ММ) или даты (ДД.ММ.ГГГГ-ДД.ММ.ГГГГ), "
+                "например: /stats 2026_02"
+            )
+            return
+    else:
+        period = expense_service.get_month_period()
+
+    previous_period = expense_service.get_previous_period(period)
+
+    summary = await async_expense_service.get_period_summary(period)
+    previous_summary = await async_expense_service.get_period_summary(previous_period)
+
+    period_label = expense_service.get_period_label(period)
+    if not summary:
+        await message.answer(f"📊 За {period_label} записей нет.")
+        return
+
+    total = sum(amount for amount, _ in summary.values())
+    count = sum(cnt for _, cnt in summary.values())
+    previous_total = sum(amount for amount, _ in previous_summary.values())
+
+    lines = [f"📊 Статистика за <b>{period_label}</b>:\n"]
+
+    # Категории — по убыванию суммы
+    for category, (amount, cnt) in sorted(summary.items(), key=lambda item: item[1][0], reverse=True):
+        share = amount / total * 100 if total else 0.0
+        line = f"  {category}: {amount:.2f} руб. ({cnt} шт., {share:.1f}%)"
+        if category in previous_summary:
+            line += f"\n       ↕ {expense_service.format_change(amount, previous_summary[category][0])}"
+        lines.append(line)
+
+    lines.append(f"\n💰 <b>Итого: {total:.2f} руб.</b> ({count} записей)")
+
+    if previous_summary:
+        previous_label = expense_service.get_period_label(previous_period)
+        lines.append(f"📈 К {previous_label}: {expense_service.format_change(total, previous_total)}")
+
+    await message.answer("\n".join(lines), parse_mode="HTML")
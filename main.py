@@ -1,47 +1,209 @@
 import asyncio
 
 from aiogram import Dispatcher, Bot
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
 
-from config import TELEGRAM_BOT_TOKEN
+from config import (
+    TELEGRAM_BOT_TOKEN, FLUSH_INTERVAL, ARCHIVE_INTERVAL, BOT_MODE, HANDLER_CONCURRENCY,
+    FSM_FILE, FSM_TTL, FSM_CACHE_SIZE, FSM_FLUSH_INTERVAL, METRICS_HOST, METRICS_PORT,
+    WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_SECRET, WEBHOOK_HOST, WEBHOOK_PORT,
+    REPORT_DIGEST, REPORT_MONTH_CLOSE, REPORT_CHECK_INTERVAL, SEND_RATE, SEND_CHAT_INTERVAL, SEND_GROUP_INTERVAL,
+)
+import metrics
 from middlewares.access import AccessMiddleware
+from middlewares.concurrency import ConcurrencyLimitMiddleware
 from middlewares.fsm_reset import FSMResetMiddleware
-from handlers import start, add, list as list_handler, delete, edit, export, echo
+from middlewares.metrics import MetricsMiddleware
+from middlewares.tenant import TenantMiddleware
+from middlewares.throttling import ThrottlingMiddleware
+from repository.fsm_storage import SQLiteStorage
+from handlers import (
+    start, add, bulk, import_file, list as list_handler, delete, edit, export, stats, find,
+    metrics as metrics_handler, echo,
+)
+from services import async_expense_service, report_service
+from services.send_queue import SendQueue
 
 
-async def main() -> None:
-    """Точка входа: инициализация бота, регистрация middleware и роутеров."""
+async def flush_periodically(interval: float) -> None:
+    """Фоновая задача: раз в interval секунд переносит журнал изменений в xlsx."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await async_expense_service.flush_storage()
+        except Exception as e:
+            # Журнал остаётся на диске — попробуем перенести его при следующем сбросе
+            print(f"⚠️ Не удалось сбросить журнал в xlsx: {e}")
 
-    # Инициализация бота и диспетчера
-    bot = Bot(token=TELEGRAM_BOT_TOKEN)
-    dp = Dispatcher()
+
+async def archive_periodically(interval: float) -> None:
+    """
+    Фоновая задача: переносит закрытые месяцы в архив — при старте
+    и дальше раз в interval секунд (после смены месяца).
+    """
+    while True:
+        try:
+            months = await async_expense_service.archive_closed_months()
+        except Exception as e:
+            # Месяцы остаются в книге — архивация повторится на следующем круге
+            print(f"⚠️ Не удалось перенести месяцы в архив: {e}")
+        else:
+            if months:
+                print(f"📦 В архив перенесены месяцы: {', '.join(months)}")
+        await asyncio.sleep(interval)
+
+
+async def report_periodically(interval: float, queue: SendQueue, access: AccessMiddleware) -> None:
+    """
+    Фоновая задача: раз в interval секунд проверяет, не наступило ли время
+    плановых отчётов, и ставит их в очередь рассылки.
+    """
+    while True:
+        try:
+            recipients = report_service.get_recipients(access.get_allowed_user_ids())
+            queued = await report_service.send_due_reports(queue, recipients)
+        except Exception as e:
+            # Сбой одной рассылки не должен останавливать следующие
+            print(f"⚠️ Не удалось подготовить отчёты: {e}")
+        else:
+            if queued:
+                print(f"📨 Отчётов в очереди рассылки: {queued}")
+        await asyncio.sleep(interval)
+
+
+def build_dispatcher(access: AccessMiddleware) -> Dispatcher:
+    """Создаёт диспетчер: регистрирует middleware и роутеры хендлеров."""
+    # Состояния сценариев хранятся в SQLite: переживают перезапуск, брошенные удаляются по TTL
+    dp = Dispatcher(storage=SQLiteStorage(FSM_FILE, FSM_TTL, FSM_CACHE_SIZE, FSM_FLUSH_INTERVAL))
+
+    # Полное время обновления замеряется снаружи — вместе с ожиданием слота ниже
+    dp.update.outer_middleware(MetricsMiddleware())
+
+    # Ограничиваем число одновременно обрабатываемых обновлений (в обоих режимах)
+    dp.update.outer_middleware(ConcurrencyLimitMiddleware(HANDLER_CONCURRENCY))
 
     # FSMResetMiddleware идёт первым: если пользователь внутри сценария и набрал /команду,
     # состояние сбрасывается и команда идёт в свой хендлер а не в текущий FSM-обработчик
     dp.message.middleware.register(FSMResetMiddleware())
 
     # Регистрируем middleware доступа на Message и CallbackQuery
-    dp.message.middleware.register(AccessMiddleware())
-    dp.callback_query.middleware.register(AccessMiddleware())
+    dp.message.middleware.register(access)
+    dp.callback_query.middleware.register(access)
+
+    # Учёт (арендатор), с которым работают хендлеры: общий или свой у каждого чата
+    tenant = TenantMiddleware()
+    dp.message.middleware.register(tenant)
+    dp.callback_query.middleware.register(tenant)
+
+    # Ограничение частоты — после проверки доступа, общий лимит на сообщения и кнопки
+    throttling = ThrottlingMiddleware()
+    dp.message.middleware.register(throttling)
+    dp.callback_query.middleware.register(throttling)
+
+    # Время хендлеров — последним, чтобы замерять сам хендлер, а не отказы middleware выше
+    handler_metrics = MetricsMiddleware()
+    dp.message.middleware.register(handler_metrics)
+    dp.callback_query.middleware.register(handler_metrics)
 
     # Регистрируем роутеры хендлеров
     dp.include_router(start.router)
     dp.include_router(add.router)
+    dp.include_router(bulk.router)
+    dp.include_router(import_file.router)
     dp.include_router(list_handler.router)
     dp.include_router(delete.router)
     dp.include_router(edit.router)
     dp.include_router(export.router)
+    dp.include_router(stats.router)
+    dp.include_router(find.router)
+    dp.include_router(metrics_handler.router)
 
     # Echo идёт последним — ловит всё что не обработало остальное
     dp.include_router(echo.router)
 
+    return dp
+
+
+async def run_polling(bot: Bot, dp: Dispatcher) -> None:
+    """Получает обновления long polling'ом."""
     # Удаляем старые обновления при старте (чтобы бот не обрабатывал сообщения из прошлого)
     await bot.delete_webhook(drop_pending_updates=True)
 
-    print("✅ Бот запущен. Ожидаем сообщения...")
-
-    # Запускаем polling
+    print("✅ Бот запущен (polling). Ожидаем сообщения...")
     await dp.start_polling(bot)
 
 
+async def run_webhook(bot: Bot, dp: Dispatcher) -> None:
+    """
+    Принимает обновления встроенным aiohttp-сервером.
+    Каждое обновление обрабатывается фоновой задачей, Telegram сразу получает ответ 200.
+    Если WEBHOOK_URL не задан, вебхук у Telegram не регистрируется — сервер
+    можно проверить локально, отправляя ему записанные обновления (tools/post_update.py).
+    """
+    if not WEBHOOK_SECRET:
+        raise RuntimeError("Для режима webhook нужно задать WEBHOOK_SECRET")
+
+    app = web.Application()
+    SimpleRequestHandler(dispatcher=dp, bot=bot, secret_token=WEBHOOK_SECRET).register(app, path=WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT).start()
+
+        if WEBHOOK_URL:
+            await bot.set_webhook(
+                url=WEBHOOK_URL + WEBHOOK_PATH,
+                secret_token=WEBHOOK_SECRET,
+                drop_pending_updates=True,
+            )
+
+        print(f"✅ Бот запущен (webhook) на {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}. Ожидаем сообщения...")
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+async def main() -> None:
+    """Точка входа: инициализация бота и хранилища, запуск в выбранном режиме."""
+    bot = Bot(token=TELEGRAM_BOT_TOKEN)
+    # Список доступа нужен и диспетчеру, и рассылке отчётов (перечитывается при изменении ENV_FILE)
+    access = AccessMiddleware()
+    dp = build_dispatcher(access)
+
+    # Загружаем книгу в память один раз (с проигрыванием журнала) — дальше чтения не трогают диск
+    await async_expense_service.load_storage()
+    flush_task = asyncio.create_task(flush_periodically(FLUSH_INTERVAL))
+    archive_task = asyncio.create_task(archive_periodically(ARCHIVE_INTERVAL))
+
+    # Плановые отчёты уходят через очередь с лимитами Telegram, мимо ответов на команды
+    send_queue = SendQueue(SEND_RATE, SEND_CHAT_INTERVAL, SEND_GROUP_INTERVAL)
+    send_queue.start(bot)
+    report_task = None
+    if REPORT_DIGEST != "off" or REPORT_MONTH_CLOSE:
+        report_task = asyncio.create_task(report_periodically(REPORT_CHECK_INTERVAL, send_queue, access))
+
+    # Локальный эндпоинт метрик для Prometheus
+    metrics_runner = await metrics.start_server(METRICS_HOST, METRICS_PORT) if METRICS_PORT else None
+
+    try:
+        if BOT_MODE == "webhook":
+            await run_webhook(bot, dp)
+        else:
+            await run_polling(bot, dp)
+    finally:
+        # При остановке сохраняем всё, что ещё не записано
+        flush_task.cancel()
+        archive_task.cancel()
+        if report_task is not None:
+            report_task.cancel()
+        await send_queue.close(timeout=5)
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        await async_expense_service.shutdown()
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
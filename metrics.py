@@ -0,0 +1,179 @@
+"""
+Метрики задержек и размеров файлов в процессе бота.
+
+Гистограммы с фиксированными корзинами и gauge-значения хранятся в памяти
+и отдаются в текстовом формате Prometheus (GET /metrics на METRICS_PORT)
+и сводкой в админской команде /metrics. Запись метрик идёт и из потоков
+хранилища, поэтому реестр защищён lock'ом.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from aiohttp import web
+
+# Верхние границы корзин гистограмм (секунды); последняя корзина — +Inf
+BUCKETS: tuple[float, ...] = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Описания метрик для # HELP
+HELP: dict[str, str] = {
+    "bot_update_seconds": "Полная обработка обновления, включая ожидание свободного слота",
+    "bot_handler_seconds": "Выполнение хендлера, включая его запросы к Telegram API",
+    "bot_handler_errors_total": "Вызовы хендлеров, завершившиеся исключением",
+    "storage_operation_seconds": "Операции хранилища: load, scan, save, journal_sync, export",
+    "storage_file_bytes": "Размер файлов хранилища на диске",
+    "storage_stores_open": "Открытые хранилища арендаторов",
+    "storage_store_evictions_total": "Хранилища арендаторов, закрытые при вытеснении из кэша",
+    "bot_send_queue_size": "Сообщения в очереди исходящей рассылки",
+    "bot_send_messages_total": "Попытки отправки из очереди рассылки по результату",
+}
+
+Labels = tuple[tuple[str, str], ...]
+
+
+class Histogram:
+    """Гистограмма: число наблюдений по корзинам, их сумма и количество."""
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """Учитывает одно наблюдение."""
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                break
+        else:
+            i = len(BUCKETS)
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Оценка квантиля линейной интерполяцией внутри корзины (как histogram_quantile)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for i, count in enumerate(self.counts):
+            upper = BUCKETS[i] if i < len(BUCKETS) else BUCKETS[-1]
+            if count and seen + count >= rank:
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+            lower = upper
+        return BUCKETS[-1]
+
+
+_lock = threading.Lock()
+_histograms: dict[str, dict[Labels, Histogram]] = {}
+_values: dict[str, dict[Labels, float]] = {}
+
+
+def _labels(labels: dict[str, str]) -> Labels:
+    return tuple(sorted(labels.items()))
+
+
+def observe(name: str, seconds: float, **labels: str) -> None:
+    """Добавляет наблюдение в гистограмму name с метками labels."""
+    key = _labels(labels)
+    with _lock:
+        series = _histograms.setdefault(name, {})
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram()
+        histogram.observe(seconds)
+
+
+def inc(name: str, amount: float = 1, **labels: str) -> None:
+    """Увеличивает счётчик name."""
+    key = _labels(labels)
+    with _lock:
+        series = _values.setdefault(name, {})
+        series[key] = series.get(key, 0) + amount
+
+
+def set_value(name: str, value: float, **labels: str) -> None:
+    """Устанавливает gauge name."""
+    with _lock:
+        _values.setdefault(name, {})[_labels(labels)] = value
+
+
+@contextmanager
+def timed(name: str, **labels: str) -> Iterator[None]:
+    """Замеряет время блока и добавляет его в гистограмму name."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def get_histograms(name: str) -> dict[Labels, Histogram]:
+    """Копия гистограмм метрики name по наборам меток (для сводки /metrics)."""
+    with _lock:
+        series = _histograms.get(name, {})
+        snapshot = {}
+        for key, histogram in series.items():
+            copy = snapshot[key] = Histogram()
+            copy.counts, copy.sum, copy.count = list(histogram.counts), histogram.sum, histogram.count
+        return snapshot
+
+
+def get_values(name: str) -> dict[Labels, float]:
+    """Копия значений счётчика или gauge name по наборам меток."""
+    with _lock:
+        return dict(_values.get(name, {}))
+
+
+# --- Формат Prometheus ---
+
+
+def _escape(value: str) -> str:
+    """Экранирует значение метки по правилам формата Prometheus."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels, extra: tuple[str, str] | None = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in items) + "}"
+
+
+def render() -> str:
+    """Все метрики в текстовом формате экспозиции Prometheus."""
+    lines: list[str] = []
+    with _lock:
+        for name, series in sorted(_histograms.items()):
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in sorted(series.items()):
+                cumulative = 0
+                for bound, count in zip((*BUCKETS, "+Inf"), histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels, ('le', str(bound)))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        for name, series in sorted(_values.items()):
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} {'counter' if name.endswith('_total') else 'gauge'}")
+            for labels, value in sorted(series.items()):
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+async def _handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(text=render(), content_type="text/plain", charset="utf-8")
+
+
+async def start_server(host: str, port: int) -> web.AppRunner:
+    """Запускает HTTP-сервер с GET /metrics. Возвращает runner для остановки (runner.cleanup())."""
+    app = web.Application()
+    app.router.add_get("/metrics", _handle_metrics)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
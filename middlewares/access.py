@@ -1,17 +1,30 @@
+import time
+from pathlib import Path
 from typing import Any, Callable, Awaitable
 
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject, Message, CallbackQuery
+from dotenv import dotenv_values
 
-from config import ALLOWED_USER_IDS
+from config import ALLOWED_USER_IDS, ALLOWLIST_CHECK_INTERVAL, ENV_FILE, parse_user_ids
 
 
 class AccessMiddleware(BaseMiddleware):
     """
     Middleware, который проверяет user_id входящего сообщения.
-    Если пользователь не входит в список ALLOWED_USER_IDS — отправляет отказ.
+    Если пользователь не входит в ALLOWED_USER_IDS — отправляет отказ.
+    Проверка — поиск во frozenset. Не чаще раза в check_interval секунд
+    сверяется mtime env-файла: если файл изменился, список перечитывается
+    без перезапуска бота.
     """
 
+    def __init__(self, env_file: Path = ENV_FILE, check_interval: float = ALLOWLIST_CHECK_INTERVAL) -> None:
+        self.env_file = env_file
+        self.check_interval = check_interval
+        self.allowed_user_ids: frozenset[int] = ALLOWED_USER_IDS
+        self._env_mtime = _mtime(env_file)
+        self._next_check = time.monotonic() + check_interval
+
     async def __call__(
         self,
         handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
@@ -27,7 +40,7 @@ class AccessMiddleware(BaseMiddleware):
             user_id = event.from_user.id
 
         # Проверяем доступ
-        if user_id is not None and user_id not in ALLOWED_USER_IDS:
+        if user_id is not None and user_id not in self.get_allowed_user_ids():
             if isinstance(event, Message):
                 await event.answer("У вас нет доступа к этому боту.")
             elif isinstance(event, CallbackQuery):
@@ -37,3 +50,26 @@ class AccessMiddleware(BaseMiddleware):
 
         # Доступ есть — передаём дальше
         return await handler(event, data)
+
+    def get_allowed_user_ids(self) -> frozenset[int]:
+        """Возвращает список доступа, перечитав его, если env-файл изменился."""
+        now = time.monotonic()
+        if now < self._next_check:
+            return self.allowed_user_ids
+        self._next_check = now + self.check_interval
+
+        mtime = _mtime(self.env_file)
+        if mtime is not None and mtime != self._env_mtime:
+            self._env_mtime = mtime
+            raw = dotenv_values(self.env_file).get("ALLOWED_USER_IDS")
+            if raw is not None:
+                self.allowed_user_ids = parse_user_ids(raw)
+        return self.allowed_user_ids
+
+
+def _mtime(path: Path) -> int | None:
+    """mtime файла в наносекундах или None, если файла нет."""
+    try:
+        return path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,25 @@
+import asyncio
+from typing import Any, Callable, Awaitable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+
+class ConcurrencyLimitMiddleware(BaseMiddleware):
+    """
+    Outer-middleware на Update: ограничивает число одновременно обрабатываемых обновлений.
+    Обновления приходят конкурентно (задачами polling или фоновыми задачами вебхука),
+    а семафор не даёт всплеску запросов разом занять все потоки хранилища.
+    """
+
+    def __init__(self, limit: int) -> None:
+        self._semaphore = asyncio.Semaphore(limit)
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        async with self._semaphore:
+            return await handler(event, data)
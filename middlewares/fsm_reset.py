@@ -6,7 +6,9 @@ from aiogram.fsm.context import FSMContext
 
 
 # Команды бота которые должны прерывать любой текущий FSM-сценарий
-INTERRUPTIBLE_COMMANDS = {"/add", "/edit", "/delete", "/list", "/export", "/start"}
+INTERRUPTIBLE_COMMANDS = {
+    "/add", "/bulk", "/import", "/edit", "/delete", "/list", "/export", "/stats", "/find", "/metrics", "/start",
+}
 
 
 class FSMResetMiddleware(BaseMiddleware):
@@ -24,12 +26,13 @@ class FSMResetMiddleware(BaseMiddleware):
         event: Message,
         data: dict[str, Any],
     ) -> Any:
-        # Работаем только с текстовыми сообщениями
-        if not event.text:
+        # Работаем только с текстовыми сообщениями и подписями к файлам (/import)
+        text = event.text or event.caption
+        if not text or not text.strip():
             return await handler(event, data)
 
         # Проверяем: текст — это одна из наших команд?
-        command = event.text.strip().split()[0].lower()
+        command = text.strip().split()[0].lower()
         if command not in INTERRUPTIBLE_COMMANDS:
             return await handler(event, data)
 
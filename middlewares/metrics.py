@@ -0,0 +1,38 @@
+import time
+from typing import Any, Callable, Awaitable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+import metrics
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """
+    Замеряет время обработки событий.
+    Как outer-middleware на Update пишет полное время обновления (bot_update_seconds),
+    как middleware на Message/CallbackQuery — время конкретного хендлера
+    (bot_handler_seconds с меткой handler) и число его ошибок.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        # Хендлер, выбранный фильтрами, известен только во внутренних middleware
+        handler_object = data.get("handler")
+        if handler_object is None:
+            with metrics.timed("bot_update_seconds"):
+                return await handler(event, data)
+
+        name = getattr(handler_object.callback, "__name__", "unknown")
+        start = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            metrics.inc("bot_handler_errors_total", handler=name)
+            raise
+        finally:
+            metrics.observe("bot_handler_seconds", time.perf_counter() - start, handler=name)
@@ -0,0 +1,43 @@
+from typing import Any, Callable, Awaitable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Message, CallbackQuery
+
+from config import TENANT_MODE
+from repository.tenants import DEFAULT_TENANT, use_tenant
+
+
+class TenantMiddleware(BaseMiddleware):
+    """
+    Выбирает учёт (арендатора), с которым работает хендлер.
+    В режиме "chat" у каждого чата свой учёт: арендатор — id чата сообщения
+    (для кнопок — чата сообщения с кнопкой). В режиме "single" все работают
+    с общим учётом. Арендатор выставляется в contextvar на время обработки,
+    и хранилище берёт из него, с чьими файлами работать.
+    """
+
+    def __init__(self, mode: str = TENANT_MODE) -> None:
+        self.mode = mode
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        tenant = self._resolve(event)
+        data["tenant"] = tenant
+        with use_tenant(tenant):
+            return await handler(event, data)
+
+    def _resolve(self, event: TelegramObject) -> str:
+        if self.mode != "chat":
+            return DEFAULT_TENANT
+        if isinstance(event, Message):
+            return str(event.chat.id)
+        if isinstance(event, CallbackQuery):
+            # У старых сообщений Telegram может не прислать сообщение — тогда учёт пользователя
+            if event.message is not None:
+                return str(event.message.chat.id)
+            return str(event.from_user.id)
+        return DEFAULT_TENANT
@@ -0,0 +1,120 @@
+import math
+import time
+from typing import Any, Callable, Awaitable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Message, CallbackQuery
+
+from config import THROTTLE_RATE, THROTTLE_BURST, COMMAND_COSTS
+
+
+class _TokenBucket:
+    """«Ведро» токенов пользователя: пополняется со скоростью rate, вмещает не больше capacity."""
+
+    def __init__(self, capacity: float) -> None:
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        # Предупреждали ли пользователя с момента последнего пропущенного запроса
+        self.warned = False
+
+    def take(self, cost: float, rate: float, capacity: float) -> float:
+        """
+        Списывает cost токенов. Возвращает 0, если запрос пропущен,
+        иначе — сколько секунд ждать, пока токенов хватит.
+        """
+        now = time.monotonic()
+        self.tokens = min(capacity, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / rate
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Ограничивает частоту запросов пользователя token bucket'ом.
+    Каждая команда списывает свою стоимость из COMMAND_COSTS (по умолчанию 1),
+    поэтому /export и /list исчерпывают лимит быстрее шагов сценариев.
+    Повтор команды или нажатие той же кнопки, пока предыдущее ещё обрабатывается,
+    отбрасывается без списания токенов.
+    Регистрируется после AccessMiddleware — «вёдра» заводятся только для допущенных
+    пользователей. Один экземпляр вешается и на Message, и на CallbackQuery,
+    чтобы лимит был общим.
+    """
+
+    def __init__(
+        self,
+        rate: float = THROTTLE_RATE,
+        capacity: float = THROTTLE_BURST,
+        costs: dict[str, float] = COMMAND_COSTS,
+    ) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.costs = costs
+        self._buckets: dict[int, _TokenBucket] = {}
+        # Выполняющиеся сейчас команды: (user_id, текст команды или callback_data)
+        self._in_flight: set[tuple[int, str]] = set()
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        if isinstance(event, Message) and event.from_user is not None:
+            user_id = event.from_user.id
+            # Команда может быть и в подписи к файлу (/import)
+            command = _parse_command(event.text or event.caption)
+            # Обычный текст (шаг сценария) не склеиваем — у каждого сообщения своё содержимое
+            # Файлы с одинаковой подписью — тоже разные запросы
+            flight_key = event.text.strip() if command is not None and event.text else None
+        elif isinstance(event, CallbackQuery):
+            user_id = event.from_user.id
+            command = event.data.split(":", 1)[0] if event.data else None
+            flight_key = event.data
+        else:
+            return await handler(event, data)
+
+        if flight_key is not None and (user_id, flight_key) in self._in_flight:
+            if isinstance(event, CallbackQuery):
+                await event.answer("⏳ Уже выполняется…")
+            return
+
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            bucket = self._buckets[user_id] = _TokenBucket(self.capacity)
+
+        # Стоимость не больше ёмкости, иначе команда не прошла бы никогда
+        cost = min(self.costs.get(command, 1), self.capacity)
+        wait = bucket.take(cost, self.rate, self.capacity)
+        if wait:
+            # Предупреждаем один раз, а не отвечаем на каждое сообщение флуда
+            if not bucket.warned:
+                bucket.warned = True
+                text = f"⏳ Слишком много запросов. Повторите через {math.ceil(wait)} с."
+                if isinstance(event, Message):
+                    await event.answer(text)
+                else:
+                    await event.answer(text, show_alert=True)
+            elif isinstance(event, CallbackQuery):
+                await event.answer()
+            return
+        bucket.warned = False
+
+        if flight_key is None:
+            return await handler(event, data)
+
+        self._in_flight.add((user_id, flight_key))
+        try:
+            return await handler(event, data)
+        finally:
+            self._in_flight.discard((user_id, flight_key))
+
+
+def _parse_command(text: str | None) -> str | None:
+    """Имя команды из текста сообщения ('/list@bot 2026_02' → 'list') или None для обычного текста."""
+    if not text or not text.startswith("/"):
+        return None
+    return text.split(maxsplit=1)[0][1:].split("@", 1)[0].lower()
@@ -0,0 +1,176 @@
+import calendar
+import hashlib
+from datetime import date, datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, ContextManager, Iterator, Protocol
+
+if TYPE_CHECKING:
+    # month_table сам импортирует base
+    from repository.month_table import MonthTable
+
+# Заголовок листа месяца (и колонок выгрузки)
+HEADER_ROW: list[str] = ["ID", "Дата", "Категория", "Сумма", "Комментарий"]
+
+# Формат даты, в котором записи показываются пользователю (и хранились в старых xlsx строкой)
+DATE_FORMAT: str = "%d.%m.%Y"
+
+# Тот же формат для ячеек xlsx, где дата хранится типизированным значением
+EXCEL_DATE_FORMAT: str = "DD.MM.YYYY"
+
+MONTH_NAMES: list[str] = [
+    "Январь", "Февраль", "Март", "Апрель", "Май", "Июнь",
+    "Июль", "Август", "Сентябрь", "Октябрь", "Ноябрь", "Декабрь",
+]
+
+
+class ExpenseRepository(Protocol):
+    """
+    Интерфейс хранилища расходов.
+    Реализуется модулями repository.excel_repo и repository.sqlite_repo,
+    нужный выбирается в services.expense_service по config.STORAGE_BACKEND.
+    Параметр month — ключ месяца ('2026_02'); None означает текущий месяц.
+    Функции работают с данными текущего арендатора (repository.tenants),
+    кроме flush, close и archive_closed_months — они обходят все открытые хранилища.
+    Параметр version у изменения и удаления — версия записи из get_expense
+    (get_expense_version): если запись с тех пор изменили, операция не выполняется
+    и возвращает False; None — без проверки.
+    """
+
+    def load(self) -> None: ...
+
+    def flush(self) -> bool: ...
+
+    def close(self) -> None: ...
+
+    def batch(self) -> ContextManager[None]: ...
+
+    def archive_closed_months(self) -> list[str]: ...
+
+    def add_expense(self, category: str, amount: float, comment: str | None = None) -> int: ...
+
+    def add_expenses(self, items: list[tuple[str, float, str | None]]) -> list[int]: ...
+
+    def import_expenses(self, items: list[tuple[str, date, str, float, str | None]]) -> int: ...
+
+    def list_months(self) -> list[str]: ...
+
+    def iter_expenses(self, month: str | None = None) -> Iterator[dict]: ...
+
+    def iter_expenses_between(self, date_from: date, date_to: date) -> Iterator[dict]: ...
+
+    def get_all_expenses(self, month: str | None = None) -> list[dict]: ...
+
+    def has_expenses(self, month: str | None = None) -> bool: ...
+
+    def count_expenses(self, month: str | None = None) -> int: ...
+
+    def get_expenses_page(self, offset: int, limit: int, month: str | None = None) -> list[dict]: ...
+
+    def search_expenses(self, query: str, offset: int, limit: int) -> tuple[int, list[dict]]: ...
+
+    def get_month_table(self, month: str | None = None) -> "MonthTable": ...
+
+    def get_month_total(self, month: str | None = None) -> float: ...
+
+    def get_month_summary(self, month: str) -> dict[str, tuple[float, int]]: ...
+
+    def rebuild_rollups(self) -> None: ...
+
+    def expense_exists(self, expense_id: int, month: str | None = None) -> bool: ...
+
+    def get_expense(self, expense_id: int, month: str | None = None) -> dict | None: ...
+
+    def delete_expense(self, expense_id: int, month: str | None = None, version: str | None = None) -> bool: ...
+
+    def update_expense_category(
+        self, expense_id: int, new_category: str, month: str | None = None, version: str | None = None
+    ) -> bool: ...
+
+    def update_expense_amount(
+        self, expense_id: int, new_amount: float, month: str | None = None, version: str | None = None
+    ) -> bool: ...
+
+    def update_expense_comment(
+        self, expense_id: int, new_comment: str, month: str | None = None, version: str | None = None
+    ) -> bool: ...
+
+    def get_data_version(self) -> int: ...
+
+    def build_export_file(self, path: Path, date_from: date | None = None, date_to: date | None = None) -> Path: ...
+
+
+def get_current_month() -> str:
+    """Возвращает ключ текущего месяца (он же имя листа), например '2026_02'."""
+    return get_month_key(date.today())
+
+
+def get_month_key(day: date) -> str:
+    """Возвращает ключ месяца, к которому относится дата: 2026-02-15 → '2026_02'."""
+    return f"{day.year}_{day.month:02d}"
+
+
+def get_month_bounds(month: str) -> tuple[date, date]:
+    """Возвращает первый и последний день месяца по ключу."""
+    year, month_num = map(int, month.split("_"))
+    return date(year, month_num, 1), date(year, month_num, calendar.monthrange(year, month_num)[1])
+
+
+def get_months_between(date_from: date, date_to: date) -> list[str]:
+    """Возвращает ключи всех месяцев, которые задевает диапазон дат (включительно)."""
+    months = []
+    year, month_num = date_from.year, date_from.month
+    while (year, month_num) <= (date_to.year, date_to.month):
+        months.append(f"{year}_{month_num:02d}")
+        year, month_num = (year + 1, 1) if month_num == 12 else (year, month_num + 1)
+    return months
+
+
+def get_previous_month(month: str) -> str:
+    """Возвращает ключ предыдущего месяца: '2026_01' → '2025_12'."""
+    year, month_num = map(int, month.split("_"))
+    if month_num == 1:
+        return f"{year - 1}_12"
+    return f"{year}_{month_num - 1:02d}"
+
+
+def get_month_label(month: str) -> str:
+    """Возвращает читаемую метку месяца по ключу: '2026_02' → 'Февраль 2026'."""
+    year, month_num = map(int, month.split("_"))
+    return f"{MONTH_NAMES[month_num - 1]} {year}"
+
+
+def parse_date(value) -> date | None:
+    """
+    Приводит дату из хранилища к datetime.date.
+    Понимает типизированные ячейки xlsx, строки '%d.%m.%Y' (старые записи) и ISO.
+    Возвращает None если значение не похоже на дату.
+    """
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str):
+        for fmt in (DATE_FORMAT, "%Y-%m-%d"):
+            try:
+                return datetime.strptime(value.strip(), fmt).date()
+            except ValueError:
+                continue
+    return None
+
+
+def get_expense_version(expense: dict) -> str:
+    """
+    Версия записи — короткий хэш её полей. get_expense отдаёт её вместе с записью,
+    а изменение или удаление с version выполняется, только если запись с тех пор
+    не менялась. Поля нормализуются, поэтому версия не зависит от того, как
+    хранилище вернуло значение (350 или 350.0, дата ячейкой или текстом).
+    """
+    amount = expense["amount"]
+    expense_date = parse_date(expense["date"])
+    content = "\x1f".join([
+        expense_date.isoformat() if expense_date is not None else str(expense["date"]),
+        str(expense["category"]),
+        f"{amount:.2f}" if isinstance(amount, (int, float)) else str(amount),
+        expense["comment"] or "",
+    ])
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=8).hexdigest()
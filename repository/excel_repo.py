@@ -1,69 +1,951 @@
-from datetime import datetime
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date
 from pathlib import Path
+from typing import Iterator
 
 from openpyxl import Workbook, load_workbook
 from openpyxl.worksheet.worksheet import Worksheet
 
-from config import DATA_DIR
+import metrics
+from config import DATA_DIR, JOURNAL_MAX_ENTRIES, MONTH_TABLE_CACHE_SIZE, TENANT_CACHE_SIZE
+from repository.file_lock import FileLock
+from repository.base import (
+    HEADER_ROW, EXCEL_DATE_FORMAT, get_current_month, get_expense_version, get_month_key, get_months_between,
+    parse_date,
+)
+from repository.month_table import MonthTable
+from repository.rollups import Rollups
+from repository.search_index import SearchIndex
+from repository.tenants import StoreCache, get_tenant, get_tenant_dir
+from repository.xlsx_export import write_workbook
 
 # Путь к единственному файлу со всеми данными
 EXPENSES_FILE: Path = DATA_DIR / "expenses.xlsx"
 
+# Файл, который собирается из книги в памяти для /export
+EXPORT_FILE: Path = DATA_DIR / "export.xlsx"
+
+# Журнал изменений, ещё не перенесённых в expenses.xlsx (JSON по строке на операцию)
+JOURNAL_FILE: Path = DATA_DIR / "expenses.journal"
+
+# Lock-файл для согласования процессов, работающих с одной DATA_DIR
+LOCK_FILE: Path = DATA_DIR / "expenses.lock"
+
+# Обратный индекс по комментариям для /find; сохраняется при каждой компактизации
+SEARCH_INDEX_FILE: Path = DATA_DIR / "expenses.index.json"
+
+# Хэши строк, уже загруженных /import: повторная загрузка той же выписки их пропускает
+IMPORTS_FILE: Path = DATA_DIR / "expenses.imports.json"
+
+# Архив закрытых месяцев: по неизменяемому файлу на месяц и манифест с их сводками
+ARCHIVE_DIR: Path = DATA_DIR / "archive"
+ARCHIVE_MANIFEST: Path = ARCHIVE_DIR / "manifest.json"
+
+# Имя листа месяца: '2026_02'
+MONTH_KEY_RE = re.compile(r"\d{4}_\d{2}")
+
+# Номера колонок редактируемых полей
+FIELD_COLUMNS: dict[str, int] = {"category": 3, "amount": 4, "comment": 5}
+
+
+class _SheetIndex:
+    """
+    Индекс листа месяца: счётчик максимального ID и соответствие ID → номер строки.
+    Строится одним проходом при первом обращении к листу и дальше
+    поддерживается при добавлении и удалении строк.
+    Поиск и добавление — O(1). Удаление — O(строк листа): номера строк ниже
+    удалённой сдвигаются. Это осознанный компромисс: ws.delete_rows в openpyxl
+    сам переносит все ячейки ниже удалённой строки, так что удаление и без
+    индекса линейное, а проход по словарю ID → строка дешевле переноса ячеек.
+    Ленивое перестроение по флагу потребовало бы повторного обхода листа
+    через openpyxl при следующем обращении — это дороже.
+    """
+
+    def __init__(self, ws: Worksheet) -> None:
+        self.max_id = 0
+        self.rows: dict[int, int] = {}
+        # Номер последней строки листа: ws.max_row каждый раз обходит все ячейки,
+        # поэтому считаем его один раз и дальше поддерживаем сами
+        self.last_row = ws.max_row
+        for row_idx, (expense_id,) in enumerate(
+            ws.iter_rows(min_row=2, max_col=1, values_only=True), start=2
+        ):
+            if expense_id is None:
+                continue
+            self.rows[expense_id] = row_idx
+            self.max_id = max(self.max_id, expense_id)
+
+    def next_id(self) -> int:
+        """
+        Следующий ID — счётчик + 1. Счётчик не уменьшается при удалении,
+        поэтому ID всегда растёт вверх, даже если удалена последняя запись.
+        """
+        return self.max_id + 1
+
+    def appended(self, expense_id: int, row_idx: int) -> None:
+        """Учитывает строку, добавленную в конец листа."""
+        self.rows[expense_id] = row_idx
+        self.max_id = max(self.max_id, expense_id)
+        self.last_row = max(self.last_row, row_idx)
+
+    def deleted(self, expense_id: int) -> None:
+        """Учитывает удаление строки: строки ниже неё сдвигаются на одну вверх (O(строк), см. класс)."""
+        deleted_row = self.rows.pop(expense_id)
+        self.last_row -= 1
+        for other_id, row_idx in self.rows.items():
+            if row_idx > deleted_row:
+                self.rows[other_id] = row_idx - 1
+
+
+class _ExpenseStore:
+    """
+    Процессный кэш книги expenses.xlsx.
+    Книга читается с диска один раз, все чтения и изменения идут в памяти.
+    Каждое изменение сначала дописывается в журнал (append + fsync), поэтому
+    запись дешёвая и переживает падение процесса. Периодически flush() переносит
+    журнал в xlsx (компактизация) и очищает его; при старте незавершённый
+    журнал проигрывается заново.
+    Публичные функции репозитория работают с кэшем под lock, поэтому их можно
+    вызывать из пула потоков.
+
+    Закрытые месяцы переносятся в архив (archive_months): в expenses.xlsx
+    остаются только открытые листы, поэтому загрузка и компактизация не
+    растут с историей. Архивные месяцы читаются потоково из своих файлов,
+    а их агрегаты берутся из манифеста.
+
+    Поисковый индекс комментариев (search_index) поддерживается теми же
+    операциями, что и агрегаты, и сохраняется рядом с книгой при компактизации,
+    поэтому при старте не перестраивается.
+    Хэши импортированных строк (import_hashes) приходят в журнал вместе с
+    записями импорта и сохраняются так же, до очистки журнала.
+
+    Месяцы, которые читаются целиком (архивные, частично задетые периоды),
+    кэшируются в колоночном виде (MonthTable) — LRU на MONTH_TABLE_CACHE_SIZE
+    месяцев. Таблица открытого месяца выбрасывается при любом его изменении,
+    архивного — живёт, пока не вытеснена: файл архива не меняется.
+
+    Несколько процессов (воркеры бота, отчётные скрипты) могут делить одну
+    DATA_DIR: изменения и компактизация идут под межпроцессной блокировкой
+    file_lock, а перед чтением кэш сверяется с диском по отметке xlsx
+    (inode, mtime, размер) и размеру журнала. Дописанный чужой журнал
+    догоняется проигрыванием хвоста, подменённый xlsx — перечитыванием книги.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        journal_path: Path,
+        lock_path: Path,
+        archive_dir: Path,
+        search_index_path: Path,
+        imports_path: Path,
+    ) -> None:
+        self.path = path
+        self.journal_path = journal_path
+        self.search_index_path = search_index_path
+        self.imports_path = imports_path
+        self.archive_dir = archive_dir
+        # Манифест архива: ключ месяца → {file, rows, summary}; читается лениво
+        self._archive: dict[str, dict] | None = None
+        self.lock = threading.RLock()
+        self.file_lock = FileLock(lock_path)
+        # Отметка xlsx и позиция в журнале, до которых кэш согласован с диском
+        self._file_stamp: tuple | None = None
+        self._journal_offset = 0
+        self._wb: Workbook | None = None
+        self._indexes: dict[str, _SheetIndex] = {}
+        self.rollups = Rollups()
+        self.search_index = SearchIndex()
+        self.import_hashes: set[str] = set()
+        self._tables: OrderedDict[str, MonthTable] = OrderedDict()
+        # Появились ли хэши импорта, ещё не сохранённые в imports_path
+        self._imports_dirty = False
+        self._loaded = False
+        self._dirty = False
+        self._journal = None
+        self._journal_entries = 0
+        # Глубина вложенности batch(): внутри пачки fsync журнала откладывается до её конца
+        self._batch_depth = 0
+        self._journal_unsynced = False
+        # Версия данных: увеличивается при каждом изменении. Начинается со времени
+        # открытия, чтобы после вытеснения и повторного открытия версии не повторялись
+        self.version = time.time_ns()
+
+    def load(self) -> None:
+        """Читает книгу с диска и проигрывает журнал, если книга ещё не загружена."""
+        if self._loaded:
+            return
+        with self.file_lock.exclusive():
+            self._file_stamp = _file_stamp(self.path)
+            if self._file_stamp is not None:
+                with metrics.timed("storage_operation_seconds", backend="excel", op="load"):
+                    self._wb = load_workbook(self.path)
+                self._drop_archived_sheets()
+            self._loaded = True
+            self.rebuild_rollups()
+            self._load_search_index()
+            self._load_import_hashes()
+            self._replay_journal()
+            self._record_file_sizes()
+
+    def refresh(self) -> None:
+        """
+        Согласует кэш с диском перед чтением. Проверка — два stat без блокировки;
+        только если другой процесс что-то записал, берётся блокировка и кэш догоняется.
+        """
+        if not self._loaded:
+            self.load()
+            return
+        if not self._is_stale():
+            return
+        with self.file_lock.exclusive():
+            self._catch_up()
+
+    @contextmanager
+    def reading(self) -> Iterator[None]:
+        """Блок чтения: lock потоков и кэш, согласованный с диском."""
+        with self.lock:
+            self.refresh()
+            yield
+
+    @contextmanager
+    def writing(self) -> Iterator[None]:
+        """
+        Блок изменения: lock потоков, межпроцессная блокировка и кэш,
+        догнавший чужие записи — поэтому ID и строки считаются по актуальным данным.
+        """
+        with self.lock, self.file_lock.exclusive():
+            if self._loaded:
+                self._catch_up()
+            else:
+                self.load()
+            yield
+
+    def _is_stale(self) -> bool:
+        """Изменились ли файлы данных с момента последней синхронизации кэша."""
+        return (
+            _file_stamp(self.path) != self._file_stamp
+            or _file_size(self.journal_path) != self._journal_offset
+        )
+
+    def _catch_up(self) -> None:
+        """Догоняет изменения других процессов. Вызывается под file_lock."""
+        if _file_stamp(self.path) != self._file_stamp or _file_size(self.journal_path) < self._journal_offset:
+            # Книгу перезаписал другой процесс (компактизация) — перечитываем целиком
+            self._reload()
+        elif _file_size(self.journal_path) > self._journal_offset:
+            # Другой процесс дописал журнал — проигрываем только новый хвост
+            self._replay_journal(self._journal_offset)
+            self.version += 1
+
+    def _reload(self) -> None:
+        """Сбрасывает кэш и читает книгу с журналом заново."""
+        self._unload()
+        self.load()
+        self.version += 1
+
+    def _unload(self) -> None:
+        """Сбрасывает кэш в памяти; изменения, не перенесённые в xlsx, остаются в журнале."""
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        self._wb = None
+        self._archive = None
+        self._indexes.clear()
+        self.rollups.clear()
+        self.search_index.clear()
+        self.import_hashes.clear()
+        self._imports_dirty = False
+        self._tables.clear()
+        self._loaded = False
+        self._dirty = False
+        self._journal_entries = 0
+        self._journal_offset = 0
+        self._journal_unsynced = False
+
+    def close(self) -> None:
+        """
+        Переносит журнал в xlsx и освобождает память и файлы хранилища
+        (при вытеснении из кэша арендаторов и при остановке).
+        При следующем обращении книга загрузится заново.
+        """
+        with self.lock:
+            if self._loaded:
+                with self.writing():
+                    self.flush()
+                self._unload()
+            self.file_lock.close()
+
+    def rebuild_rollups(self) -> None:
+        """Пересчитывает агрегаты по всем листам книги одним проходом; архивные — из манифеста."""
+        with metrics.timed("storage_operation_seconds", backend="excel", op="scan"):
+            self.rollups.clear()
+            for month, entry in self.get_archive().items():
+                for category, (amount, count) in entry["summary"].items():
+                    self.rollups.add(month, category, amount, count)
+            for ws in self.get_sheets():
+                for _, _, category, amount in ws.iter_rows(min_row=2, max_col=4, values_only=True):
+                    if category is not None:
+                        self.rollups.add(ws.title, category, _as_number(amount))
+
+    def _load_search_index(self) -> None:
+        """
+        Читает поисковый индекс, сохранённый при последней компактизации.
+        Индекс годится, только если записан для этой же версии xlsx (по отметке
+        файла); иначе (падение между сохранением книги и индекса, первый запуск)
+        он строится заново по листам книги и файлам архива.
+        Изменения из журнала доиндексируются при его проигрывании.
+        """
+        try:
+            with open(self.search_index_path, encoding="utf-8") as f:
+                saved = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            saved = None
+
+        stamp = list(self._file_stamp) if self._file_stamp is not None else None
+        if saved is not None and saved["stamp"] == stamp:
+            self.search_index.load_dict(saved["tokens"])
+            return
+
+        with metrics.timed("storage_operation_seconds", backend="excel", op="scan"):
+            self.search_index.clear()
+            for month in self.get_archive():
+                for expense in iter_file_expenses(self.get_shard_path(month), month):
+                    self.search_index.add(month, expense["id"], expense["comment"])
+            for ws in self.get_sheets():
+                for row in ws.iter_rows(min_row=2, max_col=5, values_only=True):
+                    if row[0] is not None:
+                        self.search_index.add(ws.title, row[0], row[4])
+
+    def _save_search_index(self) -> None:
+        """Сохраняет поисковый индекс с отметкой только что записанной xlsx."""
+        _write_json(self.search_index_path, {
+            "stamp": list(self._file_stamp),
+            "tokens": self.search_index.to_dict(),
+        })
+
+    def _load_import_hashes(self) -> None:
+        """
+        Читает хэши строк, импортированных до последней компактизации.
+        Хэши из журнала добавятся при его проигрывании.
+        """
+        try:
+            with open(self.imports_path, encoding="utf-8") as f:
+                self.import_hashes = set(json.load(f)["hashes"])
+        except FileNotFoundError:
+            self.import_hashes = set()
+
+    def _save_import_hashes(self) -> None:
+        """Сохраняет хэши импорта, если с прошлого сохранения появились новые."""
+        if not self._imports_dirty:
+            return
+        _write_json(self.imports_path, {"hashes": sorted(self.import_hashes)})
+        self._imports_dirty = False
+
+    @property
+    def is_loaded(self) -> bool:
+        """Загружена ли книга в память."""
+        return self._loaded
+
+    def has_pending_journal(self) -> bool:
+        """Есть ли на диске журнал с операциями, ещё не перенесёнными в xlsx."""
+        return self.journal_path.exists() and self.journal_path.stat().st_size > 0
+
+    def get_sheet(self, sheet_name: str) -> Worksheet | None:
+        """Возвращает лист из памяти или None, если такого листа нет."""
+        self.load()
+        if self._wb is None or sheet_name not in self._wb.sheetnames:
+            return None
+        return self._wb[sheet_name]
+
+    def ensure_sheet(self, sheet_name: str) -> Worksheet:
+        """
+        Гарантирует существование книги и листа в памяти.
+        Если книги нет — создаёт её, если листа нет — добавляет его с заголовком.
+        """
+        self.load()
+
+        if self._wb is None:
+            self._wb = Workbook()
+            ws = self._wb.active
+            ws.title = sheet_name
+            ws.append(HEADER_ROW)
+            self._dirty = True
+            return ws
+
+        if sheet_name not in self._wb.sheetnames:
+            ws = self._wb.create_sheet(title=sheet_name)
+            ws.append(HEADER_ROW)
+            self._dirty = True
+            return ws
+
+        return self._wb[sheet_name]
+
+    def get_sheets(self) -> list[Worksheet]:
+        """Возвращает все листы книги в памяти."""
+        self.load()
+        return self._wb.worksheets if self._wb is not None else []
+
+    def live_months(self) -> list[str]:
+        """Ключи месяцев, лист которых лежит в expenses.xlsx, по возрастанию."""
+        self.load()
+        if self._wb is None:
+            return []
+        return sorted(name for name in self._wb.sheetnames if MONTH_KEY_RE.fullmatch(name))
+
+    def list_months(self) -> list[str]:
+        """Индекс месяцев: открытые листы книги и архивные месяцы, по возрастанию."""
+        return sorted({*self.live_months(), *self.get_archive()})
+
+    def get_archive(self) -> dict[str, dict]:
+        """Манифест архива (читается с диска при первом обращении, книгу не загружает)."""
+        if self._archive is None:
+            self._archive = _read_manifest(self.archive_dir / ARCHIVE_MANIFEST.name)
+        return self._archive
+
+    def get_shard_path(self, month: str) -> Path | None:
+        """Файл архива месяца или None, если месяц не архивирован."""
+        entry = self.get_archive().get(month)
+        return self.archive_dir / entry["file"] if entry is not None else None
+
+    def archive_months(self, current_month: str) -> list[str]:
+        """
+        Переносит листы закрытых месяцев (раньше current_month) в архив.
+        Порядок переживает падение на любом шаге: сначала файлы месяцев и манифест
+        (атомарно, с fsync), затем листы убираются из книги и она перезаписывается.
+        Лист, оставшийся в xlsx после падения, отбрасывается при загрузке,
+        а операции журнала над архивными месяцами пропускаются.
+        Вызывается внутри writing(). Возвращает ключи перенесённых месяцев.
+        """
+        closed = [month for month in self.live_months() if month < current_month]
+        if not closed:
+            return []
+
+        archive = dict(self.get_archive())
+        self.archive_dir.mkdir(exist_ok=True)
+        for month in closed:
+            ws = self._wb[month]
+            shard_path = self.archive_dir / f"{month}.xlsx"
+            rows = ws.iter_rows(min_row=2, max_row=self.get_index(month).last_row, values_only=True)
+            write_workbook(shard_path, [(month, (list(row) for row in rows if row[0] is not None))])
+            _fsync_file(shard_path)
+            archive[month] = {
+                "file": shard_path.name,
+                "rows": self.rollups.month_count(month),
+                "summary": {
+                    category: [amount, count]
+                    for category, (amount, count) in self.rollups.month_summary(month).items()
+                },
+            }
+        _write_manifest(self.archive_dir / ARCHIVE_MANIFEST.name, archive)
+        self._archive = archive
+
+        # В книге должен остаться хотя бы один лист — лист текущего месяца
+        self.ensure_sheet(current_month)
+        self._drop_archived_sheets()
+        self._dirty = True
+        self.flush()
+        self.version += 1
+        return closed
+
+    def unarchive_month(self, month: str) -> None:
+        """
+        Возвращает архивный месяц в книгу, чтобы дописать в него записи
+        задним числом (импорт выписки); следующая архивация перенесёт его обратно.
+        Порядок обратный archive_months: сначала книга с листом месяца, затем
+        манифест без него — после падения между ними лист отбрасывается при
+        загрузке, и месяц целиком остаётся в архиве. Агрегаты и поисковый
+        индекс уже учитывают записи месяца. Вызывается внутри writing().
+        """
+        shard_path = self.get_shard_path(month)
+        ws = self.ensure_sheet(month)
+        for row_idx, expense in enumerate(iter_file_expenses(shard_path, month), start=2):
+            values = [expense["id"], expense["date"], expense["category"], expense["amount"], expense["comment"]]
+            for column, value in enumerate(values, start=1):
+                ws.cell(row=row_idx, column=column, value=value)
+            ws.cell(row=row_idx, column=2).number_format = EXCEL_DATE_FORMAT
+        self._indexes.pop(month, None)
+        self._dirty = True
+        self.flush()
+
+        archive = dict(self.get_archive())
+        del archive[month]
+        _write_manifest(self.archive_dir / ARCHIVE_MANIFEST.name, archive)
+        self._archive = archive
+        shard_path.unlink(missing_ok=True)
+
+        # Книгу пишем ещё раз: по смене её отметки другие процессы перечитают и манифест,
+        # иначе они пропускали бы операции над месяцем как уже лежащие в архиве
+        self._dirty = True
+        self.flush()
+        self.version += 1
+
+    def _drop_archived_sheets(self) -> None:
+        """Убирает из книги листы месяцев, которые уже лежат в архиве."""
+        archive = self.get_archive()
+        for name in [name for name in self._wb.sheetnames if name in archive]:
+            self._wb.remove(self._wb[name])
+            self._indexes.pop(name, None)
+            self._dirty = True
+        if not self._wb.worksheets:
+            # Книга без листов не сохраняется — её создаст первое добавление
+            self._wb = None
+
+    def get_month_table(self, month: str) -> MonthTable:
+        """
+        Записи месяца в колоночном виде: из кэша или одним проходом по листу
+        (архивного месяца — по его файлу). Вызывается внутри reading().
+        """
+        table = self._tables.get(month)
+        if table is not None:
+            self._tables.move_to_end(month)
+            return table
+
+        shard_path = self.get_shard_path(month)
+        with metrics.timed("storage_operation_seconds", backend="excel", op="scan"):
+            if shard_path is not None:
+                table = MonthTable.from_expenses(iter_file_expenses(shard_path, month))
+            else:
+                ws = self.get_sheet(month)
+                rows = ws.iter_rows(min_row=2, max_row=self.get_index(month).last_row, values_only=True) if ws else ()
+                table = MonthTable.from_expenses(
+                    expense for expense in map(_row_to_expense, rows) if expense is not None
+                )
+
+        self._tables[month] = table
+        while len(self._tables) > MONTH_TABLE_CACHE_SIZE:
+            self._tables.popitem(last=False)
+        return table
+
+    def get_index(self, sheet_name: str) -> _SheetIndex | None:
+        """Возвращает индекс листа (строит его при первом обращении) или None, если листа нет."""
+        index = self._indexes.get(sheet_name)
+        if index is None:
+            ws = self.get_sheet(sheet_name)
+            if ws is None:
+                return None
+            with metrics.timed("storage_operation_seconds", backend="excel", op="scan"):
+                index = self._indexes[sheet_name] = _SheetIndex(ws)
+        return index
+
+    def find_row(self, sheet_name: str, expense_id: int) -> int | None:
+        """Возвращает номер строки с указанным ID или None, если запись не найдена."""
+        index = self.get_index(sheet_name)
+        return index.rows.get(expense_id) if index is not None else None
+
+    def get_expense(self, month: str, expense_id: int) -> dict | None:
+        """
+        Запись с указанным ID: одна строка листа по индексу,
+        у архивного месяца — из его таблицы. Вызывается внутри reading().
+        """
+        if self.get_shard_path(month) is not None:
+            return self.get_month_table(month).find(expense_id)
+        row_idx = self.find_row(month, expense_id)
+        if row_idx is None:
+            return None
+        row = next(self.get_sheet(month).iter_rows(min_row=row_idx, max_row=row_idx, values_only=True))
+        return _row_to_expense(row)
+
+    def is_unchanged(self, sheet_name: str, expense_id: int, version: str | None) -> bool:
+        """
+        Есть ли запись в листе месяца и совпадает ли её версия с version (None — без проверки).
+        Вызывается внутри writing(), поэтому между проверкой и изменением запись не поменяется.
+        """
+        if self.find_row(sheet_name, expense_id) is None:
+            return False
+        return version is None or get_expense_version(self.get_expense(sheet_name, expense_id)) == version
+
+    def commit(self, op: dict) -> None:
+        """
+        Фиксирует изменение: сначала пишет его в журнал, затем применяет в памяти.
+        Если журнал разросся до JOURNAL_MAX_ENTRIES — сразу переносит его в xlsx.
+        """
+        self._append_journal(op)
+        self._apply(op)
+        self._dirty = True
+        self.version += 1
+
+        if self._journal_entries >= JOURNAL_MAX_ENTRIES and not self._batch_depth:
+            self.flush()
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """
+        Групповая фиксация: изменения внутри блока пишутся в журнал без
+        отдельного fsync, на выходе журнал синхронизируется с диском один раз.
+        Lock хранилища и межпроцессная блокировка удерживаются весь блок.
+        """
+        with self.writing():
+            self._batch_depth += 1
+            try:
+                yield
+            finally:
+                self._batch_depth -= 1
+                if not self._batch_depth:
+                    self._sync_journal()
+                    if self._journal_entries >= JOURNAL_MAX_ENTRIES:
+                        self.flush()
+
+    def flush(self) -> bool:
+        """
+        Компактизация: атомарно записывает книгу на диск и очищает журнал.
+        Вызывается внутри writing(), чтобы в xlsx попали и изменения других процессов.
+        Возвращает True если запись была выполнена.
+        """
+        if not self._dirty or self._wb is None:
+            return False
+
+        # Пишем во временный файл и подменяем — оборванная запись не испортит xlsx,
+        # а читатели в других процессах видят либо старую, либо новую книгу целиком
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with metrics.timed("storage_operation_seconds", backend="excel", op="save"):
+            self._wb.save(tmp_path)
+            with open(tmp_path, "rb") as f:
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            _fsync_dir(self.path.parent)
+
+        # Индекс сохраняется до очистки журнала: после падения между ними
+        # журнал проиграется поверх уже учтённых изменений (операции идемпотентны)
+        self._file_stamp = _file_stamp(self.path)
+        self._save_search_index()
+        self._save_import_hashes()
+        self._truncate_journal()
+        self._dirty = False
+        self._record_file_sizes()
+        return True
+
+    def _record_file_sizes(self) -> None:
+        """Обновляет метрики размеров xlsx и журнала (размеры уже известны кэшу — без stat)."""
+        xlsx_size = self._file_stamp[2] if self._file_stamp is not None else 0
+        metrics.set_value("storage_file_bytes", xlsx_size, file=_metric_file_name(self.path))
+        metrics.set_value("storage_file_bytes", self._journal_offset, file=_metric_file_name(self.journal_path))
+
+    # --- Журнал ---
+
+    def _append_journal(self, op: dict) -> None:
+        """Дописывает операцию в конец журнала; вне batch() сразу дожидается её записи на диск."""
+        if self._journal is None:
+            self._journal = open(self.journal_path, "ab")
+        data = (json.dumps(op, ensure_ascii=False) + "\n").encode("utf-8")
+        # Буфер сбрасываем сразу, чтобы размер файла совпадал с _journal_offset;
+        # откладывается только fsync
+        self._journal.write(data)
+        self._journal.flush()
+        self._journal_offset += len(data)
+        self._journal_entries += 1
+        self._journal_unsynced = True
+        if not self._batch_depth:
+            self._sync_journal()
+
+    def _sync_journal(self) -> None:
+        """Дожидается записи дописанных операций журнала на диск."""
+        if self._journal is None or not self._journal_unsynced:
+            return
+        with metrics.timed("storage_operation_seconds", backend="excel", op="journal_sync"):
+            os.fsync(self._journal.fileno())
+        self._journal_unsynced = False
+        self._record_file_sizes()
+
+    def _truncate_journal(self) -> None:
+        """Очищает журнал после того, как его операции попали в xlsx."""
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+            self._journal_unsynced = False
+        if self.journal_path.exists():
+            with open(self.journal_path, "w", encoding="utf-8") as f:
+                os.fsync(f.fileno())
+        self._journal_entries = 0
+        self._journal_offset = 0
+
+    def _replay_journal(self, offset: int = 0) -> None:
+        """
+        Применяет операции журнала начиная с позиции offset, которые не успели попасть в xlsx.
+        Операции идемпотентны, поэтому повторное применение уже сохранённых безопасно.
+        Оборванная последняя строка (падение во время записи) отрезается,
+        чтобы новые записи не оказались за ней. Вызывается под file_lock,
+        поэтому недописанной чужой строки здесь быть не может.
+        """
+        if not self.journal_path.exists():
+            return
+
+        valid_size = offset
+        with open(self.journal_path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                try:
+                    op = json.loads(line)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    break
+                self._apply(op)
+                self._journal_entries += 1
+                valid_size += len(line)
+
+        if valid_size < self.journal_path.stat().st_size:
+            os.truncate(self.journal_path, valid_size)
+        self._journal_offset = valid_size
+
+        if self._journal_entries:
+            self._dirty = True
+
+    def _apply(self, op: dict) -> None:
+        """Применяет одну операцию журнала к книге в памяти, поддерживая индекс листа и агрегаты."""
+        if op["op"] == "batch":
+            # Пачка операций пишется в журнал одной строкой и применяется целиком
+            for batch_op in op["ops"]:
+                self._apply(batch_op)
+            # У пачки импорта — хэши её строк
+            if op.get("imported"):
+                self.import_hashes.update(op["imported"])
+                self._imports_dirty = True
+            return
+
+        sheet_name = op["sheet"]
+        if sheet_name in self.get_archive():
+            # Операция уже учтена в файле архива месяца
+            return
+        ws = self.ensure_sheet(sheet_name)
+        index = self.get_index(sheet_name)
+        row_idx = index.rows.get(op["id"])
+        # Колоночная копия месяца устарела; следующее чтение соберёт её заново
+        self._tables.pop(sheet_name, None)
+
+        if op["op"] == "add":
+            if row_idx is None:
+                # Дата пишется типизированной ячейкой; старые записи журнала хранят её строкой
+                expense_date = parse_date(op["date"]) or op["date"]
+                # Пишем ячейки по номеру строки из индекса: ws.append после delete_rows
+                # оставил бы пустую строку, а ws.max_row обходит весь лист
+                new_row = index.last_row + 1
+                values = [op["id"], expense_date, op["category"], op["amount"], op["comment"]]
+                for column, value in enumerate(values, start=1):
+                    ws.cell(row=new_row, column=column, value=value)
+                ws.cell(row=new_row, column=2).number_format = EXCEL_DATE_FORMAT
+                index.appended(op["id"], new_row)
+                self.rollups.add(sheet_name, op["category"], _as_number(op["amount"]))
+                self.search_index.add(sheet_name, op["id"], op["comment"])
+            return
+
+        if row_idx is None:
+            return
+
+        category = ws.cell(row=row_idx, column=FIELD_COLUMNS["category"]).value
+        amount = _as_number(ws.cell(row=row_idx, column=FIELD_COLUMNS["amount"]).value)
+
+        if op["op"] == "delete":
+            comment = ws.cell(row=row_idx, column=FIELD_COLUMNS["comment"]).value
+            ws.delete_rows(row_idx)
+            index.deleted(op["id"])
+            self.rollups.remove(sheet_name, category, amount)
+            self.search_index.remove(sheet_name, op["id"], comment)
+        elif op["op"] == "update":
+            cell = ws.cell(row=row_idx, column=FIELD_COLUMNS[op["field"]])
+            old_value = cell.value
+            cell.value = op["value"]
+            if op["field"] == "category":
+                self.rollups.remove(sheet_name, category, amount)
+                self.rollups.add(sheet_name, op["value"], amount)
+            elif op["field"] == "amount":
+                self.rollups.remove(sheet_name, category, amount)
+                self.rollups.add(sheet_name, category, _as_number(op["value"]))
+            elif op["field"] == "comment":
+                self.search_index.remove(sheet_name, op["id"], old_value)
+                self.search_index.add(sheet_name, op["id"], op["value"])
+
+
+def _open_store(tenant: str) -> _ExpenseStore:
+    """Хранилище арендатора: те же файлы, что и у хранилища по умолчанию, но в его папке."""
+    data_dir = get_tenant_dir(tenant)
+    return _ExpenseStore(
+        data_dir / EXPENSES_FILE.name,
+        data_dir / JOURNAL_FILE.name,
+        data_dir / LOCK_FILE.name,
+        data_dir / ARCHIVE_DIR.name,
+        data_dir / SEARCH_INDEX_FILE.name,
+        data_dir / IMPORTS_FILE.name,
+    )
+
+
+# Открытые хранилища арендаторов; вытесненное сбрасывается на диск и освобождает память
+_stores: StoreCache[_ExpenseStore] = StoreCache(TENANT_CACHE_SIZE, _open_store, _ExpenseStore.close, "excel")
+
+
+@contextmanager
+def _current_store() -> Iterator[_ExpenseStore]:
+    """Хранилище текущего арендатора (на время блока защищено от вытеснения)."""
+    with _stores.use(get_tenant()) as store:
+        yield store
+
 
 # --- Вспомогательные функции ---
 
 
-def _get_current_sheet_name() -> str:
-    """Возвращает имя листа для текущего месяца, например '2026_02'."""
-    now = datetime.now()
-    return f"{now.year}_{now.month:02d}"
+def _file_stamp(path: Path) -> tuple[int, int, int] | None:
+    """Отметка файла для обнаружения подмены: (inode, mtime в нс, размер) или None, если файла нет."""
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
 
 
-def _ensure_file_and_sheet() -> tuple[Workbook, Worksheet]:
+def _file_size(path: Path) -> int:
+    """Размер файла; для отсутствующего — 0."""
+    try:
+        return path.stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+def _metric_file_name(path: Path) -> str:
+    """Имя файла для метрик: путь относительно DATA_DIR, чтобы файлы арендаторов различались."""
+    return path.relative_to(DATA_DIR).as_posix() if path.is_relative_to(DATA_DIR) else path.name
+
+
+def _fsync_file(path: Path) -> None:
+    """Дожидается записи содержимого файла на диск."""
+    with open(path, "rb") as f:
+        os.fsync(f.fileno())
+
+
+def _read_manifest(path: Path) -> dict[str, dict]:
+    """Читает манифест архива; без файла архив пуст."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)["months"]
+    except FileNotFoundError:
+        return {}
+
+
+def _write_manifest(path: Path, archive: dict[str, dict]) -> None:
+    """Атомарно записывает манифест архива."""
+    _write_json(path, {"months": dict(sorted(archive.items()))}, indent=1)
+
+
+def _write_json(path: Path, data: dict, indent: int | None = None) -> None:
+    """Атомарно записывает JSON-файл (временный файл, fsync, переименование)."""
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    _fsync_dir(path.parent)
+
+
+def _fsync_dir(path: Path) -> None:
+    """Сбрасывает на диск запись каталога, чтобы переименование файла пережило падение."""
+    if os.name != "posix":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _get_next_id(sheet_name: str) -> int:
+    """Возвращает следующий ID для листа по счётчику из индекса — без обхода строк."""
+    with _current_store() as store:
+        index = store.get_index(sheet_name)
+        return index.next_id() if index is not None else 1
+
+
+def _as_number(value) -> float:
+    """Сумма из ячейки как число; пустые и нечисловые значения считаются нулём."""
+    return value if isinstance(value, (int, float)) else 0.0
+
+
+def _row_to_expense(row: tuple) -> dict | None:
     """
-    Гарантирует существование файла и листа текущего месяца.
-    Если файл не существует — создаёт его.
-    Если лист для текущего месяца не существует — добавляет его с заголовком.
-    Возвращает workbook и лист текущего месяца.
+    Превращает строку листа в словарь записи. Для пустой строки возвращает None.
+    Дата приводится к datetime.date (старые строки хранят её текстом).
     """
-    sheet_name = _get_current_sheet_name()
+    if not row or row[0] is None:
+        return None
+    return {
+        "id": row[0],
+        "date": parse_date(row[1]) or row[1],
+        "category": row[2],
+        "amount": row[3],
+        "comment": row[4] if len(row) > 4 and row[4] else "",
+    }
 
-    if not EXPENSES_FILE.exists():
-        wb = Workbook()
-        ws = wb.active
-        ws.title = sheet_name
-        ws.append(["ID", "Дата", "Категория", "Сумма", "Комментарий"])
-        wb.save(EXPENSES_FILE)
-        return wb, ws
 
-    wb = load_workbook(EXPENSES_FILE)
+def iter_file_expenses(path: Path, sheet_name: str) -> Iterator[dict]:
+    """
+    Потоково читает записи одного листа xlsx-файла с диска.
+    Книга открывается в read-only режиме: разбирается только запрошенный лист,
+    строки отдаются по одной, поэтому память и время зависят от размера
+    этого листа, а не от всей истории в файле.
+    """
+    if not path.exists():
+        return
+
+    wb = load_workbook(path, read_only=True)
+    try:
+        if sheet_name not in wb.sheetnames:
+            return
+        for row in wb[sheet_name].iter_rows(min_row=2, values_only=True):
+            expense = _row_to_expense(row)
+            if expense is not None:
+                yield expense
+    finally:
+        wb.close()
 
-    if sheet_name not in wb.sheetnames:
-        ws = wb.create_sheet(title=sheet_name)
-        ws.append(["ID", "Дата", "Категория", "Сумма", "Комментарий"])
-        wb.save(EXPENSES_FILE)
-        return wb, ws
 
-    ws = wb[sheet_name]
-    return wb, ws
+# --- Управление хранилищем ---
 
 
-def _get_next_id(ws: Worksheet) -> int:
+def load() -> None:
+    """Загружает книгу текущего арендатора в память и проигрывает журнал. Вызывается при старте бота."""
+    with _current_store() as store, store.lock:
+        store.load()
+
+
+def flush() -> bool:
     """
-    Определяет следующий ID как max(существующих ID) + 1.
-    Это гарантирует что ID всегда растёт вверх,
-    даже если промежуточные записи были удалены.
+    Переносит журналы изменений всех открытых хранилищ в xlsx.
+    Возвращает True если хотя бы один файл был перезаписан.
     """
-    if ws.max_row <= 1:
-        return 1
+    flushed = False
+    for _, store in _stores.iter_open():
+        if store.is_loaded:
+            with store.writing():
+                flushed = store.flush() or flushed
+    return flushed
+
 
-    max_id = 0
-    for row_idx in range(2, ws.max_row + 1):
-        cell_value = ws.cell(row=row_idx, column=1).value
-        if cell_value is not None and cell_value > max_id:
-            max_id = cell_value
+def close() -> None:
+    """Сбрасывает на диск и закрывает все открытые хранилища (при остановке бота)."""
+    _stores.close_all()
 
-    return max_id + 1
+
+@contextmanager
+def batch() -> Iterator[None]:
+    """Выполняет изменения внутри блока с одной синхронизацией журнала на всю пачку."""
+    with _current_store() as store, store.batch():
+        yield
+
+
+def archive_closed_months() -> list[str]:
+    """
+    Переносит закрытые месяцы из expenses.xlsx в архив (archive/ГГГГ_ММ.xlsx)
+    во всех открытых хранилищах. Возвращает ключи перенесённых месяцев.
+    """
+    archived: set[str] = set()
+    for _, store in _stores.iter_open():
+        if store.is_loaded:
+            with store.writing():
+                archived.update(store.archive_months(get_current_month()))
+    return sorted(archived)
 
 
 # --- Публичный API репозитория ---
@@ -74,142 +956,358 @@ def add_expense(category: str, amount: float, comment: str | None = None) -> int
     Добавляет новую запись расхода в лист текущего месяца.
     Возвращает ID созданной записи.
     """
-    wb, ws = _ensure_file_and_sheet()
+    sheet_name = get_current_month()
 
-    new_id = _get_next_id(ws)
-    date_str = datetime.now().strftime("%d.%m.%Y")
+    with _current_store() as store, store.writing():
+        store.ensure_sheet(sheet_name)
+        new_id = _get_next_id(sheet_name)
 
-    ws.append([new_id, date_str, category, amount, comment or ""])
-    wb.save(EXPENSES_FILE)
+        store.commit({
+            "op": "add",
+            "sheet": sheet_name,
+            "id": new_id,
+            "date": date.today().isoformat(),
+            "category": category,
+            "amount": amount,
+            "comment": comment or "",
+        })
 
     return new_id
 
 
-def get_all_expenses() -> list[dict]:
+def add_expenses(items: list[tuple[str, float, str | None]]) -> list[int]:
     """
-    Возвращает список всех записей из листа текущего месяца.
-    Каждая запись — словарь: {id, date, category, amount, comment}.
+    Добавляет пачку записей (категория, сумма, комментарий) в лист текущего месяца.
+    Вся пачка фиксируется одной строкой журнала — одна запись на диск с fsync
+    вместо отдельной на каждую запись. Возвращает ID созданных записей по порядку.
     """
-    if not EXPENSES_FILE.exists():
+    if not items:
         return []
 
-    sheet_name = _get_current_sheet_name()
-    wb = load_workbook(EXPENSES_FILE)
+    sheet_name = get_current_month()
+    today = date.today().isoformat()
+
+    with _current_store() as store, store.writing():
+        store.ensure_sheet(sheet_name)
+        first_id = _get_next_id(sheet_name)
+        new_ids = list(range(first_id, first_id + len(items)))
+
+        store.commit({
+            "op": "batch",
+            "ops": [
+                {
+                    "op": "add",
+                    "sheet": sheet_name,
+                    "id": new_id,
+                    "date": today,
+                    "category": category,
+                    "amount": amount,
+                    "comment": comment or "",
+                }
+                for new_id, (category, amount, comment) in zip(new_ids, items)
+            ],
+        })
+
+    return new_ids
+
+
+def import_expenses(items: list[tuple[str, date, str, float, str | None]]) -> int:
+    """
+    Добавляет записи импорта (хэш строки, дата, категория, сумма, комментарий)
+    в листы месяцев по их датам. Строки с уже импортированным хэшем пропускаются.
+    Записи и хэши фиксируются одной строкой журнала. Архивный месяц, в который
+    попадает запись, возвращается в книгу. Возвращает число добавленных записей.
+    """
+    with _current_store() as store, store.writing():
+        ops = []
+        seen: set[str] = set()
+        next_ids: dict[str, int] = {}
+        for row_hash, expense_date, category, amount, comment in items:
+            # Хэши попадут в import_hashes при применении пачки — после её записи в журнал
+            if row_hash in store.import_hashes or row_hash in seen:
+                continue
+            seen.add(row_hash)
+
+            sheet_name = get_month_key(expense_date)
+            if sheet_name not in next_ids:
+                if sheet_name in store.get_archive():
+                    store.unarchive_month(sheet_name)
+                store.ensure_sheet(sheet_name)
+                next_ids[sheet_name] = _get_next_id(sheet_name)
+            new_id = next_ids[sheet_name]
+            next_ids[sheet_name] += 1
+
+            ops.append({
+                "op": "add",
+                "sheet": sheet_name,
+                "id": new_id,
+                "date": expense_date.isoformat(),
+                "category": category,
+                "amount": amount,
+                "comment": comment or "",
+            })
+
+        if ops:
+            store.commit({"op": "batch", "ops": ops, "imported": list(seen)})
+
+    return len(ops)
+
+
+def list_months() -> list[str]:
+    """Возвращает ключи месяцев, за которые есть данные (по листам книги)."""
+    with _current_store() as store, store.reading():
+        return store.list_months()
+
+
+def iter_expenses(month: str | None = None) -> Iterator[dict]:
+    """
+    Лениво перебирает записи листа месяца (по умолчанию текущего) по одной.
+    Если книга уже в памяти — читает из неё (под lock, поэтому итератор нужно
+    дочитывать в том же потоке), архивный месяц — из кэша его таблицы, без lock.
+    Если книга не загружена и журнал пуст (например, в отдельном скрипте) —
+    потоково читает только этот лист (или файл архива) с диска.
+    """
+    sheet_name = month or get_current_month()
+
+    with _current_store() as store:
+        if not store.is_loaded and not store.has_pending_journal():
+            shard_path = store.get_shard_path(sheet_name)
+            yield from iter_file_expenses(shard_path or store.path, sheet_name)
+            return
+
+        with store.reading():
+            table = store.get_month_table(sheet_name) if store.get_shard_path(sheet_name) else None
+            ws = store.get_sheet(sheet_name) if table is None else None
+            if ws is not None:
+                for row in ws.iter_rows(min_row=2, max_row=ws.max_row, values_only=True):
+                    expense = _row_to_expense(row)
+                    if expense is not None:
+                        yield expense
+
+    # Таблица не меняется после построения — её можно дочитывать без lock
+    if table is not None:
+        yield from table
 
-    if sheet_name not in wb.sheetnames:
-        return []
 
-    ws = wb[sheet_name]
+def iter_expenses_between(date_from: date, date_to: date) -> Iterator[dict]:
+    """
+    Лениво перебирает записи с датой в диапазоне [date_from, date_to].
+    По индексу месяцев открываются только листы, которые задевает диапазон.
+    """
+    months = None
+    with _current_store() as store:
+        if store.is_loaded:
+            with store.reading():
+                months = set(store.list_months())
 
-    expenses = []
-    for row in ws.iter_rows(min_row=2, max_row=ws.max_row, values_only=True):
-        if row[0] is None:
+    for month in get_months_between(date_from, date_to):
+        if months is not None and month not in months:
             continue
-        expenses.append({
-            "id": row[0],
-            "date": row[1],
-            "category": row[2],
-            "amount": row[3],
-            "comment": row[4] if len(row) > 4 and row[4] else "",
-        })
+        for expense in iter_expenses(month):
+            expense_date = expense["date"]
+            if isinstance(expense_date, date) and date_from <= expense_date <= date_to:
+                yield expense
+
+
+def get_all_expenses(month: str | None = None) -> list[dict]:
+    """
+    Возвращает список всех записей из листа месяца (по умолчанию текущего).
+    Каждая запись — словарь: {id, date, category, amount, comment}.
+    """
+    return list(iter_expenses(month))
+
 
-    return expenses
+def has_expenses(month: str | None = None) -> bool:
+    """Проверяет, есть ли в месяце хотя бы одна запись (читает только первую)."""
+    return next(iter_expenses(month), None) is not None
 
 
-def delete_expense(expense_id: int) -> bool:
+def count_expenses(month: str | None = None) -> int:
+    """Возвращает число записей в месяце (из индекса листа или манифеста архива)."""
+    sheet_name = month or get_current_month()
+    with _current_store() as store, store.reading():
+        entry = store.get_archive().get(sheet_name)
+        if entry is not None:
+            return entry["rows"]
+        index = store.get_index(sheet_name)
+        return len(index.rows) if index is not None else 0
+
+
+def get_expenses_page(offset: int, limit: int, month: str | None = None) -> list[dict]:
     """
-    Удаляет строку с указанным ID физически.
-    ID остальных записей НЕ меняются.
-    Возвращает True если запись найдена и удалена, иначе False.
+    Возвращает записи месяца с offset по offset + limit в порядке листа.
+    Читаются только строки нужной страницы; архивный месяц — из кэша
+    его таблицы (файл разбирается только при первом обращении).
     """
-    if not EXPENSES_FILE.exists():
-        return False
+    sheet_name = month or get_current_month()
+
+    with _current_store() as store, store.reading():
+        if store.get_shard_path(sheet_name) is not None:
+            return store.get_month_table(sheet_name).rows(offset, limit)
+
+        ws = store.get_sheet(sheet_name)
+        if ws is None:
+            return []
+        # Ограничиваем последней строкой листа: iter_rows за его пределами создаёт пустые ячейки
+        first_row = 2 + offset
+        last_row = min(first_row + limit - 1, store.get_index(sheet_name).last_row)
+        if first_row > last_row:
+            return []
+        rows = ws.iter_rows(min_row=first_row, max_row=last_row, values_only=True)
+        return [expense for expense in map(_row_to_expense, rows) if expense is not None]
 
-    wb, ws = _ensure_file_and_sheet()
 
-    # Ищем строку с нужным ID
-    target_row = None
-    for row_idx in range(2, ws.max_row + 1):
-        if ws.cell(row=row_idx, column=1).value == expense_id:
-            target_row = row_idx
-            break
+def search_expenses(query: str, offset: int, limit: int) -> tuple[int, list[dict]]:
+    """
+    Ищет записи всех месяцев по словам комментария (начало слова, без учёта регистра).
+    Возвращает общее число найденных и записи с offset по offset + limit
+    от новых к старым; у каждой записи есть ключ месяца 'month'.
+    Совпадения берутся из поискового индекса, строки читаются только для страницы:
+    открытые месяцы — по индексу листа, архивные — из таблицы месяца.
+    """
+    found: list[dict] = []
+
+    with _current_store() as store, store.reading():
+        hits = store.search_index.search(query)
+        for month, expense_id in hits[offset:offset + limit]:
+            expense = store.get_expense(month, expense_id)
+            if expense is not None:
+                found.append({**expense, "month": month})
 
-    if target_row is None:
-        return False
+    return len(hits), found
 
-    # Удаляем строку, ID не пересчитываем
-    ws.delete_rows(target_row)
-    wb.save(EXPENSES_FILE)
-    return True
 
+def get_month_table(month: str | None = None) -> MonthTable:
+    """Записи месяца (по умолчанию текущего) в колоночном виде; таблицу можно читать без lock."""
+    with _current_store() as store, store.reading():
+        return store.get_month_table(month or get_current_month())
 
-def update_expense_category(expense_id: int, new_category: str) -> bool:
+
+def get_month_total(month: str | None = None) -> float:
+    """Возвращает сумму расходов за месяц — готовое значение из агрегатов."""
+    with _current_store() as store, store.reading():
+        return store.rollups.month_total(month or get_current_month())
+
+
+def get_month_summary(month: str) -> dict[str, tuple[float, int]]:
+    """Возвращает разбивку месяца по категориям: {категория: (сумма, количество)}."""
+    with _current_store() as store, store.reading():
+        return store.rollups.month_summary(month)
+
+
+def rebuild_rollups() -> None:
+    """Пересчитывает агрегаты заново по данным в книге."""
+    with _current_store() as store, store.writing():
+        store.rebuild_rollups()
+
+
+def expense_exists(expense_id: int, month: str | None = None) -> bool:
+    """Проверяет существование записи с указанным ID в месяце."""
+    with _current_store() as store, store.reading():
+        return store.find_row(month or get_current_month(), expense_id) is not None
+
+
+def get_expense(expense_id: int, month: str | None = None) -> dict | None:
     """
-    Обновляет категорию записи по ID в листе текущего месяца.
-    Возвращает True если запись найдена и обновлена, иначе False.
+    Возвращает запись с указанным ID в месяце (по умолчанию текущем) или None.
+    Читается одна строка листа; у записи есть ключ версии 'version'.
     """
-    if not EXPENSES_FILE.exists():
-        return False
+    with _current_store() as store, store.reading():
+        expense = store.get_expense(month or get_current_month(), expense_id)
+    if expense is None:
+        return None
+    return {**expense, "version": get_expense_version(expense)}
 
-    wb, ws = _ensure_file_and_sheet()
 
-    for row_idx in range(2, ws.max_row + 1):
-        if ws.cell(row=row_idx, column=1).value == expense_id:
-            ws.cell(row=row_idx, column=3).value = new_category
-            wb.save(EXPENSES_FILE)
-            return True
+def delete_expense(expense_id: int, month: str | None = None, version: str | None = None) -> bool:
+    """
+    Удаляет строку с указанным ID физически.
+    ID остальных записей НЕ меняются.
+    Возвращает True если запись найдена (и не менялась с version) и удалена, иначе False.
+    """
+    sheet_name = month or get_current_month()
+
+    with _current_store() as store, store.writing():
+        if not store.is_unchanged(sheet_name, expense_id, version):
+            return False
 
-    return False
+        # Удаляем строку, ID не пересчитываем
+        store.commit({"op": "delete", "sheet": sheet_name, "id": expense_id})
+        return True
 
 
-def update_expense_amount(expense_id: int, new_amount: float) -> bool:
+def _update_field(expense_id: int, field: str, value, month: str | None, version: str | None) -> bool:
     """
-    Обновляет сумму записи по ID в листе текущего месяца.
-    Возвращает True если запись найдена и обновлена, иначе False.
+    Записывает новое значение поля записи с указанным ID в листе месяца.
+    Возвращает True если запись найдена (и не менялась с version) и обновлена, иначе False.
     """
-    if not EXPENSES_FILE.exists():
-        return False
+    sheet_name = month or get_current_month()
+
+    with _current_store() as store, store.writing():
+        if not store.is_unchanged(sheet_name, expense_id, version):
+            return False
 
-    wb, ws = _ensure_file_and_sheet()
+        store.commit({"op": "update", "sheet": sheet_name, "id": expense_id, "field": field, "value": value})
+        return True
 
-    for row_idx in range(2, ws.max_row + 1):
-        if ws.cell(row=row_idx, column=1).value == expense_id:
-            ws.cell(row=row_idx, column=4).value = new_amount
-            wb.save(EXPENSES_FILE)
-            return True
 
-    return False
+def update_expense_category(
+    expense_id: int, new_category: str, month: str | None = None, version: str | None = None
+) -> bool:
+    """
+    Обновляет категорию записи по ID в листе месяца (по умолчанию текущего).
+    Возвращает True если запись найдена (и не менялась с version) и обновлена, иначе False.
+    """
+    return _update_field(expense_id, "category", new_category, month, version)
 
 
-def update_expense_comment(expense_id: int, new_comment: str) -> bool:
+def update_expense_amount(
+    expense_id: int, new_amount: float, month: str | None = None, version: str | None = None
+) -> bool:
     """
-    Обновляет комментарий записи по ID в листе текущего месяца.
-    Возвращает True если запись найдена и обновлена, иначе False.
+    Обновляет сумму записи по ID в листе месяца (по умолчанию текущего).
+    Возвращает True если запись найдена (и не менялась с version) и обновлена, иначе False.
     """
-    if not EXPENSES_FILE.exists():
-        return False
+    return _update_field(expense_id, "amount", new_amount, month, version)
 
-    wb, ws = _ensure_file_and_sheet()
 
-    for row_idx in range(2, ws.max_row + 1):
-        if ws.cell(row=row_idx, column=1).value == expense_id:
-            ws.cell(row=row_idx, column=5).value = new_comment
-            wb.save(EXPENSES_FILE)
-            return True
+def update_expense_comment(
+    expense_id: int, new_comment: str, month: str | None = None, version: str | None = None
+) -> bool:
+    """
+    Обновляет комментарий записи по ID в листе месяца (по умолчанию текущего).
+    Возвращает True если запись найдена (и не менялась с version) и обновлена, иначе False.
+    """
+    return _update_field(expense_id, "comment", new_comment, month, version)
 
-    return False
 
+def get_data_version() -> int:
+    """
+    Возвращает версию данных — она меняется после каждого изменения,
+    в том числе сделанного другим процессом с той же DATA_DIR.
+    """
+    with _current_store() as store, store.reading():
+        return store.version
 
-def get_current_month_label() -> str:
-    """Возвращает читаемую метку текущего месяца, например 'Февраль 2026'."""
-    months = [
-        "Январь", "Февраль", "Март", "Апрель", "Май", "Июнь",
-        "Июль", "Август", "Сентябрь", "Октябрь", "Ноябрь", "Декабрь",
-    ]
-    now = datetime.now()
-    return f"{months[now.month - 1]} {now.year}"
 
+def build_export_file(path: Path, date_from: date | None = None, date_to: date | None = None) -> Path:
+    """
+    Собирает файл для экспорта из книги в памяти: по листу на месяц.
+    Без диапазона выгружаются все месяцы, с диапазоном — только записи
+    из него и только задетые им листы.
+    Листы пишутся потоково в write-only книгу; основной expenses.xlsx
+    при этом не трогается и журнал не переносится.
+    """
+    def month_rows(month: str) -> Iterator[list]:
+        for exp in iter_expenses(month):
+            if date_from is not None and date_to is not None:
+                if not isinstance(exp["date"], date) or not date_from <= exp["date"] <= date_to:
+                    continue
+            yield [exp["id"], exp["date"], exp["category"], exp["amount"], exp["comment"]]
 
-def get_file_path() -> Path:
-    """Возвращает путь к файлу expenses.xlsx (для экспорта)."""
-    return EXPENSES_FILE
\ No newline at end of file
+    with _current_store() as store, store.reading():
+        months = store.list_months()
+        if date_from is not None and date_to is not None:
+            months = [m for m in get_months_between(date_from, date_to) if m in months]
+        with metrics.timed("storage_operation_seconds", backend="excel", op="export"):
+            return write_workbook(path, ((month, month_rows(month)) for month in months))
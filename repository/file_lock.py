@@ -0,0 +1,61 @@
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows: межпроцессной блокировки нет, остаётся только блокировка потоков
+    fcntl = None
+
+
+class FileLock:
+    """
+    Advisory-блокировка файла данных между процессами (flock на отдельном lock-файле).
+    Несколько воркеров бота или бот и отчётный скрипт с общей DATA_DIR
+    берут её перед изменением данных, поэтому их записи не перемешиваются.
+    Блокировка повторно входима в пределах процесса: вложенные exclusive()
+    не блокируют сами себя. Без fcntl (Windows) работает только как блокировка потоков.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.RLock()
+        self._fd: int | None = None
+        self._depth = 0
+
+    @contextmanager
+    def exclusive(self) -> Iterator[None]:
+        """Держит исключительную блокировку на время блока."""
+        with self._lock:
+            if not self._depth:
+                self._acquire()
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if not self._depth:
+                    self._release()
+
+    def _acquire(self) -> None:
+        """Открывает lock-файл и ждёт блокировки."""
+        if fcntl is None:
+            return
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+
+    def _release(self) -> None:
+        """Снимает блокировку; lock-файл остаётся открытым для следующих захватов."""
+        if fcntl is None or self._fd is None:
+            return
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def close(self) -> None:
+        """Закрывает lock-файл (хранилище больше не используется). Блокировка не должна быть захвачена."""
+        with self._lock:
+            if self._fd is not None and not self._depth:
+                os.close(self._fd)
+                self._fd = None
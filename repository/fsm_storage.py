@@ -0,0 +1,208 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, StateType, StorageKey
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fsm (
+    key     TEXT PRIMARY KEY,
+    state   TEXT,
+    data    TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_fsm_updated ON fsm (updated);
+"""
+
+
+class _Session:
+    """Состояние и данные сценария одного пользователя с временем последнего изменения."""
+
+    __slots__ = ("state", "data", "updated")
+
+    def __init__(self, state: str | None, data: dict[str, Any], updated: float) -> None:
+        self.state = state
+        self.data = data
+        self.updated = updated
+
+    @property
+    def is_empty(self) -> bool:
+        """Сценарий завершён: ни состояния, ни данных."""
+        return self.state is None and not self.data
+
+
+class SQLiteStorage(BaseStorage):
+    """
+    FSM-хранилище aiogram в SQLite с горячим набором сессий в памяти.
+    Недавние сессии лежат в LRU на cache_size записей, остальные читаются с диска по запросу.
+    Переходы состояний не пишутся на диск сразу: изменённые сессии копятся
+    и раз в flush_interval секунд сохраняются одной транзакцией в фоновом потоке.
+    Сессии, не менявшиеся дольше ttl секунд, считаются брошенными: они не
+    возвращаются и удаляются с диска и из памяти при очередном сбросе.
+    """
+
+    def __init__(self, path: Path, ttl: float, cache_size: int, flush_interval: float) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.cache_size = cache_size
+        self.flush_interval = flush_interval
+        self._key_builder = DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        self._cache: OrderedDict[str, _Session] = OrderedDict()
+        # Изменённые сессии, ещё не записанные на диск (последний снимок по ключу)
+        self._pending: dict[str, _Session] = {}
+        # Сессии, которые записываются прямо сейчас: до конца записи диск может их не содержать
+        self._writing: dict[str, _Session] = {}
+        self._flush_task: asyncio.Task | None = None
+        self._db_lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+
+    # --- Интерфейс BaseStorage ---
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        session = await self._get(key)
+        state_name = state.state if isinstance(state, State) else state
+        self._put(key, state_name, session.data if session is not None else {})
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        session = await self._get(key)
+        return session.state if session is not None else None
+
+    async def set_data(self, key: StorageKey, data: dict[str, Any]) -> None:
+        session = await self._get(key)
+        self._put(key, session.state if session is not None else None, dict(data))
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        session = await self._get(key)
+        return dict(session.data) if session is not None else {}
+
+    async def close(self) -> None:
+        """Останавливает фоновый сброс, записывает накопленные изменения и закрывает базу."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # --- Сброс на диск ---
+
+    async def flush(self) -> None:
+        """
+        Записывает накопленные изменения одной транзакцией и удаляет просроченные сессии.
+        Если запись не удалась, изменения возвращаются в очередь и уйдут со следующим сбросом.
+        """
+        pending, self._pending = self._pending, {}
+        expired_before = time.time() - self.ttl
+        for name in [name for name, session in self._cache.items() if session.updated < expired_before]:
+            del self._cache[name]
+        self._writing = pending
+        try:
+            await asyncio.to_thread(self._write, pending, expired_before)
+        except BaseException:
+            # Пока шла запись, сессию могли изменить снова — более новое значение не затираем
+            for name, session in pending.items():
+                self._pending.setdefault(name, session)
+            raise
+        finally:
+            self._writing = {}
+
+    async def _flush_periodically(self) -> None:
+        """Фоновая задача: раз в flush_interval секунд сбрасывает изменения на диск."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                # База занята или ошибка диска — изменения остались в очереди, повторим позже
+                print(f"⚠️ Не удалось сохранить состояния сценариев: {e}")
+
+    # --- Работа с памятью ---
+
+    async def _get(self, key: StorageKey) -> _Session | None:
+        """Возвращает живую сессию из памяти или с диска; просроченную или отсутствующую — None."""
+        name = self._key_builder.build(key)
+        session = self._lookup(name)
+        if session is None:
+            loaded = await asyncio.to_thread(self._read, name)
+            # Пока шло чтение, сессию могли изменить — свежее значение в памяти важнее
+            session = self._lookup(name)
+            if session is None and loaded is not None:
+                session = self._remember(name, loaded)
+
+        if session is None or session.updated < time.time() - self.ttl:
+            return None
+        return session
+
+    def _lookup(self, name: str) -> _Session | None:
+        """Ищет сессию среди ещё не записанных, записываемых и в LRU."""
+        session = self._pending.get(name) or self._writing.get(name)
+        if session is None:
+            session = self._cache.get(name)
+            if session is not None:
+                self._cache.move_to_end(name)
+        return session
+
+    def _put(self, key: StorageKey, state: str | None, data: dict[str, Any]) -> None:
+        """Сохраняет новое значение сессии в памяти и ставит его в очередь на запись."""
+        name = self._key_builder.build(key)
+        session = self._remember(name, _Session(state, data, time.time()))
+        self._pending[name] = session
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_periodically())
+
+    def _remember(self, name: str, session: _Session) -> _Session:
+        """Кладёт сессию в LRU, вытесняя самые давние (незаписанные остаются в _pending)."""
+        self._cache[name] = session
+        self._cache.move_to_end(name)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return session
+
+    # --- Работа с базой (в фоновом потоке) ---
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Открывает базу (и создаёт схему) при первом обращении. Вызывается под _db_lock."""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def _read(self, name: str) -> _Session | None:
+        """Читает сессию с диска."""
+        with self._db_lock:
+            row = self._get_connection().execute(
+                "SELECT state, data, updated FROM fsm WHERE key = ?", (name,)
+            ).fetchone()
+        if row is None:
+            return None
+        state, data, updated = row
+        return _Session(state, json.loads(data), updated)
+
+    def _write(self, pending: dict[str, _Session], expired_before: float) -> None:
+        """Записывает изменённые сессии (завершённые — удаляет) и чистит просроченные."""
+        with self._db_lock:
+            conn = self._get_connection()
+            with conn:
+                conn.executemany(
+                    "DELETE FROM fsm WHERE key = ?",
+                    [(name,) for name, session in pending.items() if session.is_empty],
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO fsm (key, state, data, updated) VALUES (?, ?, ?, ?)",
+                    [
+                        (name, session.state, json.dumps(session.data, ensure_ascii=False), session.updated)
+                        for name, session in pending.items()
+                        if not session.is_empty
+                    ],
+                )
+                conn.execute("DELETE FROM fsm WHERE updated < ?", (expired_before,))
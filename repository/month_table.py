@@ -0,0 +1,133 @@
+from array import array
+from datetime import date
+from typing import Iterable, Iterator
+
+from repository.base import parse_date
+
+
+def to_kopecks(amount) -> int:
+    """Сумма в копейках; пустые и нечисловые значения считаются нулём."""
+    return round(amount * 100) if isinstance(amount, (int, float)) else 0
+
+
+class MonthTable:
+    """
+    Записи одного месяца в колоночном виде: ID, даты (порядковые номера дней),
+    суммы в копейках и коды категорий лежат в array, комментарии — списком.
+    Строка занимает десятки байт вместо сотен у словаря с date и float,
+    а суммы по копейкам складываются точно.
+    Вспомогательные операции работают по колонкам целиком: total — сумма
+    массива, between — отбор по датам, summary — группировка по категориям.
+    Таблица строится один раз и дальше не меняется (between возвращает новую),
+    поэтому её можно читать из нескольких потоков без lock.
+    """
+
+    __slots__ = ("ids", "days", "amounts", "categories", "comments", "_names", "_codes", "_raw_dates", "_positions")
+
+    def __init__(self) -> None:
+        self.ids = array("q")
+        # date.toordinal(); 0 — дата не распознана (старые строки с произвольным текстом)
+        self.days = array("l")
+        self.amounts = array("q")
+        # Индекс в _names: категория хранится один раз на таблицу, а не в каждой строке
+        self.categories = array("H")
+        self.comments: list[str] = []
+        self._names: list[str] = []
+        self._codes: dict[str, int] = {}
+        # Исходный текст нераспознанных дат по номеру строки — такие строки редки,
+        # а row() должен вернуть то же, что iter_expenses
+        self._raw_dates: dict[int, object] = {}
+        # ID → номер строки для find (как у _SheetIndex в excel_repo)
+        self._positions: dict[int, int] = {}
+
+    @classmethod
+    def from_expenses(cls, expenses: Iterable[dict]) -> "MonthTable":
+        """Собирает таблицу из записей-словарей (потоково, по одной)."""
+        table = cls()
+        for expense in expenses:
+            table.append(expense["id"], expense["date"], expense["category"], expense["amount"], expense["comment"])
+        return table
+
+    def append(self, expense_id: int, expense_date, category: str, amount, comment: str | None) -> None:
+        """Добавляет строку (только при построении таблицы)."""
+        code = self._codes.get(category)
+        if code is None:
+            code = self._codes[category] = len(self._names)
+            self._names.append(category)
+        parsed = parse_date(expense_date)
+        if parsed is None:
+            self._raw_dates[len(self.ids)] = expense_date
+        # При повторе ID находится первая строка, как при линейном поиске
+        self._positions.setdefault(expense_id, len(self.ids))
+        self.ids.append(expense_id)
+        self.days.append(parsed.toordinal() if parsed is not None else 0)
+        self.amounts.append(to_kopecks(amount))
+        self.categories.append(code)
+        self.comments.append(comment or "")
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __iter__(self) -> Iterator[dict]:
+        return (self.row(i) for i in range(len(self.ids)))
+
+    def row(self, i: int) -> dict:
+        """Строка i в виде словаря записи, как у iter_expenses."""
+        day = self.days[i]
+        return {
+            "id": self.ids[i],
+            "date": date.fromordinal(day) if day else self._raw_dates.get(i),
+            "category": self._names[self.categories[i]],
+            "amount": self.amounts[i] / 100,
+            "comment": self.comments[i],
+        }
+
+    def rows(self, offset: int, limit: int) -> list[dict]:
+        """Строки с offset по offset + limit."""
+        return [self.row(i) for i in range(offset, min(offset + limit, len(self.ids)))]
+
+    def find(self, expense_id: int) -> dict | None:
+        """Запись с указанным ID или None."""
+        i = self._positions.get(expense_id)
+        return self.row(i) if i is not None else None
+
+    def total(self) -> float:
+        """Сумма всех строк (точная — по копейкам)."""
+        return sum(self.amounts) / 100
+
+    def between(self, date_from: date, date_to: date) -> "MonthTable":
+        """Таблица из строк с датой в [date_from, date_to]; строки без даты не попадают."""
+        low, high = date_from.toordinal(), date_to.toordinal()
+        selected = [i for i, day in enumerate(self.days) if low <= day <= high]
+        if len(selected) == len(self.ids):
+            return self
+
+        table = MonthTable()
+        # Справочник категорий общий: коды те же, таблицы не меняются после построения
+        table._names, table._codes = self._names, self._codes
+        table.ids = array("q", (self.ids[i] for i in selected))
+        table.days = array("l", (self.days[i] for i in selected))
+        table.amounts = array("q", (self.amounts[i] for i in selected))
+        table.categories = array("H", (self.categories[i] for i in selected))
+        table.comments = [self.comments[i] for i in selected]
+        # Строки без даты сюда не попадают, так что _raw_dates остаётся пустым
+        table._positions = {}
+        for position, i in enumerate(selected):
+            table._positions.setdefault(self.ids[i], position)
+        return table
+
+    def summary_kopecks(self) -> dict[str, tuple[int, int]]:
+        """Разбивка по категориям в копейках: {категория: (сумма, количество)}."""
+        sums = [0] * len(self._names)
+        counts = [0] * len(self._names)
+        for code, amount in zip(self.categories, self.amounts):
+            sums[code] += amount
+            counts[code] += 1
+        return {name: (sums[code], counts[code]) for code, name in enumerate(self._names) if counts[code]}
+
+    def summary(self) -> dict[str, tuple[float, int]]:
+        """Разбивка по категориям: {категория: (сумма, количество)}."""
+        return {
+            category: (amount / 100, count)
+            for category, (amount, count) in self.summary_kopecks().items()
+        }
@@ -0,0 +1,64 @@
+from collections import defaultdict
+
+from repository.month_table import to_kopecks
+
+
+class Rollups:
+    """
+    Агрегаты расходов: сумма и количество записей по (месяц, категория)
+    и по месяцу целиком. Каждое изменение записи обновляет их за O(1),
+    поэтому итоги и статистика не требуют обхода строк.
+    Суммы хранятся в копейках целыми числами: тысячи добавлений и удалений
+    не накапливают ошибку округления float.
+    Структура не потокобезопасна — её защищает lock хранилища-владельца.
+    """
+
+    def __init__(self) -> None:
+        self._sums: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._counts: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._month_sums: dict[str, int] = defaultdict(int)
+        self._month_counts: dict[str, int] = defaultdict(int)
+
+    def clear(self) -> None:
+        """Сбрасывает все агрегаты (перед перестроением из хранилища)."""
+        self._sums.clear()
+        self._counts.clear()
+        self._month_sums.clear()
+        self._month_counts.clear()
+
+    def add(self, month: str, category: str, amount: float, count: int = 1) -> None:
+        """Учитывает добавленную запись (или count записей с общей суммой amount)."""
+        kopecks = to_kopecks(amount)
+        self._sums[month][category] += kopecks
+        self._counts[month][category] += count
+        self._month_sums[month] += kopecks
+        self._month_counts[month] += count
+
+    def remove(self, month: str, category: str, amount: float) -> None:
+        """Учитывает удалённую запись."""
+        kopecks = to_kopecks(amount)
+        self._sums[month][category] -= kopecks
+        self._counts[month][category] -= 1
+        self._month_sums[month] -= kopecks
+        self._month_counts[month] -= 1
+
+        if self._counts[month][category] <= 0:
+            del self._sums[month][category]
+            del self._counts[month][category]
+
+    def month_total(self, month: str) -> float:
+        """Сумма расходов за месяц."""
+        return self._month_sums.get(month, 0) / 100
+
+    def month_count(self, month: str) -> int:
+        """Количество записей за месяц."""
+        return self._month_counts.get(month, 0)
+
+    def month_summary(self, month: str) -> dict[str, tuple[float, int]]:
+        """Разбивка месяца по категориям: {категория: (сумма, количество)}."""
+        if month not in self._sums:
+            return {}
+        return {
+            category: (amount / 100, self._counts[month][category])
+            for category, amount in self._sums[month].items()
+        }
@@ -0,0 +1,101 @@
+import re
+from bisect import bisect_left
+
+# Слово комментария: буквы и цифры любого алфавита
+_TOKEN_RE = re.compile(r"\w+")
+
+# Ссылка на запись: (ключ месяца, ID)
+Posting = tuple[str, int]
+
+
+def tokenize(text: str | None) -> set[str]:
+    """
+    Слова комментария для индекса и запроса: без учёта регистра (casefold
+    работает и для кириллицы) и с «ё», приравненной к «е».
+    """
+    if not text:
+        return set()
+    return set(_TOKEN_RE.findall(str(text).casefold().replace("ё", "е")))
+
+
+class SearchIndex:
+    """
+    Обратный индекс по словам комментариев: слово → множество записей (месяц, ID).
+    Каждое изменение записи обновляет его за число слов её комментария,
+    поэтому поиск не требует обхода строк. Для поиска по началу слова
+    держится отсортированный список слов, он перестраивается лениво —
+    только когда между поисками появилось или исчезло слово.
+    Структура не потокобезопасна — её защищает lock хранилища-владельца.
+    """
+
+    def __init__(self) -> None:
+        self._postings: dict[str, set[Posting]] = {}
+        self._sorted_tokens: list[str] | None = None
+
+    def clear(self) -> None:
+        """Сбрасывает индекс (перед перестроением из хранилища)."""
+        self._postings.clear()
+        self._sorted_tokens = None
+
+    def add(self, month: str, expense_id: int, comment: str | None) -> None:
+        """Учитывает комментарий добавленной записи."""
+        for token in tokenize(comment):
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = set()
+                self._sorted_tokens = None
+            postings.add((month, expense_id))
+
+    def remove(self, month: str, expense_id: int, comment: str | None) -> None:
+        """Учитывает удалённую запись (или старый комментарий изменённой)."""
+        for token in tokenize(comment):
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.discard((month, expense_id))
+            if not postings:
+                del self._postings[token]
+                self._sorted_tokens = None
+
+    def search(self, query: str) -> list[Posting]:
+        """
+        Записи, в комментарии которых каждое слово запроса является началом
+        какого-нибудь слова. Возвращает (месяц, ID) от новых к старым.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        if self._sorted_tokens is None:
+            self._sorted_tokens = sorted(self._postings)
+
+        found: set[Posting] | None = None
+        # Сначала самые длинные слова запроса: у них меньше совпадений
+        for prefix in sorted(tokens, key=len, reverse=True):
+            matched: set[Posting] = set()
+            i = bisect_left(self._sorted_tokens, prefix)
+            while i < len(self._sorted_tokens) and self._sorted_tokens[i].startswith(prefix):
+                matched |= self._postings[self._sorted_tokens[i]]
+                i += 1
+            found = matched if found is None else found & matched
+            if not found:
+                return []
+        return sorted(found, reverse=True)
+
+    def to_dict(self) -> dict[str, dict[str, list[int]]]:
+        """Индекс для сохранения в JSON: {слово: {месяц: [ID, ...]}}."""
+        result: dict[str, dict[str, list[int]]] = {}
+        for token, postings in self._postings.items():
+            by_month: dict[str, list[int]] = {}
+            for month, expense_id in postings:
+                by_month.setdefault(month, []).append(expense_id)
+            result[token] = {month: sorted(ids) for month, ids in by_month.items()}
+        return result
+
+    def load_dict(self, data: dict[str, dict[str, list[int]]]) -> None:
+        """Заменяет индекс сохранённым ранее to_dict()."""
+        self.clear()
+        for token, by_month in data.items():
+            self._postings[token] = {
+                (month, expense_id) for month, ids in by_month.items() for expense_id in ids
+            }
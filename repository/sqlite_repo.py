@@ -0,0 +1,682 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date
+from pathlib import Path
+from typing import Iterator
+
+import metrics
+from config import DATA_DIR, TENANT_CACHE_SIZE
+from repository.base import get_current_month, get_expense_version, get_month_key, get_months_between, parse_date
+from repository.month_table import MonthTable
+from repository.rollups import Rollups
+from repository.search_index import tokenize
+from repository.tenants import StoreCache, get_tenant, get_tenant_dir
+from repository.xlsx_export import write_workbook
+
+# Файл базы данных (у арендаторов — файл с тем же именем в их папке)
+DB_FILE: Path = DATA_DIR / "expenses.db"
+
+# Сколько секунд ждать, пока другой процесс держит блокировку записи базы
+BUSY_TIMEOUT = 30
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS expenses (
+    month    TEXT    NOT NULL,
+    id       INTEGER NOT NULL,
+    date     TEXT    NOT NULL,
+    category TEXT    NOT NULL,
+    amount   REAL    NOT NULL,
+    comment  TEXT    NOT NULL DEFAULT '',
+    PRIMARY KEY (month, id)
+);
+CREATE INDEX IF NOT EXISTS idx_expenses_category ON expenses (category);
+CREATE INDEX IF NOT EXISTS idx_expenses_date ON expenses (date);
+
+-- Обратный индекс по словам комментариев для /find: поиск по началу слова —
+-- диапазон по первичному ключу, удаление слов записи — по idx_comment_tokens_expense
+CREATE TABLE IF NOT EXISTS comment_tokens (
+    token TEXT    NOT NULL,
+    month TEXT    NOT NULL,
+    id    INTEGER NOT NULL,
+    PRIMARY KEY (token, month, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_comment_tokens_expense ON comment_tokens (month, id);
+
+-- Хэши строк, уже загруженных /import: повторная загрузка той же выписки их пропускает
+CREATE TABLE IF NOT EXISTS import_hashes (
+    hash TEXT PRIMARY KEY
+) WITHOUT ROWID;
+"""
+
+# Версия схемы в PRAGMA user_version: 1 — comment_tokens заполнена по существующим записям
+SCHEMA_VERSION = 1
+
+
+class _Database:
+    """
+    База одного арендатора: соединение и состояние, которое процесс держит рядом с ним.
+    Соединение одно на базу; sqlite3 не любит конкурентный доступ к одному
+    соединению, поэтому все обращения идут под lock.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.lock = threading.RLock()
+        self.conn: sqlite3.Connection | None = None
+        # Агрегаты по (месяц, категория): строятся одним GROUP BY при открытии базы
+        # и дальше поддерживаются каждой операцией
+        self.rollups = Rollups()
+        # Версия данных: увеличивается при каждом изменении (по ней кэшируется /export).
+        # Начинается со времени открытия, чтобы после вытеснения и повторного открытия версии не повторялись
+        self.data_version = time.time_ns()
+        # Последнее увиденное PRAGMA data_version: меняется, когда базу изменило
+        # другое соединение (другой процесс с той же DATA_DIR)
+        self.db_version: int | None = None
+        # Глубина вложенности batch(): внутри пачки операции не коммитятся по одной
+        self.batch_depth = 0
+
+    def connect(self) -> sqlite3.Connection:
+        """Открывает базу (и создаёт схему) при первом обращении."""
+        if self.conn is None:
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            _migrate(conn)
+            self.conn = conn
+            _rebuild_rollups(self)
+            _sync_with_db(self)
+        return self.conn
+
+    def close(self) -> None:
+        """Закрывает соединение и освобождает агрегаты (при вытеснении из кэша арендаторов)."""
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+            self.rollups.clear()
+            self.db_version = None
+
+
+def _open_database(tenant: str) -> _Database:
+    """База арендатора: файл с именем DB_FILE в его папке."""
+    return _Database(get_tenant_dir(tenant) / DB_FILE.name)
+
+
+# Открытые базы арендаторов; вытесненная закрывает соединение
+_databases: StoreCache[_Database] = StoreCache(TENANT_CACHE_SIZE, _open_database, _Database.close, "sqlite")
+
+
+@contextmanager
+def _current_db() -> Iterator[_Database]:
+    """База текущего арендатора под её lock (на время блока защищена от вытеснения)."""
+    with _databases.use(get_tenant()) as db, db.lock:
+        yield db
+
+
+# --- Вспомогательные функции ---
+
+
+def _sync_with_db(db: _Database) -> None:
+    """
+    Догоняет изменения других процессов: если PRAGMA data_version изменилась,
+    пересчитывает агрегаты и увеличивает версию данных.
+    Свои коммиты data_version не меняют, поэтому проверка дешёвая.
+    """
+    (version,) = db.connect().execute("PRAGMA data_version").fetchone()
+    if version == db.db_version:
+        return
+    if db.db_version is not None:
+        _rebuild_rollups(db)
+        _mark_changed(db)
+    db.db_version = version
+
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    """Один раз заполняет поисковый индекс по записям, сделанным до его появления."""
+    (version,) = conn.execute("PRAGMA user_version").fetchone()
+    if version >= SCHEMA_VERSION:
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Другой процесс мог успеть заполнить индекс, пока мы ждали блокировку
+        (version,) = conn.execute("PRAGMA user_version").fetchone()
+        if version < SCHEMA_VERSION:
+            for month, expense_id, comment in conn.execute("SELECT month, id, comment FROM expenses").fetchall():
+                _index_comment(conn, month, expense_id, comment)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+def _index_comment(conn: sqlite3.Connection, month: str, expense_id: int, comment: str | None) -> None:
+    """Добавляет слова комментария записи в поисковый индекс."""
+    conn.executemany(
+        "INSERT OR IGNORE INTO comment_tokens (token, month, id) VALUES (?, ?, ?)",
+        [(token, month, expense_id) for token in tokenize(comment)],
+    )
+
+
+def _unindex_comment(conn: sqlite3.Connection, month: str, expense_id: int) -> None:
+    """Убирает слова комментария записи из поискового индекса."""
+    conn.execute("DELETE FROM comment_tokens WHERE month = ? AND id = ?", (month, expense_id))
+
+
+@contextmanager
+def _transaction(db: _Database) -> Iterator[sqlite3.Connection]:
+    """
+    Транзакция одной операции. Вне batch() — обычный commit/rollback;
+    внутри пачки — SAVEPOINT, чтобы ошибка откатывала только эту операцию,
+    а commit выполнялся один раз на всю пачку.
+    BEGIN IMMEDIATE сразу берёт блокировку записи: иначе два процесса могли бы
+    прочитать один MAX(id) и выдать одинаковый ID.
+    """
+    conn = db.connect()
+    if not db.batch_depth:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+        return
+
+    conn.execute("SAVEPOINT op")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK TO op")
+        conn.execute("RELEASE op")
+        raise
+    conn.execute("RELEASE op")
+
+
+def _rebuild_rollups(db: _Database) -> None:
+    """Пересчитывает агрегаты одним запросом по всей таблице."""
+    db.rollups.clear()
+    cursor = db.connect().execute(
+        "SELECT month, category, SUM(amount), COUNT(*) FROM expenses GROUP BY month, category"
+    )
+    for month, category, amount, count in cursor:
+        db.rollups.add(month, category, amount, count)
+
+
+def _mark_changed(db: _Database) -> None:
+    """Учитывает изменение данных: увеличивает версию."""
+    db.data_version += 1
+
+
+def _select_expense(conn: sqlite3.Connection, month: str, expense_id: int) -> dict | None:
+    """Возвращает запись по первичному ключу или None, если её нет."""
+    row = conn.execute(
+        "SELECT id, date, category, amount, comment FROM expenses WHERE month = ? AND id = ?",
+        (month, expense_id),
+    ).fetchone()
+    return _row_to_expense(row) if row is not None else None
+
+
+def _select_unchanged(conn: sqlite3.Connection, month: str, expense_id: int, version: str | None) -> dict | None:
+    """
+    Запись, если она есть и её версия совпадает с version (None — без проверки), иначе None.
+    Вызывается внутри _transaction: BEGIN IMMEDIATE не даст изменить запись до конца операции.
+    """
+    expense = _select_expense(conn, month, expense_id)
+    if expense is None or (version is not None and get_expense_version(expense) != version):
+        return None
+    return expense
+
+
+def _to_iso(value) -> str:
+    """Переводит дату (ячейку xlsx или строку '%d.%m.%Y') в ISO — так по ней работает индекс и сортировка."""
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(f"Некорректная дата: {value!r}")
+    return parsed.isoformat()
+
+
+def _row_to_expense(row: tuple) -> dict:
+    """Превращает строку таблицы (id, date, category, amount, comment) в словарь записи."""
+    expense_id, iso_date, category, amount, comment = row
+    return {
+        "id": expense_id,
+        "date": date.fromisoformat(iso_date),
+        "category": category,
+        "amount": amount,
+        "comment": comment or "",
+    }
+
+
+def _update_field(expense_id: int, column: str, value, month: str | None, version: str | None) -> bool:
+    """
+    Обновляет колонку записи с указанным ID в месяце (по умолчанию текущем).
+    Возвращает True если запись найдена (и не менялась с version) и обновлена, иначе False.
+    """
+    month = month or get_current_month()
+
+    with _current_db() as db:
+        with _transaction(db) as conn:
+            old = _select_unchanged(conn, month, expense_id, version)
+            if old is None:
+                return False
+            conn.execute(
+                f"UPDATE expenses SET {column} = ? WHERE month = ? AND id = ?",
+                (value, month, expense_id),
+            )
+            if column == "comment":
+                _unindex_comment(conn, month, expense_id)
+                _index_comment(conn, month, expense_id, value)
+
+        category, amount = old["category"], old["amount"]
+        if column == "category":
+            db.rollups.remove(month, category, amount)
+            db.rollups.add(month, value, amount)
+        elif column == "amount":
+            db.rollups.remove(month, category, amount)
+            db.rollups.add(month, category, value)
+        _mark_changed(db)
+        return True
+
+
+# --- Управление хранилищем ---
+
+
+def load() -> None:
+    """Открывает базу текущего арендатора. Вызывается при старте бота."""
+    with _current_db() as db:
+        db.connect()
+
+
+def flush() -> bool:
+    """Каждая операция фиксируется своей транзакцией, поэтому сбрасывать нечего."""
+    return False
+
+
+def close() -> None:
+    """Закрывает соединения со всеми открытыми базами (при остановке бота)."""
+    _databases.close_all()
+
+
+def archive_closed_months() -> list[str]:
+    """Запросы по месяцу идут по первичному ключу и не зависят от истории, поэтому архивировать нечего."""
+    return []
+
+
+@contextmanager
+def batch() -> Iterator[None]:
+    """Выполняет изменения внутри блока одной транзакцией с одним commit на всю пачку."""
+    with _current_db() as db:
+        conn = db.connect()
+        if not db.batch_depth:
+            conn.execute("BEGIN IMMEDIATE")
+        db.batch_depth += 1
+        try:
+            yield
+            if db.batch_depth == 1:
+                conn.commit()
+        except BaseException:
+            # Ошибка в пачке или в самом commit (SQLITE_BUSY, диск заполнен)
+            if db.batch_depth == 1:
+                conn.rollback()
+                # Агрегаты уже учли откатанные операции — пересчитываем
+                _rebuild_rollups(db)
+            raise
+        finally:
+            db.batch_depth -= 1
+
+
+def import_rows(month: str, rows: list[tuple]) -> int:
+    """
+    Импортирует строки листа месяца (id, дата, категория, сумма, комментарий).
+    Записи с уже существующим (month, id) перезаписываются, поэтому импорт
+    можно запускать повторно. Возвращает число импортированных строк.
+    """
+    prepared = [
+        (month, expense_id, _to_iso(date_value), category, amount, comment or "")
+        for expense_id, date_value, category, amount, comment in rows
+    ]
+
+    with _current_db() as db:
+        with _transaction(db) as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO expenses (month, id, date, category, amount, comment) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                prepared,
+            )
+            for _, expense_id, _, _, _, comment in prepared:
+                _unindex_comment(conn, month, expense_id)
+                _index_comment(conn, month, expense_id, comment)
+        _rebuild_rollups(db)
+        _mark_changed(db)
+    return len(prepared)
+
+
+# --- Публичный API репозитория ---
+
+
+def add_expense(category: str, amount: float, comment: str | None = None) -> int:
+    """
+    Добавляет новую запись расхода в текущий месяц.
+    Возвращает ID созданной записи.
+    """
+    month = get_current_month()
+
+    with _current_db() as db:
+        with _transaction(db) as conn:
+            # MAX по первичному ключу (month, id) — поиск по индексу, а не скан
+            (max_id,) = conn.execute(
+                "SELECT COALESCE(MAX(id), 0) FROM expenses WHERE month = ?", (month,)
+            ).fetchone()
+            new_id = max_id + 1
+            conn.execute(
+                "INSERT INTO expenses (month, id, date, category, amount, comment) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (month, new_id, date.today().isoformat(), category, amount, comment or ""),
+            )
+            _index_comment(conn, month, new_id, comment)
+        db.rollups.add(month, category, amount)
+        _mark_changed(db)
+
+    return new_id
+
+
+def add_expenses(items: list[tuple[str, float, str | None]]) -> list[int]:
+    """
+    Добавляет пачку записей (категория, сумма, комментарий) в текущий месяц
+    одной транзакцией. Возвращает ID созданных записей по порядку.
+    """
+    if not items:
+        return []
+
+    month = get_current_month()
+    today = date.today().isoformat()
+
+    with _current_db() as db:
+        with _transaction(db) as conn:
+            (max_id,) = conn.execute(
+                "SELECT COALESCE(MAX(id), 0) FROM expenses WHERE month = ?", (month,)
+            ).fetchone()
+            new_ids = list(range(max_id + 1, max_id + 1 + len(items)))
+            conn.executemany(
+                "INSERT INTO expenses (month, id, date, category, amount, comment) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (month, new_id, today, category, amount, comment or "")
+                    for new_id, (category, amount, comment) in zip(new_ids, items)
+                ],
+            )
+            for new_id, (_, _, comment) in zip(new_ids, items):
+                _index_comment(conn, month, new_id, comment)
+        for category, amount, _ in items:
+            db.rollups.add(month, category, amount)
+        _mark_changed(db)
+
+    return new_ids
+
+
+def import_expenses(items: list[tuple[str, date, str, float, str | None]]) -> int:
+    """
+    Добавляет записи импорта (хэш строки, дата, категория, сумма, комментарий)
+    в месяцы по их датам одной транзакцией. Строки с уже импортированным хэшем
+    пропускаются: хэш вставляется в import_hashes вместе с записью, и INSERT OR IGNORE
+    сообщает, был ли он уже. Возвращает число добавленных записей.
+    """
+    added: list[tuple[str, int, str, str, float, str]] = []
+
+    with _current_db() as db:
+        with _transaction(db) as conn:
+            next_ids: dict[str, int] = {}
+            for row_hash, expense_date, category, amount, comment in items:
+                cursor = conn.execute("INSERT OR IGNORE INTO import_hashes (hash) VALUES (?)", (row_hash,))
+                if not cursor.rowcount:
+                    continue
+
+                month = get_month_key(expense_date)
+                if month not in next_ids:
+                    (max_id,) = conn.execute(
+                        "SELECT COALESCE(MAX(id), 0) FROM expenses WHERE month = ?", (month,)
+                    ).fetchone()
+                    next_ids[month] = max_id + 1
+                added.append((month, next_ids[month], expense_date.isoformat(), category, amount, comment or ""))
+                next_ids[month] += 1
+
+            conn.executemany(
+                "INSERT INTO expenses (month, id, date, category, amount, comment) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                added,
+            )
+            for month, new_id, _, _, _, comment in added:
+                _index_comment(conn, month, new_id, comment)
+        if added:
+            for month, _, _, category, amount, _ in added:
+                db.rollups.add(month, category, amount)
+            _mark_changed(db)
+
+    return len(added)
+
+
+def list_months() -> list[str]:
+    """Возвращает ключи месяцев, за которые есть данные (по первичному ключу), по возрастанию."""
+    with _current_db() as db:
+        rows = db.connect().execute("SELECT DISTINCT month FROM expenses ORDER BY month").fetchall()
+    return [month for (month,) in rows]
+
+
+def iter_expenses(month: str | None = None) -> Iterator[dict]:
+    """
+    Лениво перебирает записи месяца (по умолчанию текущего) по одной (курсор читает строки порциями).
+    Соединение занято, пока итератор не дочитан, поэтому дочитывать его нужно в том же потоке.
+    """
+    with _current_db() as db:
+        cursor = db.connect().execute(
+            "SELECT id, date, category, amount, comment FROM expenses WHERE month = ? ORDER BY id",
+            (month or get_current_month(),),
+        )
+        for row in cursor:
+            yield _row_to_expense(row)
+
+
+def iter_expenses_between(date_from: date, date_to: date) -> Iterator[dict]:
+    """
+    Лениво перебирает записи с датой в диапазоне [date_from, date_to].
+    Даты хранятся в ISO, поэтому BETWEEN идёт по индексу idx_expenses_date.
+    """
+    with _current_db() as db:
+        cursor = db.connect().execute(
+            "SELECT id, date, category, amount, comment FROM expenses "
+            "WHERE date BETWEEN ? AND ? ORDER BY date, month, id",
+            (date_from.isoformat(), date_to.isoformat()),
+        )
+        for row in cursor:
+            yield _row_to_expense(row)
+
+
+def get_all_expenses(month: str | None = None) -> list[dict]:
+    """
+    Возвращает список всех записей месяца (по умолчанию текущего).
+    Каждая запись — словарь: {id, date, category, amount, comment}.
+    """
+    return list(iter_expenses(month))
+
+
+def has_expenses(month: str | None = None) -> bool:
+    """Проверяет, есть ли в месяце хотя бы одна запись."""
+    with _current_db() as db:
+        row = db.connect().execute(
+            "SELECT 1 FROM expenses WHERE month = ? LIMIT 1", (month or get_current_month(),)
+        ).fetchone()
+    return row is not None
+
+
+def count_expenses(month: str | None = None) -> int:
+    """Возвращает число записей в месяце (из агрегатов)."""
+    with _current_db() as db:
+        _sync_with_db(db)
+        return db.rollups.month_count(month or get_current_month())
+
+
+def get_expenses_page(offset: int, limit: int, month: str | None = None) -> list[dict]:
+    """Возвращает записи месяца с offset по offset + limit, упорядоченные по ID."""
+    with _current_db() as db:
+        rows = db.connect().execute(
+            "SELECT id, date, category, amount, comment FROM expenses "
+            "WHERE month = ? ORDER BY id LIMIT ? OFFSET ?",
+            (month or get_current_month(), limit, offset),
+        ).fetchall()
+    return [_row_to_expense(row) for row in rows]
+
+
+def search_expenses(query: str, offset: int, limit: int) -> tuple[int, list[dict]]:
+    """
+    Ищет записи всех месяцев по словам комментария (начало слова, без учёта регистра).
+    Возвращает общее число найденных и записи с offset по offset + limit
+    от новых к старым; у каждой записи есть ключ месяца 'month'.
+    Каждое слово запроса — диапазон по первичному ключу comment_tokens.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return 0, []
+
+    # Слово-префикс p совпадает со словами из диапазона [p, p с увеличенным последним символом)
+    conditions = " AND ".join(
+        "(month, id) IN (SELECT month, id FROM comment_tokens WHERE token >= ? AND token < ?)" for _ in tokens
+    )
+    params = tuple(
+        bound for token in tokens for bound in (token, token[:-1] + chr(ord(token[-1]) + 1))
+    )
+
+    with _current_db() as db:
+        conn = db.connect()
+        (total,) = conn.execute(f"SELECT COUNT(*) FROM expenses WHERE {conditions}", params).fetchone()
+        rows = conn.execute(
+            f"SELECT month, id, date, category, amount, comment FROM expenses WHERE {conditions} "
+            "ORDER BY month DESC, id DESC LIMIT ? OFFSET ?",
+            params + (limit, offset),
+        ).fetchall()
+    return total, [{**_row_to_expense(row[1:]), "month": row[0]} for row in rows]
+
+
+def get_month_table(month: str | None = None) -> MonthTable:
+    """Записи месяца (по умолчанию текущего) в колоночном виде; строится одним запросом."""
+    return MonthTable.from_expenses(iter_expenses(month))
+
+
+def get_month_total(month: str | None = None) -> float:
+    """Возвращает сумму расходов за месяц — готовое значение из агрегатов."""
+    with _current_db() as db:
+        _sync_with_db(db)
+        return db.rollups.month_total(month or get_current_month())
+
+
+def get_month_summary(month: str) -> dict[str, tuple[float, int]]:
+    """Возвращает разбивку месяца по категориям: {категория: (сумма, количество)}."""
+    with _current_db() as db:
+        _sync_with_db(db)
+        return db.rollups.month_summary(month)
+
+
+def rebuild_rollups() -> None:
+    """Пересчитывает агрегаты заново по данным в базе."""
+    with _current_db() as db:
+        _rebuild_rollups(db)
+
+
+def expense_exists(expense_id: int, month: str | None = None) -> bool:
+    """Проверяет существование записи с указанным ID в месяце."""
+    with _current_db() as db:
+        row = db.connect().execute(
+            "SELECT 1 FROM expenses WHERE month = ? AND id = ?", (month or get_current_month(), expense_id)
+        ).fetchone()
+    return row is not None
+
+
+def get_expense(expense_id: int, month: str | None = None) -> dict | None:
+    """
+    Возвращает запись с указанным ID в месяце (по умолчанию текущем) или None.
+    Одна выборка по первичному ключу; у записи есть ключ версии 'version'.
+    """
+    with _current_db() as db:
+        expense = _select_expense(db.connect(), month or get_current_month(), expense_id)
+    if expense is None:
+        return None
+    return {**expense, "version": get_expense_version(expense)}
+
+
+def delete_expense(expense_id: int, month: str | None = None, version: str | None = None) -> bool:
+    """
+    Удаляет запись с указанным ID в месяце (по умолчанию текущем).
+    Возвращает True если запись найдена (и не менялась с version) и удалена, иначе False.
+    """
+    month = month or get_current_month()
+
+    with _current_db() as db:
+        with _transaction(db) as conn:
+            old = _select_unchanged(conn, month, expense_id, version)
+            if old is None:
+                return False
+            conn.execute("DELETE FROM expenses WHERE month = ? AND id = ?", (month, expense_id))
+            _unindex_comment(conn, month, expense_id)
+
+        db.rollups.remove(month, old["category"], old["amount"])
+        _mark_changed(db)
+        return True
+
+
+def update_expense_category(
+    expense_id: int, new_category: str, month: str | None = None, version: str | None = None
+) -> bool:
+    """Обновляет категорию записи по ID. Возвращает True если запись найдена (и не менялась с version) и обновлена."""
+    return _update_field(expense_id, "category", new_category, month, version)
+
+
+def update_expense_amount(
+    expense_id: int, new_amount: float, month: str | None = None, version: str | None = None
+) -> bool:
+    """Обновляет сумму записи по ID. Возвращает True если запись найдена (и не менялась с version) и обновлена."""
+    return _update_field(expense_id, "amount", new_amount, month, version)
+
+
+def update_expense_comment(
+    expense_id: int, new_comment: str, month: str | None = None, version: str | None = None
+) -> bool:
+    """Обновляет комментарий записи по ID. Возвращает True если запись найдена (и не менялась с version) и обновлена."""
+    return _update_field(expense_id, "comment", new_comment, month, version)
+
+
+def get_data_version() -> int:
+    """
+    Возвращает версию данных — она меняется после каждого изменения,
+    в том числе сделанного другим процессом с той же базой.
+    """
+    with _current_db() as db:
+        _sync_with_db(db)
+        return db.data_version
+
+
+def build_export_file(path: Path, date_from: date | None = None, date_to: date | None = None) -> Path:
+    """
+    Собирает из базы xlsx-файл для экспорта: по листу на месяц, как в expenses.xlsx.
+    С диапазоном дат выгружаются только записи из него (отбор по индексу даты).
+    Строки читаются курсором и сразу уходят в write-only книгу.
+    """
+    def month_rows(conn: sqlite3.Connection, month: str) -> Iterator[list]:
+        query = "SELECT id, date, category, amount, comment FROM expenses WHERE month = ?"
+        params: tuple = (month,)
+        if date_from is not None and date_to is not None:
+            query += " AND date BETWEEN ? AND ?"
+            params += (date_from.isoformat(), date_to.isoformat())
+        for row in conn.execute(query + " ORDER BY id", params):
+            expense = _row_to_expense(row)
+            yield [expense["id"], expense["date"], expense["category"], expense["amount"], expense["comment"]]
+
+    with _current_db() as db:
+        conn = db.connect()
+        months = list_months()
+        if date_from is not None and date_to is not None:
+            months = [m for m in get_months_between(date_from, date_to) if m in months]
+        with metrics.timed("storage_operation_seconds", backend="sqlite", op="export"):
+            return write_workbook(path, ((month, month_rows(conn, month)) for month in months))
@@ -0,0 +1,173 @@
+"""
+Разделение данных по арендаторам (магазинам, отделам).
+
+У каждого арендатора своя папка с данными: хранилище по умолчанию ("") лежит
+прямо в DATA_DIR, как до разделения, остальные — в DATA_DIR/tenants/<арендатор>.
+Текущий арендатор хранится в contextvar: его выставляет TenantMiddleware
+для обработки сообщения, а сервисы переносят его в потоки хранилища.
+
+Репозитории держат открытые хранилища арендаторов в StoreCache — LRU
+ограниченного размера: давно не использованное хранилище сбрасывается
+на диск и закрывается, поэтому память не растёт с числом арендаторов.
+"""
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Callable, Generic, Iterator, TypeVar
+
+import metrics
+from config import DATA_DIR
+
+# Арендатор по умолчанию: данные в самой DATA_DIR (режим без разделения, скрипты)
+DEFAULT_TENANT: str = ""
+
+# Папка с данными остальных арендаторов
+TENANTS_DIR: Path = DATA_DIR / "tenants"
+
+# Допустимое имя арендатора: оно становится именем папки
+TENANT_RE = re.compile(r"-?\w+")
+
+_current_tenant: ContextVar[str] = ContextVar("tenant", default=DEFAULT_TENANT)
+
+S = TypeVar("S")
+
+
+def get_tenant() -> str:
+    """Текущий арендатор."""
+    return _current_tenant.get()
+
+
+@contextmanager
+def use_tenant(tenant: str) -> Iterator[None]:
+    """Делает tenant текущим арендатором на время блока."""
+    if tenant != DEFAULT_TENANT and not TENANT_RE.fullmatch(tenant):
+        raise ValueError(f"Недопустимое имя арендатора: {tenant!r}")
+    token = _current_tenant.set(tenant)
+    try:
+        yield
+    finally:
+        _current_tenant.reset(token)
+
+
+def get_tenant_dir(tenant: str) -> Path:
+    """Папка с данными арендатора (создаётся при первом обращении)."""
+    if tenant == DEFAULT_TENANT:
+        return DATA_DIR
+    path = TENANTS_DIR / tenant
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def list_tenants() -> list[str]:
+    """Арендаторы, у которых есть папка с данными (включая арендатора по умолчанию)."""
+    tenants = [DEFAULT_TENANT]
+    if TENANTS_DIR.is_dir():
+        tenants += sorted(path.name for path in TENANTS_DIR.iterdir() if path.is_dir())
+    return tenants
+
+
+class StoreCache(Generic[S]):
+    """
+    LRU открытых хранилищ арендаторов.
+    Хранилище открывается при первом обращении (open_store) и закрывается
+    (close_store — сброс на диск и освобождение памяти), когда открытых
+    становится больше capacity и оно дольше всех не использовалось.
+    Хранилище, с которым сейчас работают (внутри use()), не вытесняется:
+    иначе его закрытие пришлось бы ждать посреди пачки изменений или
+    незаконченного обхода записей. Поэтому открытых временно может быть
+    больше capacity — лишние закроются, как только освободятся.
+    Закрытие идёт вне lock кэша, чтобы сброс одного арендатора на диск
+    не задерживал остальных.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        open_store: Callable[[str], S],
+        close_store: Callable[[S], None],
+        backend: str,
+    ) -> None:
+        self.capacity = max(1, capacity)
+        self._open_store = open_store
+        self._close_store = close_store
+        self._backend = backend
+        self._lock = threading.Lock()
+        self._stores: OrderedDict[str, S] = OrderedDict()
+        # Сколько блоков use() сейчас работает с хранилищем арендатора
+        self._pins: dict[str, int] = {}
+
+    @contextmanager
+    def use(self, tenant: str) -> Iterator[S]:
+        """Хранилище арендатора на время блока; на это время оно защищено от вытеснения."""
+        with self._lock:
+            store = self._stores.get(tenant)
+            if store is None:
+                store = self._stores[tenant] = self._open_store(tenant)
+            else:
+                self._stores.move_to_end(tenant)
+            self._pins[tenant] = self._pins.get(tenant, 0) + 1
+            evicted = self._take_evicted()
+        self._close(evicted)
+
+        try:
+            yield store
+        finally:
+            self._unpin(tenant)
+
+    def iter_open(self) -> Iterator[tuple[str, S]]:
+        """
+        Перебирает открытые хранилища (для сброса на диск и архивации всех арендаторов).
+        Порядок вытеснения не меняется, уже закрытые хранилища не открываются заново.
+        """
+        for tenant in self.open_tenants():
+            with self._lock:
+                store = self._stores.get(tenant)
+                if store is None:
+                    continue
+                self._pins[tenant] = self._pins.get(tenant, 0) + 1
+            try:
+                yield tenant, store
+            finally:
+                self._unpin(tenant)
+
+    def open_tenants(self) -> list[str]:
+        """Арендаторы, чьи хранилища сейчас открыты."""
+        with self._lock:
+            return list(self._stores)
+
+    def close_all(self) -> None:
+        """Закрывает все свободные хранилища (при остановке)."""
+        with self._lock:
+            evicted = [
+                self._stores.pop(tenant) for tenant in list(self._stores) if tenant not in self._pins
+            ]
+        self._close(evicted)
+
+    def _unpin(self, tenant: str) -> None:
+        """Снимает защиту от вытеснения и закрывает лишние хранилища, если они освободились."""
+        with self._lock:
+            self._pins[tenant] -= 1
+            if not self._pins[tenant]:
+                del self._pins[tenant]
+            evicted = self._take_evicted()
+        self._close(evicted)
+
+    def _take_evicted(self) -> list[S]:
+        """Убирает из кэша лишние свободные хранилища, начиная с давно не использованных. Под lock."""
+        evicted = []
+        for tenant in list(self._stores):
+            if len(self._stores) <= self.capacity:
+                break
+            if tenant not in self._pins:
+                evicted.append(self._stores.pop(tenant))
+        if evicted:
+            metrics.inc("storage_store_evictions_total", len(evicted), backend=self._backend)
+        metrics.set_value("storage_stores_open", len(self._stores), backend=self._backend)
+        return evicted
+
+    def _close(self, stores: list[S]) -> None:
+        for store in stores:
+            self._close_store(store)
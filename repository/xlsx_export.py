@@ -0,0 +1,48 @@
+import os
+from datetime import date
+from pathlib import Path
+from typing import Iterable
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+
+from repository.base import HEADER_ROW, EXCEL_DATE_FORMAT, get_current_month
+
+
+def write_workbook(path: Path, sheets: Iterable[tuple[str, Iterable[list]]]) -> Path:
+    """
+    Потоково записывает книгу для экспорта: по листу на месяц с заголовком.
+    sheets — пары (имя листа, строки); строки могут быть генератором,
+    в write-only режиме openpyxl сразу сбрасывает их в файл и не держит в памяти.
+    Даты пишутся типизированными ячейками в формате ДД.ММ.ГГГГ.
+    Файл подменяется атомарно, чтобы параллельный экспорт не увидел его недописанным.
+    """
+    wb = Workbook(write_only=True)
+
+    for title, rows in sheets:
+        ws = wb.create_sheet(title=title)
+        ws.append(HEADER_ROW)
+        for row in rows:
+            ws.append([_date_cell(ws, value) if isinstance(value, date) else value for value in row])
+
+    if not wb.worksheets:
+        # Книга без листов не сохраняется — оставляем пустой лист текущего месяца
+        wb.create_sheet(title=get_current_month()).append(HEADER_ROW)
+
+    # Свой временный файл у каждого процесса: параллельные выгрузки одного периода
+    # из разных воркеров не пишут в один файл и не подменяют друг другу недописанный
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        wb.save(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return path
+
+
+def _date_cell(ws, value: date) -> WriteOnlyCell:
+    """Ячейка write-only листа с датой и форматом отображения."""
+    cell = WriteOnlyCell(ws, value=value)
+    cell.number_format = EXCEL_DATE_FORMAT
+    return cell
@@ -0,0 +1,178 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from functools import partial
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from config import IO_WORKERS, WRITE_BATCH_WINDOW, WRITE_BATCH_MAX
+from services import expense_service
+from services.expense_service import Period
+from services.write_coordinator import WriteCoordinator
+
+# Пул для чтения: несколько потоков, чтобы долгие операции не блокировали event loop
+_read_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="expense-read")
+
+# Единственный поток-писатель: его очередь задач сериализует все изменения данных
+_write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="expense-write")
+
+# Изменения от разных пользователей собираются в пачки и фиксируются в потоке-писателе разом
+_write_coordinator = WriteCoordinator(_write_executor, WRITE_BATCH_WINDOW, WRITE_BATCH_MAX)
+
+
+async def _run_read(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Выполняет чтение в пуле потоков и возвращает результат.
+    Контекст (текущий арендатор) переносится в поток, как в asyncio.to_thread.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_read_executor, partial(context.run, func, *args, **kwargs))
+
+
+async def _run_write(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Ставит служебную операцию (загрузка, сброс) в очередь потока-писателя и ждёт её результата."""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_write_executor, partial(context.run, func, *args, **kwargs))
+
+
+async def _submit_write(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Отдаёт изменение данных в групповую фиксацию и ждёт его результата."""
+    return await _write_coordinator.submit(func, *args, **kwargs)
+
+
+# --- Управление хранилищем ---
+
+
+async def load_storage() -> None:
+    """Загружает данные в память, не блокируя event loop."""
+    await _run_write(expense_service.load_storage)
+
+
+async def flush_storage() -> bool:
+    """Сбрасывает изменения на диск в потоке-писателе. Возвращает True если была запись."""
+    return await _run_write(expense_service.flush_storage)
+
+
+async def archive_closed_months() -> list[str]:
+    """Переносит закрытые месяцы в архив в потоке-писателе."""
+    return await _run_write(expense_service.archive_closed_months)
+
+
+async def shutdown() -> None:
+    """Дофиксирует накопленные изменения, сохраняет их на диск и останавливает пулы потоков."""
+    await _write_coordinator.drain()
+    await _run_write(expense_service.close_storage)
+    _read_executor.shutdown(wait=True)
+    _write_executor.shutdown(wait=True)
+
+
+# --- Бизнес-логика ---
+
+
+async def add_expense(category: str, amount: float, comment: str | None = None) -> int:
+    """Асинхронный вариант expense_service.add_expense."""
+    return await _submit_write(expense_service.add_expense, category=category, amount=amount, comment=comment)
+
+
+async def add_expenses(items: list[tuple[str, float, str | None]]) -> list[int]:
+    """Асинхронный вариант expense_service.add_expenses."""
+    return await _submit_write(expense_service.add_expenses, items)
+
+
+async def import_expenses(items: list[tuple[str, date, str, float, str | None]]) -> int:
+    """Асинхронный вариант expense_service.import_expenses."""
+    return await _submit_write(expense_service.import_expenses, items)
+
+
+async def read_chunk(rows: Iterator[Any], size: int) -> list:
+    """Читает следующие size элементов потокового итератора (разбор файла) в пуле потоков."""
+    return await _run_read(lambda: list(islice(rows, size)))
+
+
+async def get_all_expenses(month: str | None = None) -> list[dict]:
+    """Асинхронный вариант expense_service.get_all_expenses."""
+    return await _run_read(expense_service.get_all_expenses, month)
+
+
+async def has_expenses(month: str | None = None) -> bool:
+    """Асинхронный вариант expense_service.has_expenses."""
+    return await _run_read(expense_service.has_expenses, month)
+
+
+async def count_expenses(month: str | None = None) -> int:
+    """Асинхронный вариант expense_service.count_expenses."""
+    return await _run_read(expense_service.count_expenses, month)
+
+
+async def get_expenses_page(offset: int, limit: int, month: str | None = None) -> list[dict]:
+    """Асинхронный вариант expense_service.get_expenses_page."""
+    return await _run_read(expense_service.get_expenses_page, offset, limit, month)
+
+
+async def search_expenses(query: str, offset: int, limit: int) -> tuple[int, list[dict]]:
+    """Асинхронный вариант expense_service.search_expenses."""
+    return await _run_read(expense_service.search_expenses, query, offset, limit)
+
+
+async def get_month_total(month: str | None = None) -> float:
+    """Асинхронный вариант expense_service.get_month_total."""
+    return await _run_read(expense_service.get_month_total, month)
+
+
+async def get_month_summary(month: str) -> dict[str, tuple[float, int]]:
+    """Асинхронный вариант expense_service.get_month_summary."""
+    return await _run_read(expense_service.get_month_summary, month)
+
+
+async def get_period_summary(period: Period) -> dict[str, tuple[float, int]]:
+    """Асинхронный вариант expense_service.get_period_summary."""
+    return await _run_read(expense_service.get_period_summary, period)
+
+
+async def get_period_page(period: Period, offset: int, limit: int) -> list[dict]:
+    """Асинхронный вариант expense_service.get_period_page."""
+    return await _run_read(expense_service.get_period_page, period, offset, limit)
+
+
+async def expense_exists(expense_id: int) -> bool:
+    """Асинхронный вариант expense_service.expense_exists."""
+    return await _run_read(expense_service.expense_exists, expense_id)
+
+
+async def get_expense(expense_id: int) -> dict | None:
+    """Асинхронный вариант expense_service.get_expense."""
+    return await _run_read(expense_service.get_expense, expense_id)
+
+
+async def delete_expense(expense_id: int, version: str | None = None) -> bool:
+    """Асинхронный вариант expense_service.delete_expense."""
+    return await _submit_write(expense_service.delete_expense, expense_id, version)
+
+
+async def update_category(expense_id: int, new_category: str, version: str | None = None) -> bool:
+    """Асинхронный вариант expense_service.update_category."""
+    return await _submit_write(expense_service.update_category, expense_id, new_category, version)
+
+
+async def update_amount(expense_id: int, new_amount: float, version: str | None = None) -> bool:
+    """Асинхронный вариант expense_service.update_amount."""
+    return await _submit_write(expense_service.update_amount, expense_id, new_amount, version)
+
+
+async def update_comment(expense_id: int, new_comment: str, version: str | None = None) -> bool:
+    """Асинхронный вариант expense_service.update_comment."""
+    return await _submit_write(expense_service.update_comment, expense_id, new_comment, version)
+
+
+async def get_data_version() -> int:
+    """Асинхронный вариант expense_service.get_data_version."""
+    return await _run_read(expense_service.get_data_version)
+
+
+async def build_export_file(period: Period | None = None) -> Path:
+    """Асинхронный вариант expense_service.build_export_file."""
+    return await _run_read(expense_service.build_export_file, period)
@@ -1,5 +1,32 @@
-from config import CATEGORIES
-from repository import excel_repo
+import re
+from difflib import get_close_matches
+from contextlib import closing
+from datetime import date, datetime, timedelta
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from config import CATEGORIES, STORAGE_BACKEND
+from repository import base, excel_repo, sqlite_repo, tenants
+from repository.base import ExpenseRepository
+from repository.month_table import MonthTable, to_kopecks
+from repository.search_index import tokenize
+
+
+def _select_repository() -> ExpenseRepository:
+    """Выбирает реализацию хранилища по config.STORAGE_BACKEND."""
+    if STORAGE_BACKEND == "excel":
+        return excel_repo
+    if STORAGE_BACKEND == "sqlite":
+        return sqlite_repo
+    raise ValueError(f"Неизвестное хранилище: {STORAGE_BACKEND}")
+
+
+# Хранилище, с которым работает сервис
+repo: ExpenseRepository = _select_repository()
+
+# Период выборки — границы диапазона дат включительно
+Period = tuple[date, date]
 
 
 # --- Валидация ---
@@ -26,6 +53,207 @@ def parse_amount(text: str) -> float | None:
         return None
 
 
+def match_category(text: str) -> str | None:
+    """
+    Нечётко подбирает категорию из списка по введённому тексту:
+    без учёта регистра, по однозначному началу названия или по похожести
+    (опечатки). Возвращает None если подходящей категории нет.
+    """
+    cleaned = text.strip().lower()
+    if not cleaned:
+        return None
+
+    by_lower = {category.lower(): category for category in CATEGORIES}
+    if cleaned in by_lower:
+        return by_lower[cleaned]
+
+    prefixed = [category for lower, category in by_lower.items() if lower.startswith(cleaned)]
+    if len(prefixed) == 1:
+        return prefixed[0]
+
+    matches = get_close_matches(cleaned, list(by_lower), n=1, cutoff=0.6)
+    return by_lower[matches[0]] if matches else None
+
+
+def parse_bulk_line(line: str) -> tuple[str, float, str | None]:
+    """
+    Разбирает строку пакетного ввода 'категория; сумма; комментарий'
+    (комментарий необязателен). Возвращает (категория, сумма, комментарий)
+    или выбрасывает ValueError с описанием ошибки для пользователя.
+    """
+    parts = [part.strip() for part in line.split(";", 2)]
+    if len(parts) < 2:
+        raise ValueError("ожидается «категория; сумма; комментарий»")
+
+    category = match_category(parts[0])
+    if category is None:
+        raise ValueError(f"неизвестная категория «{parts[0]}»")
+
+    amount = parse_amount(parts[1])
+    if amount is None:
+        raise ValueError(f"некорректная сумма «{parts[1]}»")
+
+    comment = parts[2] if len(parts) > 2 and parts[2] else None
+    return category, amount, comment
+
+
+def parse_month(text: str) -> str | None:
+    """
+    Парсит ключ месяца в формате ГГГГ_ММ (например '2026_02').
+    Возвращает None если строка не похожа на месяц.
+    """
+    cleaned = text.strip()
+    if not re.fullmatch(r"\d{4}_(0[1-9]|1[0-2])", cleaned):
+        return None
+    return cleaned
+
+
+def parse_period(text: str) -> Period | None:
+    """
+    Парсит период: месяц 'ГГГГ_ММ', день 'ДД.ММ.ГГГГ'
+    или диапазон 'ДД.ММ.ГГГГ-ДД.ММ.ГГГГ'.
+    Возвращает (первый день, последний день) или None если формат не распознан.
+    """
+    cleaned = text.strip()
+
+    month = parse_month(cleaned)
+    if month is not None:
+        return base.get_month_bounds(month)
+
+    parts = [part.strip() for part in cleaned.split("-")]
+    if len(parts) > 2:
+        return None
+    try:
+        days = [datetime.strptime(part, base.DATE_FORMAT).date() for part in parts]
+    except ValueError:
+        return None
+
+    date_from, date_to = days[0], days[-1]
+    if date_from > date_to:
+        return None
+    return date_from, date_to
+
+
+# --- Периоды ---
+
+
+def get_month_period(month: str | None = None) -> Period:
+    """Возвращает период месяца (по умолчанию текущего)."""
+    return base.get_month_bounds(month or base.get_current_month())
+
+
+def get_period_month(period: Period) -> str | None:
+    """Если период ровно совпадает с календарным месяцем — возвращает его ключ, иначе None."""
+    month = base.get_month_key(period[0])
+    return month if base.get_month_bounds(month) == period else None
+
+
+def get_period_key(period: Period) -> str:
+    """
+    Компактный ключ периода для callback_data и имён файлов:
+    '2026_02' для месяца, '20260201-20260215' для произвольного диапазона.
+    """
+    month = get_period_month(period)
+    if month is not None:
+        return month
+    return f"{period[0]:%Y%m%d}-{period[1]:%Y%m%d}"
+
+
+def parse_period_key(key: str) -> Period | None:
+    """Обратное к get_period_key преобразование. Возвращает None для неизвестного ключа."""
+    month = parse_month(key)
+    if month is not None:
+        return base.get_month_bounds(month)
+    try:
+        date_from, date_to = (datetime.strptime(part, "%Y%m%d").date() for part in key.split("-"))
+    except ValueError:
+        return None
+    return (date_from, date_to) if date_from <= date_to else None
+
+
+def get_previous_period(period: Period) -> Period:
+    """Период для сравнения: предыдущий месяц или предшествующий диапазон той же длины."""
+    month = get_period_month(period)
+    if month is not None:
+        return base.get_month_bounds(base.get_previous_month(month))
+    length = period[1] - period[0]
+    previous_to = period[0] - timedelta(days=1)
+    return previous_to - length, previous_to
+
+
+def get_period_label(period: Period) -> str:
+    """Метка периода для бота: 'Февраль 2026' или '01.02.2026 — 15.02.2026'."""
+    month = get_period_month(period)
+    if month is not None:
+        return base.get_month_label(month)
+    if period[0] == period[1]:
+        return format_date(period[0])
+    return f"{format_date(period[0])} — {format_date(period[1])}"
+
+
+def format_date(value) -> str:
+    """Дата записи для отображения: 'ДД.ММ.ГГГГ' (нераспознанное значение — как есть)."""
+    if isinstance(value, date):
+        return value.strftime(base.DATE_FORMAT)
+    return str(value)
+
+
+def format_expense(expense: dict) -> str:
+    """Запись одной строкой: '#7 | 01.02.2026 | Еда | 350.00 руб. | комментарий'."""
+    line = f"#{expense['id']} | {format_date(expense['date'])} | {expense['category']} | {expense['amount']:.2f} руб."
+    if expense["comment"]:
+        line += f" | {expense['comment']}"
+    return line
+
+
+def format_change(current: float, previous: float) -> str:
+    """Форматирует изменение суммы относительно прошлого периода: '+150.00 руб. (+12.5%)'."""
+    diff = current - previous
+    text = f"{diff:+.2f} руб."
+    if previous:
+        text += f" ({diff / previous * 100:+.1f}%)"
+    return text
+
+
+# --- Управление хранилищем ---
+
+
+def load_storage() -> None:
+    """Загружает данные в память при старте бота."""
+    repo.load()
+
+
+def flush_storage() -> bool:
+    """Переносит накопленные изменения всех открытых хранилищ в основные файлы. Возвращает True если была запись."""
+    return repo.flush()
+
+
+def archive_closed_months() -> list[str]:
+    """Переносит закрытые месяцы в архив. Возвращает ключи перенесённых месяцев."""
+    return repo.archive_closed_months()
+
+
+def close_storage() -> None:
+    """Закрывает открытые хранилища арендаторов (при остановке бота)."""
+    repo.close()
+
+
+def run_batch(calls: list[Callable[[], Any]], tenant: str = tenants.DEFAULT_TENANT) -> list[tuple[bool, Any]]:
+    """
+    Выполняет пачку изменений арендатора tenant с одной фиксацией в его хранилище.
+    Ошибка одного изменения не отменяет остальные: для каждого вызова
+    возвращается (True, результат) или (False, исключение).
+    """
+    results: list[tuple[bool, Any]] = []
+    with tenants.use_tenant(tenant), repo.batch():
+        for call in calls:
+            try:
+                results.append((True, call()))
+            except Exception as e:
+                results.append((False, e))
+    return results
+
+
 # --- Бизнес-логика ---
 
 
@@ -39,38 +267,209 @@ def add_expense(category: str, amount: float, comment: str | None = None) -> int
     if amount <= 0:
         raise ValueError("Сумма должна быть положительной")
 
-    return excel_repo.add_expense(category=category, amount=amount, comment=comment)
+    return repo.add_expense(category=category, amount=amount, comment=comment)
+
+
+def add_expenses(items: list[tuple[str, float, str | None]]) -> list[int]:
+    """
+    Валидирует и сохраняет пачку расходов (категория, сумма, комментарий)
+    одной операцией хранилища. Возвращает ID созданных записей по порядку.
+    """
+    for category, amount, _ in items:
+        if not is_valid_category(category):
+            raise ValueError(f"Недопустимая категория: {category}")
+        if amount <= 0:
+            raise ValueError("Сумма должна быть положительной")
+
+    return repo.add_expenses(items)
+
+
+def import_expenses(items: list[tuple[str, date, str, float, str | None]]) -> int:
+    """
+    Валидирует и сохраняет порцию строк выписки (хэш, дата, категория, сумма, комментарий)
+    одной операцией хранилища. Уже импортированные строки пропускаются.
+    Возвращает число добавленных записей.
+    """
+    for _, _, category, amount, _ in items:
+        if not is_valid_category(category):
+            raise ValueError(f"Недопустимая категория: {category}")
+        if amount <= 0:
+            raise ValueError("Сумма должна быть положительной")
+
+    return repo.import_expenses(items)
+
+
+def get_all_expenses(month: str | None = None) -> list[dict]:
+    """Возвращает все записи месяца (по умолчанию текущего)."""
+    return repo.get_all_expenses(month)
+
+
+def iter_expenses(month: str | None = None) -> Iterator[dict]:
+    """Лениво перебирает записи месяца (по умолчанию текущего)."""
+    return repo.iter_expenses(month)
+
+
+def has_expenses(month: str | None = None) -> bool:
+    """Проверяет, есть ли записи в месяце (по умолчанию текущем)."""
+    return repo.has_expenses(month)
+
+
+def count_expenses(month: str | None = None) -> int:
+    """Возвращает число записей в месяце (по умолчанию текущем)."""
+    return repo.count_expenses(month)
+
+
+def get_expenses_page(offset: int, limit: int, month: str | None = None) -> list[dict]:
+    """Возвращает одну страницу записей месяца (по умолчанию текущего)."""
+    return repo.get_expenses_page(offset, limit, month)
+
+
+def search_expenses(query: str, offset: int, limit: int) -> tuple[int, list[dict]]:
+    """
+    Ищет записи всех месяцев по словам комментария.
+    Возвращает (всего найдено, записи страницы от новых к старым с ключом 'month').
+    """
+    return repo.search_expenses(query, offset, limit)
+
+
+def get_search_query(text: str) -> str:
+    """Нормализованный запрос /find: слова через пробел (регистр и «ё» приведены, порядок не важен)."""
+    return " ".join(sorted(tokenize(text)))
+
+
+def get_month_table(month: str | None = None) -> MonthTable:
+    """Записи месяца (по умолчанию текущего) в колоночном виде — для сумм и отборов по всему месяцу."""
+    return repo.get_month_table(month)
 
 
-def get_all_expenses() -> list[dict]:
-    """Возвращает все записи текущего месяца."""
-    return excel_repo.get_all_expenses()
+def get_month_total(month: str | None = None) -> float:
+    """Возвращает сумму расходов за месяц (по умолчанию текущий)."""
+    return repo.get_month_total(month)
 
 
-def delete_expense(expense_id: int) -> bool:
-    """Удаляет запись по ID. Возвращает True если удалена успешно."""
-    return excel_repo.delete_expense(expense_id)
+def get_month_summary(month: str) -> dict[str, tuple[float, int]]:
+    """Возвращает разбивку месяца по категориям: {категория: (сумма, количество)}."""
+    return repo.get_month_summary(month)
 
 
-def update_category(expense_id: int, new_category: str) -> bool:
-    """Обновляет категорию записи. Возвращает True если обновление успешно."""
+def list_months() -> list[str]:
+    """Возвращает ключи месяцев, за которые есть записи."""
+    return repo.list_months()
+
+
+def get_period_summary(period: Period) -> dict[str, tuple[float, int]]:
+    """
+    Разбивка периода по категориям: {категория: (сумма, количество)}.
+    Полностью попавшие в период месяцы берутся из готовых агрегатов,
+    крайние месяцы, которые период задевает частично, — отбором по датам
+    из колоночной таблицы месяца. Суммы складываются в копейках.
+    """
+    date_from, date_to = period
+    sums: dict[str, int] = {}
+    counts: dict[str, int] = {}
+
+    def add(category: str, kopecks: int, count: int) -> None:
+        sums[category] = sums.get(category, 0) + kopecks
+        counts[category] = counts.get(category, 0) + count
+
+    months = set(repo.list_months())
+    for month in base.get_months_between(date_from, date_to):
+        if month not in months:
+            continue
+        month_from, month_to = base.get_month_bounds(month)
+        if date_from <= month_from and month_to <= date_to:
+            for category, (amount, count) in repo.get_month_summary(month).items():
+                add(category, to_kopecks(amount), count)
+            continue
+
+        table = repo.get_month_table(month).between(date_from, date_to)
+        for category, (kopecks, count) in table.summary_kopecks().items():
+            add(category, kopecks, count)
+
+    return {category: (sums[category] / 100, counts[category]) for category in sums}
+
+
+def get_period_page(period: Period, offset: int, limit: int) -> list[dict]:
+    """
+    Возвращает одну страницу записей периода.
+    Для целого месяца — постраничное чтение листа, для диапазона — ленивый
+    перебор по индексу месяцев до конца нужной страницы.
+    """
+    month = get_period_month(period)
+    if month is not None:
+        return repo.get_expenses_page(offset, limit, month)
+
+    # Итератор держит lock хранилища — закрываем его сразу после среза
+    with closing(repo.iter_expenses_between(*period)) as expenses:
+        return list(islice(expenses, offset, offset + limit))
+
+
+def expense_exists(expense_id: int) -> bool:
+    """Проверяет, существует ли запись с указанным ID в текущем месяце."""
+    return repo.expense_exists(expense_id)
+
+
+def get_expense(expense_id: int) -> dict | None:
+    """
+    Возвращает запись текущего месяца по ID или None.
+    Ключ 'version' записи передаётся в изменение или удаление, чтобы не затереть чужую правку.
+    """
+    return repo.get_expense(expense_id)
+
+
+def delete_expense(expense_id: int, version: str | None = None) -> bool:
+    """
+    Удаляет запись по ID. Возвращает True если удалена успешно;
+    False — если записи нет или она изменилась после чтения версии version.
+    """
+    return repo.delete_expense(expense_id, version=version)
+
+
+def update_category(expense_id: int, new_category: str, version: str | None = None) -> bool:
+    """Обновляет категорию записи. Возвращает True если обновление успешно (версия — как у delete_expense)."""
     if not is_valid_category(new_category):
         raise ValueError(f"Недопустимая категория: {new_category}")
-    return excel_repo.update_expense_category(expense_id, new_category)
+    return repo.update_expense_category(expense_id, new_category, version=version)
 
 
-def update_amount(expense_id: int, new_amount: float) -> bool:
-    """Обновляет сумму записи. Возвращает True если обновление успешно."""
+def update_amount(expense_id: int, new_amount: float, version: str | None = None) -> bool:
+    """Обновляет сумму записи. Возвращает True если обновление успешно (версия — как у delete_expense)."""
     if new_amount <= 0:
         raise ValueError("Сумма должна быть положительной")
-    return excel_repo.update_expense_amount(expense_id, new_amount)
+    return repo.update_expense_amount(expense_id, new_amount, version=version)
+
+
+def update_comment(expense_id: int, new_comment: str, version: str | None = None) -> bool:
+    """Обновляет комментарий записи. Возвращает True если обновление успешно (версия — как у delete_expense)."""
+    return repo.update_expense_comment(expense_id, new_comment, version=version)
+
+
+def get_data_version() -> int:
+    """Возвращает версию данных (меняется после каждого изменения)."""
+    return repo.get_data_version()
+
+
+def build_export_file(period: Period | None = None) -> Path:
+    """
+    Собирает файл с расходами для экспорта и возвращает путь к нему.
+    Без периода выгружаются все месяцы, с периодом — только его записи.
+    """
+    data_dir = tenants.get_tenant_dir(tenants.get_tenant())
+    if period is None:
+        return repo.build_export_file(data_dir / "export.xlsx")
+    return repo.build_export_file(data_dir / f"export_{get_period_key(period)}.xlsx", *period)
+
+
+def get_current_month() -> str:
+    """Возвращает ключ текущего месяца, например '2026_02'."""
+    return base.get_current_month()
 
 
-def update_comment(expense_id: int, new_comment: str) -> bool:
-    """Обновляет комментарий записи. Возвращает True если обновление успешно."""
-    return excel_repo.update_expense_comment(expense_id, new_comment)
+def get_previous_month(month: str) -> str:
+    """Возвращает ключ месяца, предшествующего указанному."""
+    return base.get_previous_month(month)
 
 
-def get_month_label() -> str:
-    """Возвращает метку текущего месяца для отображения в боте."""
-    return excel_repo.get_current_month_label()
\ No newline at end of file
+def get_month_label(month: str | None = None) -> str:
+    """Возвращает метку месяца (по умолчанию текущего) для отображения в боте."""
+    return base.get_month_label(month or base.get_current_month())
\ No newline at end of file
@@ -0,0 +1,247 @@
+"""
+Разбор банковских выписок (CSV и XLSX) для /import.
+
+Файл читается потоково, по строке: CSV — csv.reader поверх открытого файла,
+XLSX — openpyxl в read-only режиме, поэтому память не зависит от размера
+выписки. Колонки даты, суммы, категории и комментария находятся по заголовку.
+Каждой строке сопоставляется хэш её содержимого: по нему хранилище пропускает
+строки, загруженные раньше, и повторная загрузка пересекающейся выписки
+ничего не дублирует.
+"""
+import csv
+import hashlib
+import re
+import zipfile
+from datetime import date, datetime
+from pathlib import Path
+from typing import Iterator
+from xml.etree.ElementTree import ParseError
+
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+
+from config import IMPORT_DEFAULT_CATEGORY
+from repository.base import parse_date
+from services import expense_service
+
+# Форматы файлов, которые понимает /import
+SUPPORTED_EXTENSIONS: tuple[str, ...] = (".csv", ".xlsx")
+
+# Названия колонок в выписках разных банков: сравниваются без регистра по вхождению,
+# более точные варианты идут первыми ("дата операции" раньше "дата платежа")
+COLUMN_NAMES: dict[str, tuple[str, ...]] = {
+    "date": ("дата операции", "дата", "date"),
+    "amount": ("сумма операции", "сумма", "amount"),
+    "category": ("категория", "category"),
+    "comment": ("описание", "комментарий", "назначение", "description", "comment", "details"),
+}
+
+# В скольких первых строках искать заголовок (над ним бывают реквизиты счёта)
+HEADER_SEARCH_ROWS = 30
+
+# Сколько байт начала CSV смотреть, чтобы определить кодировку и разделитель
+CSV_SAMPLE_SIZE = 64 * 1024
+
+# Ошибки разбора повреждённого или не того файла: не zip под видом .xlsx, книга без листов
+# (KeyError из openpyxl), битый XML, некорректный CSV
+_FILE_ERRORS = (zipfile.BadZipFile, InvalidFileException, KeyError, ParseError, csv.Error)
+
+# Строка выписки, готовая к импорту: (хэш, дата, категория, сумма, комментарий)
+ImportItem = tuple[str, date, str, float, str | None]
+
+
+def iter_statement(path: Path) -> Iterator[tuple[int, ImportItem | None, str | None]]:
+    """
+    Построчно разбирает выписку. Для каждой строки после заголовка отдаёт
+    (номер строки, запись или None, ошибка или None); пустые строки и поступления
+    отдаются с обоими None. Выбрасывает ValueError, если формат не поддерживается,
+    файл повреждён (в том числе посреди чтения) или в нём нет колонок даты и суммы.
+
+    Суммы со знаком: если в выписке есть отрицательные суммы, расходы —
+    это они (списания), а положительные (поступления) пропускаются;
+    если отрицательных нет, расходами считаются все суммы.
+    """
+    columns, header_number = _find_columns(path)
+    signed = _has_negative_amounts(path, columns, header_number)
+
+    # Одинаковые строки в одной выписке (два одинаковых платежа за день) — разные записи:
+    # к хэшу добавляется номер повтора, поэтому повторная загрузка даёт те же хэши
+    occurrences: dict[bytes, int] = {}
+
+    for number, row in enumerate(_iter_rows(path), start=1):
+        if number <= header_number or not any(_cell_text(value) for value in row):
+            continue
+
+        raw_date = _get(row, columns["date"])
+        raw_amount = _get(row, columns["amount"])
+        raw_category = _cell_text(_get(row, columns.get("category")))
+        raw_comment = _cell_text(_get(row, columns.get("comment")))
+
+        expense_date = _parse_date(raw_date)
+        if expense_date is None:
+            yield number, None, f"некорректная дата «{_cell_text(raw_date)}»"
+            continue
+        amount = _parse_amount(raw_amount)
+        if amount is None:
+            yield number, None, f"некорректная сумма «{_cell_text(raw_amount)}»"
+            continue
+        if amount == 0 or (signed and amount > 0):
+            yield number, None, None
+            continue
+
+        content = "\x1f".join([expense_date.isoformat(), f"{amount:.2f}", raw_category, raw_comment])
+        key = hashlib.blake2b(content.encode("utf-8"), digest_size=16).digest()
+        occurrence = occurrences[key] = occurrences.get(key, 0) + 1
+        row_hash = hashlib.blake2b(key + occurrence.to_bytes(4, "big"), digest_size=16).hexdigest()
+
+        # Категорию банка, которой нет в списке, сохраняем в комментарии
+        category = expense_service.match_category(raw_category) if raw_category else None
+        comment_parts = [raw_category] if raw_category and category is None else []
+        if raw_comment:
+            comment_parts.append(raw_comment)
+
+        yield number, (
+            row_hash,
+            expense_date,
+            category or IMPORT_DEFAULT_CATEGORY,
+            abs(amount),
+            " / ".join(comment_parts) or None,
+        ), None
+
+
+def _find_columns(path: Path) -> tuple[dict[str, int], int]:
+    """Ищет строку заголовка. Возвращает (поле → номер колонки, номер строки заголовка)."""
+    rows = _iter_rows(path)
+    try:
+        for number, row in enumerate(rows, start=1):
+            if number > HEADER_SEARCH_ROWS:
+                break
+            headers = [_cell_text(value).lower() for value in row]
+            columns: dict[str, int] = {}
+            for field, names in COLUMN_NAMES.items():
+                for name in names:
+                    column = next(
+                        (i for i, header in enumerate(headers) if name in header and i not in columns.values()),
+                        None,
+                    )
+                    if column is not None:
+                        columns[field] = column
+                        break
+            if "date" in columns and "amount" in columns:
+                return columns, number
+    finally:
+        rows.close()
+    raise ValueError("не найдены колонки даты и суммы")
+
+
+def _has_negative_amounts(path: Path, columns: dict[str, int], header_number: int) -> bool:
+    """Есть ли в выписке отрицательные суммы (просмотр останавливается на первой)."""
+    rows = _iter_rows(path)
+    try:
+        for number, row in enumerate(rows, start=1):
+            if number > header_number:
+                amount = _parse_amount(_get(row, columns["amount"]))
+                if amount is not None and amount < 0:
+                    return True
+    finally:
+        rows.close()
+    return False
+
+
+def _iter_rows(path: Path) -> Iterator[list]:
+    """
+    Потоково отдаёт строки файла списками значений ячеек.
+    Ошибки разбора файла приводятся к ValueError — вызывающему достаточно ловить его.
+    """
+    suffix = path.suffix.lower()
+    try:
+        if suffix == ".csv":
+            yield from _iter_csv_rows(path)
+        elif suffix == ".xlsx":
+            yield from _iter_xlsx_rows(path)
+        else:
+            raise ValueError(f"поддерживаются файлы {', '.join(SUPPORTED_EXTENSIONS)}")
+    except _FILE_ERRORS as e:
+        raise ValueError(f"файл повреждён или не является {suffix.lstrip('.').upper()}") from e
+
+
+def _iter_csv_rows(path: Path) -> Iterator[list]:
+    """Строки CSV. Кодировка (UTF-8 или Windows-1251) и разделитель определяются по началу файла."""
+    with open(path, "rb") as f:
+        sample = f.read(CSV_SAMPLE_SIZE)
+    try:
+        sample.decode("utf-8")
+        encoding = "utf-8-sig"
+    except UnicodeDecodeError as e:
+        # Обрезанный на границе выборки многобайтовый символ — не повод считать файл не UTF-8
+        encoding = "utf-8-sig" if e.start >= len(sample) - 3 else "cp1251"
+
+    text_sample = sample.decode(encoding, errors="ignore")
+    try:
+        dialect = csv.Sniffer().sniff(text_sample, delimiters=";,\t")
+        delimiter = dialect.delimiter
+    except csv.Error:
+        delimiter = ";"
+
+    with open(path, encoding=encoding, newline="") as f:
+        yield from csv.reader(f, delimiter=delimiter)
+
+
+def _iter_xlsx_rows(path: Path) -> Iterator[list]:
+    """Строки первого листа XLSX (read-only: книга не загружается целиком)."""
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for row in wb.worksheets[0].iter_rows(values_only=True):
+            yield list(row)
+    finally:
+        wb.close()
+
+
+def _get(row: list, column: int | None):
+    """Значение колонки строки; None, если колонки нет или строка короче."""
+    if column is None or column >= len(row):
+        return None
+    return row[column]
+
+
+def _cell_text(value) -> str:
+    """Значение ячейки как обрезанная строка."""
+    return str(value).strip() if value is not None else ""
+
+
+def _parse_date(value) -> date | None:
+    """Дата операции: ячейка даты, 'ДД.ММ.ГГГГ', 'ДД.ММ.ГГ' или ISO, время отбрасывается."""
+    if isinstance(value, (date, datetime)):
+        return parse_date(value)
+    text = _cell_text(value)
+    if not text:
+        return None
+    day = re.split(r"[ T]", text, maxsplit=1)[0]
+    for fmt in ("%d.%m.%Y", "%Y-%m-%d", "%d.%m.%y", "%d/%m/%Y"):
+        try:
+            return datetime.strptime(day, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _parse_amount(value) -> float | None:
+    """
+    Сумма со знаком: число или строка вида '-1 234,56 ₽', '-1,234.50', '1.234,50'.
+    Если в строке есть и запятая, и точка, десятичный разделитель — последний из них,
+    а другой разделяет разряды; один и тот же разделитель несколько раз — тоже разряды.
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = re.sub(r"[^\d,.\-+−]", "", _cell_text(value)).replace("−", "-")
+    if "," in text and "." in text:
+        decimal, group = (",", ".") if text.rfind(",") > text.rfind(".") else (".", ",")
+        text = text.replace(group, "").replace(decimal, ".")
+    elif text.count(",") > 1 or text.count(".") > 1:
+        text = text.replace(",", "").replace(".", "")
+    else:
+        text = text.replace(",", ".")
+    try:
+        return float(text)
+    except ValueError:
+        return None
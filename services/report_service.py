@@ -0,0 +1,136 @@
+"""
+Плановые отчёты: сводка расходов за вчера или за прошлую неделю
+и итоги закрытого месяца.
+
+Отчёт считается по агрегатам хранилища (get_period_summary) один раз
+на учёт (арендатора) и рассылается всем его получателям через очередь
+исходящих сообщений. Какие отчёты уже разосланы, хранится в REPORTS_FILE,
+поэтому перезапуск бота не дублирует и не теряет рассылку: после простоя
+уходит последний наступивший отчёт каждого вида.
+"""
+import json
+import os
+from datetime import datetime, time, timedelta
+
+from config import REPORT_DIGEST, REPORT_MONTH_CLOSE, REPORT_TIME, REPORTS_FILE, TENANT_MODE
+from repository import base, tenants
+from services import expense_service, async_expense_service
+from services.expense_service import Period
+from services.send_queue import SendQueue
+
+# Заголовки отчётов по видам
+_TITLES: dict[str, str] = {
+    "daily": "🗓 Сводка за",
+    "weekly": "🗓 Сводка за неделю",
+    "month": "📅 Итоги месяца:",
+}
+
+
+def get_due_reports(
+    now: datetime,
+    digest: str = REPORT_DIGEST,
+    month_close: bool = REPORT_MONTH_CLOSE,
+    report_time: time = REPORT_TIME,
+) -> list[tuple[str, Period]]:
+    """
+    Последние наступившие отчёты каждого включённого вида: [(вид, период)].
+    Отчёт дня наступает в report_time: до этого времени последним остаётся вчерашний.
+    """
+    today = now.date()
+    if now.time() < report_time:
+        today -= timedelta(days=1)
+
+    due = []
+    if digest == "daily":
+        day = today - timedelta(days=1)
+        due.append(("daily", (day, day)))
+    elif digest == "weekly":
+        monday = today - timedelta(days=today.weekday())
+        due.append(("weekly", (monday - timedelta(days=7), monday - timedelta(days=1))))
+    if month_close:
+        month = base.get_month_key(today.replace(day=1) - timedelta(days=1))
+        due.append(("month", base.get_month_bounds(month)))
+    return due
+
+
+def get_recipients(allowed_user_ids: frozenset[int], mode: str = TENANT_MODE) -> list[tuple[int, str]]:
+    """
+    Получатели отчётов: [(chat_id, арендатор)].
+    В режиме "chat" отчёт получает каждый чат со своим учётом (личный — если его
+    владелец всё ещё в списке доступа), иначе — все допущенные пользователи по общему учёту.
+    """
+    if mode != "chat":
+        return [(user_id, tenants.DEFAULT_TENANT) for user_id in sorted(allowed_user_ids)]
+
+    recipients = []
+    for tenant in tenants.list_tenants():
+        if not tenant.lstrip("-").isdigit():
+            continue
+        chat_id = int(tenant)
+        if chat_id < 0 or chat_id in allowed_user_ids:
+            recipients.append((chat_id, tenant))
+    return recipients
+
+
+async def build_report(kind: str, period: Period) -> str | None:
+    """Текст отчёта по текущему учёту или None, если за период записей нет."""
+    summary = await async_expense_service.get_period_summary(period)
+    if not summary:
+        return None
+    previous_period = expense_service.get_previous_period(period)
+    previous_summary = await async_expense_service.get_period_summary(previous_period)
+
+    total = sum(amount for amount, _ in summary.values())
+    count = sum(cnt for _, cnt in summary.values())
+    previous_total = sum(amount for amount, _ in previous_summary.values())
+
+    lines = [f"{_TITLES[kind]} <b>{expense_service.get_period_label(period)}</b>\n"]
+    for category, (amount, cnt) in sorted(summary.items(), key=lambda item: item[1][0], reverse=True):
+        lines.append(f"  {category}: {amount:.2f} руб. ({cnt} шт.)")
+    lines.append(f"\n💰 <b>Итого: {total:.2f} руб.</b> ({count} записей)")
+    if previous_summary:
+        previous_label = expense_service.get_period_label(previous_period)
+        lines.append(f"📈 К {previous_label}: {expense_service.format_change(total, previous_total)}")
+    return "\n".join(lines)
+
+
+async def send_due_reports(queue: SendQueue, recipients: list[tuple[int, str]], now: datetime | None = None) -> int:
+    """
+    Ставит в очередь отправки наступившие и ещё не разосланные отчёты.
+    Возвращает число поставленных сообщений.
+    """
+    state = _load_state()
+    queued = 0
+    for kind, period in get_due_reports(now or datetime.now()):
+        period_key = expense_service.get_period_key(period)
+        if state.get(kind) == period_key:
+            continue
+
+        # Отчёт считается один раз на учёт, сколько бы у него ни было получателей
+        texts: dict[str, str | None] = {}
+        for chat_id, tenant in recipients:
+            if tenant not in texts:
+                with tenants.use_tenant(tenant):
+                    texts[tenant] = await build_report(kind, period)
+            if texts[tenant] is not None:
+                queue.put(chat_id, texts[tenant], parse_mode="HTML")
+                queued += 1
+
+        state[kind] = period_key
+        _save_state(state)
+    return queued
+
+
+def _load_state() -> dict[str, str]:
+    """Последние разосланные периоды по видам отчётов."""
+    try:
+        return json.loads(REPORTS_FILE.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _save_state(state: dict[str, str]) -> None:
+    """Атомарно записывает состояние рассылки."""
+    tmp_path = REPORTS_FILE.with_name(REPORTS_FILE.name + ".tmp")
+    tmp_path.write_text(json.dumps(state, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp_path, REPORTS_FILE)
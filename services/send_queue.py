@@ -0,0 +1,151 @@
+import asyncio
+import heapq
+import time
+from collections import deque
+from typing import Any
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramAPIError, TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter,
+)
+
+import metrics
+
+
+class SendQueue:
+    """
+    Очередь исходящих сообщений, которые бот шлёт сам (плановые отчёты),
+    а не в ответ на команду.
+    Сообщения уходят по одному с учётом лимитов Telegram: не больше rate
+    в секунду всего и не чаще раза в chat_interval секунд в один личный чат
+    (group_interval — в группу). Чаты обслуживаются по очереди готовности,
+    поэтому длинная очередь одного чата не задерживает остальные.
+    rate берётся ниже общего лимита бота: ответы хендлеров идут мимо очереди,
+    и рассылка не должна выбирать их запас.
+    На TelegramRetryAfter вся очередь выдерживает указанную паузу, после неё
+    сообщение отправляется повторно. Сетевые ошибки повторяются с нарастающей паузой
+    до max_attempts раз, сообщения в заблокировавший бота или несуществующий
+    чат отбрасываются сразу.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        chat_interval: float,
+        group_interval: float,
+        max_attempts: int = 3,
+    ) -> None:
+        self._interval = 1 / rate
+        self._chat_interval = chat_interval
+        self._group_interval = group_interval
+        self._max_attempts = max_attempts
+        # Неотправленные сообщения по чатам: (текст, параметры send_message, число попыток)
+        self._chats: dict[int, deque[tuple[str, dict[str, Any], int]]] = {}
+        # Чаты с сообщениями по времени, когда в них можно писать: (время, номер постановки, chat_id)
+        self._ready: list[tuple[float, int, int]] = []
+        self._seq = 0
+        # Когда в чат можно писать снова (после последней отправки)
+        self._chat_next: dict[int, float] = {}
+        # Когда можно отправлять следующее сообщение вообще (общий лимит и паузы retry_after)
+        self._next_send = 0.0
+        self._size = 0
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._task: asyncio.Task | None = None
+
+    def start(self, bot: Bot) -> None:
+        """Запускает отправку сообщений через bot фоновой задачей."""
+        self._task = asyncio.get_running_loop().create_task(self._run(bot))
+
+    async def close(self, timeout: float) -> None:
+        """Ждёт отправки оставшихся сообщений не дольше timeout секунд и останавливает очередь."""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            print(f"⚠️ Не отправлено сообщений из очереди: {self._size}")
+        self._task.cancel()
+        self._task = None
+
+    def put(self, chat_id: int, text: str, **kwargs: Any) -> None:
+        """Ставит сообщение в очередь (параметры kwargs передаются в send_message)."""
+        queue = self._chats.get(chat_id)
+        if queue is None:
+            queue = self._chats[chat_id] = deque()
+            self._schedule(chat_id, self._chat_next.get(chat_id, 0.0))
+        queue.append((text, kwargs, 0))
+        self._size += 1
+        self._idle.clear()
+        self._wakeup.set()
+        metrics.set_value("bot_send_queue_size", self._size)
+
+    def _schedule(self, chat_id: int, ready_at: float) -> None:
+        """Ставит чат в очередь готовности."""
+        self._seq += 1
+        heapq.heappush(self._ready, (ready_at, self._seq, chat_id))
+
+    async def _run(self, bot: Bot) -> None:
+        while True:
+            if not self._ready:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            ready_at, _, chat_id = self._ready[0]
+            delay = max(ready_at, self._next_send) - time.monotonic()
+            if delay > 0:
+                # Новое сообщение в свободный чат может оказаться готово раньше — ждём и его
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._ready)
+            await self._send_next(bot, chat_id)
+
+    async def _send_next(self, bot: Bot, chat_id: int) -> None:
+        """Отправляет первое сообщение чата и ставит чат обратно в очередь, если в нём ещё есть сообщения."""
+        queue = self._chats[chat_id]
+        text, kwargs, attempts = queue[0]
+        try:
+            await bot.send_message(chat_id, text, **kwargs)
+        except TelegramRetryAfter as e:
+            # Превышен лимит: паузу выдерживают все чаты, а не только этот
+            metrics.inc("bot_send_messages_total", result="retry_after")
+            self._next_send = time.monotonic() + e.retry_after
+            # Свой интервал чат уже выждал — дальше он ждёт только общую паузу
+            self._schedule(chat_id, 0.0)
+            return
+        except (TelegramForbiddenError, TelegramBadRequest) as e:
+            # Бот заблокирован, чат удалён, текст не принят — повтор не поможет
+            metrics.inc("bot_send_messages_total", result="dropped")
+            print(f"⚠️ Сообщение в чат {chat_id} не доставлено: {e}")
+        except (TelegramAPIError, OSError) as e:
+            attempts += 1
+            if attempts < self._max_attempts:
+                metrics.inc("bot_send_messages_total", result="retry")
+                queue[0] = (text, kwargs, attempts)
+                self._schedule(chat_id, time.monotonic() + self._chat_interval * 2 ** attempts)
+                return
+            metrics.inc("bot_send_messages_total", result="failed")
+            print(f"⚠️ Сообщение в чат {chat_id} не отправлено после {attempts} попыток: {e}")
+        else:
+            metrics.inc("bot_send_messages_total", result="sent")
+
+        now = time.monotonic()
+        self._next_send = max(self._next_send, now + self._interval)
+        chat_next = self._chat_next[chat_id] = now + (self._group_interval if chat_id < 0 else self._chat_interval)
+
+        queue.popleft()
+        self._size -= 1
+        metrics.set_value("bot_send_queue_size", self._size)
+        if queue:
+            self._schedule(chat_id, chat_next)
+        else:
+            del self._chats[chat_id]
+            if not self._chats:
+                self._idle.set()
@@ -0,0 +1,95 @@
+import asyncio
+from concurrent.futures import Executor
+from functools import partial
+from typing import Any, Callable
+
+from repository.tenants import get_tenant
+from services import expense_service
+
+
+class WriteCoordinator:
+    """
+    Групповая фиксация изменений.
+    Пока пачка фиксируется в потоке-писателе, новые изменения от других
+    пользователей копятся и уходят следующей пачкой — одним вызовом
+    expense_service.run_batch с одной фиксацией в хранилище на всю пачку.
+    Если писатель свободен, изменение уходит сразу (после window секунд
+    ожидания попутчиков, если окно задано), поэтому одиночная запись не ждёт.
+    Каждый вызывающий получает свой результат (ID, флаг успеха) или своё исключение.
+    Изменения разных арендаторов фиксируются отдельными пачками — каждая в своём хранилище.
+    """
+
+    def __init__(self, executor: Executor, window: float, max_batch: int) -> None:
+        self._executor = executor
+        self._window = window
+        self._max_batch = max_batch
+        # (арендатор, изменение, future вызывающего)
+        self._pending: list[tuple[str, Callable[[], Any], asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._in_flight: set[asyncio.Task] = set()
+
+    async def submit(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Ставит изменение в текущую пачку и ждёт его результата после фиксации пачки."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((get_tenant(), partial(func, *args, **kwargs), future))
+
+        if len(self._pending) >= self._max_batch:
+            self._commit_pending()
+        elif not self._in_flight and self._timer is None:
+            # Писатель свободен: даём собраться изменениям из того же тика (и окна, если оно задано)
+            self._timer = loop.call_later(self._window, self._commit_pending)
+
+        return await future
+
+    async def drain(self) -> None:
+        """Фиксирует накопленную пачку сразу и дожидается всех незавершённых пачек."""
+        self._commit_pending()
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+    def _commit_pending(self) -> None:
+        """Забирает накопленные изменения и запускает их фиксацию."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def _run(self, batch: list[tuple[str, Callable[[], Any], asyncio.Future]]) -> None:
+        """Выполняет пачку в потоке-писателе (по пачке на арендатора) и раздаёт результаты вызывающим."""
+        loop = asyncio.get_running_loop()
+        by_tenant: dict[str, list[tuple[Callable[[], Any], asyncio.Future]]] = {}
+        for tenant, call, future in batch:
+            by_tenant.setdefault(tenant, []).append((call, future))
+
+        for tenant, items in by_tenant.items():
+            calls = [call for call, _ in items]
+            try:
+                results = await loop.run_in_executor(self._executor, expense_service.run_batch, calls, tenant)
+            except Exception as e:
+                # Пачка не зафиксирована целиком (например, ошибка записи на диск)
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), (ok, value) in zip(items, results):
+                if future.done():
+                    continue
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+
+        # Изменения, накопившиеся пока шла эта пачка, уходят следующей.
+        # Задачу убираем из in-flight здесь, а не в done-callback: иначе изменение,
+        # пришедшее между ними, не запустило бы фиксацию и повисло
+        self._in_flight.discard(asyncio.current_task())
+        if self._pending and self._timer is None and not self._in_flight:
+            self._commit_pending()
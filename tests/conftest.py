@@ -0,0 +1,20 @@
+import os
+import tempfile
+import uuid
+
+import pytest
+
+# config читает DATA_DIR при импорте — тесты не должны трогать настоящую папку data
+os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="expenses-test-")
+
+
+@pytest.fixture
+def tenant():
+    """Свой арендатор (своя папка данных) на тест; открытые хранилища закрываются после теста."""
+    from repository import excel_repo, sqlite_repo, tenants
+
+    name = f"test_{uuid.uuid4().hex}"
+    with tenants.use_tenant(name):
+        yield name
+    excel_repo.close()
+    sqlite_repo.close()
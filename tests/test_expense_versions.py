@@ -0,0 +1,86 @@
+"""
+Оптимистичная блокировка записей: изменение или удаление с устаревшей версией
+отклоняется, с текущей — выполняется, удалённая запись сообщается как отсутствующая.
+"""
+from datetime import date, timedelta
+
+import pytest
+
+from repository import excel_repo, sqlite_repo
+from repository.base import get_month_key
+
+
+@pytest.fixture(params=[excel_repo, sqlite_repo], ids=["excel", "sqlite"])
+def repo(request, tenant):
+    return request.param
+
+
+def _fields(expense: dict) -> tuple:
+    return expense["date"], expense["category"], expense["amount"], expense["comment"]
+
+
+def test_get_expense_returns_version(repo):
+    expense_id = repo.add_expense("ЗП", 350, "обед")
+    expense = repo.get_expense(expense_id)
+    assert expense["version"]
+    # Версия не зависит от способа хранения суммы и переживает перезапуск
+    repo.close()
+    assert repo.get_expense(expense_id)["version"] == expense["version"]
+
+
+@pytest.mark.parametrize("update, value", [
+    ("update_expense_category", "Доп расход"),
+    ("update_expense_amount", 99.9),
+    ("update_expense_comment", "ужин"),
+])
+def test_stale_version_is_rejected(repo, update, value):
+    expense_id = repo.add_expense("ЗП", 100.0, "обед")
+    stale = repo.get_expense(expense_id)
+    # Кто-то другой успел изменить запись
+    assert repo.update_expense_amount(expense_id, 150.0, version=stale["version"])
+    current = repo.get_expense(expense_id)
+
+    assert not getattr(repo, update)(expense_id, value, version=stale["version"])
+    assert not repo.delete_expense(expense_id, version=stale["version"])
+    assert repo.get_expense(expense_id) == current
+    assert repo.get_month_total() == 150.0
+
+
+def test_matching_version_applies(repo):
+    expense_id = repo.add_expense("ЗП", 100.0, "обед")
+    version = repo.get_expense(expense_id)["version"]
+    assert repo.update_expense_comment(expense_id, "ужин", version=version)
+
+    expense = repo.get_expense(expense_id)
+    assert expense["comment"] == "ужин"
+    assert expense["version"] != version
+    assert repo.update_expense_category(expense_id, "Доп расход", version=expense["version"])
+
+    version = repo.get_expense(expense_id)["version"]
+    assert repo.delete_expense(expense_id, version=version)
+    assert repo.count_expenses() == 0
+
+
+def test_version_check_in_past_month(repo):
+    past_day = date.today().replace(day=1) - timedelta(days=5)
+    month = get_month_key(past_day)
+    repo.import_expenses([("h1", past_day, "ЗП", 10.0, "старая")])
+    (expense_id,) = [expense["id"] for expense in repo.get_all_expenses(month)]
+    expense = repo.get_expense(expense_id, month)
+    assert _fields(expense) == (past_day, "ЗП", 10.0, "старая")
+
+    assert not repo.update_expense_amount(expense_id, 20.0, month, version="0" * 16)
+    assert repo.update_expense_amount(expense_id, 20.0, month, version=expense["version"])
+    assert repo.get_month_total(month) == 20.0
+
+
+def test_deleted_record_is_reported_missing(repo):
+    expense_id = repo.add_expense("ЗП", 100.0, "обед")
+    version = repo.get_expense(expense_id)["version"]
+    assert repo.delete_expense(expense_id)
+
+    assert repo.get_expense(expense_id) is None
+    assert not repo.delete_expense(expense_id, version=version)
+    assert not repo.update_expense_amount(expense_id, 1.0, version=version)
+    assert not repo.update_expense_comment(expense_id, "x")
+    assert repo.count_expenses() == 0
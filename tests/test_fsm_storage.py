@@ -0,0 +1,111 @@
+"""FSM-хранилище в SQLite: состояние переживает перезапуск и забывается по TTL."""
+import asyncio
+
+import pytest
+from aiogram.fsm.storage.base import StorageKey
+
+from repository import fsm_storage
+from repository.fsm_storage import SQLiteStorage
+from states import AddExpense
+
+KEY = StorageKey(bot_id=1, chat_id=10, user_id=10)
+OTHER = StorageKey(bot_id=1, chat_id=20, user_id=20)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Управляемое время сессий (time.time в fsm_storage)."""
+    now = [1_000_000.0]
+    monkeypatch.setattr(fsm_storage.time, "time", lambda: now[0])
+    return now
+
+
+def test_state_survives_restart(tmp_path):
+    path = tmp_path / "fsm.db"
+
+    async def main():
+        storage = SQLiteStorage(path, ttl=3600, cache_size=1, flush_interval=60)
+        await storage.set_state(KEY, AddExpense.wait_amount)
+        await storage.update_data(KEY, {"category": "ЗП"})
+        # Вторая сессия вытесняет первую из LRU до сброса на диск — она не должна потеряться
+        await storage.set_state(OTHER, AddExpense.wait_comment)
+        assert await storage.get_data(KEY) == {"category": "ЗП"}
+        await storage.close()
+
+        restarted = SQLiteStorage(path, ttl=3600, cache_size=1, flush_interval=60)
+        try:
+            return (
+                await restarted.get_state(KEY),
+                await restarted.get_data(KEY),
+                await restarted.get_state(OTHER),
+            )
+        finally:
+            await restarted.close()
+
+    assert asyncio.run(main()) == (AddExpense.wait_amount.state, {"category": "ЗП"}, AddExpense.wait_comment.state)
+
+
+def test_finished_scenario_is_removed_from_disk(tmp_path):
+    path = tmp_path / "fsm.db"
+
+    async def main():
+        storage = SQLiteStorage(path, ttl=3600, cache_size=10, flush_interval=60)
+        await storage.set_state(KEY, AddExpense.wait_amount)
+        await storage.flush()
+        await storage.set_state(KEY, None)
+        await storage.set_data(KEY, {})
+        await storage.close()
+        return storage._read(storage._key_builder.build(KEY))
+
+    assert asyncio.run(main()) is None
+
+
+def test_state_expires_after_ttl(tmp_path, clock):
+    path = tmp_path / "fsm.db"
+
+    async def main():
+        storage = SQLiteStorage(path, ttl=100, cache_size=10, flush_interval=60)
+        await storage.set_state(KEY, AddExpense.wait_amount)
+        await storage.flush()
+
+        clock[0] += 99
+        alive = await storage.get_state(KEY)
+        clock[0] += 2
+        expired = await storage.get_state(KEY), await storage.get_data(KEY)
+
+        # Сброс удаляет просроченную сессию и с диска
+        await storage.flush()
+        on_disk = storage._read(storage._key_builder.build(KEY))
+        await storage.close()
+        return alive, expired, on_disk
+
+    alive, expired, on_disk = asyncio.run(main())
+    assert alive == AddExpense.wait_amount.state
+    assert expired == (None, {})
+    assert on_disk is None
+
+
+def test_failed_flush_keeps_updates_for_the_next_one(tmp_path):
+    path = tmp_path / "fsm.db"
+
+    async def main():
+        storage = SQLiteStorage(path, ttl=3600, cache_size=10, flush_interval=60)
+        write = storage._write
+
+        def failing_write(pending, expired_before):
+            raise OSError("диск заполнен")
+
+        storage._write = failing_write
+        await storage.update_data(KEY, {"step": 1})
+        with pytest.raises(OSError):
+            await storage.flush()
+        storage._write = write
+        await storage.close()
+
+        restarted = SQLiteStorage(path, ttl=3600, cache_size=10, flush_interval=60)
+        try:
+            return await restarted.get_data(KEY)
+        finally:
+            await restarted.close()
+
+    assert asyncio.run(main()) == {"step": 1}
@@ -0,0 +1,150 @@
+"""
+Разбор банковских выписок для /import: поиск заголовка, знак сумм,
+форматы сумм, повреждённые файлы и пропуск уже загруженных строк по хэшу.
+"""
+from datetime import date
+from pathlib import Path
+
+import pytest
+from openpyxl import Workbook
+
+from config import IMPORT_DEFAULT_CATEGORY
+from repository import excel_repo, sqlite_repo
+from services import import_service
+
+
+def _csv(tmp_path: Path, lines: list[str], encoding: str = "utf-8", name: str = "statement.csv") -> Path:
+    path = tmp_path / name
+    path.write_bytes("\n".join(lines).encode(encoding))
+    return path
+
+
+def _parsed(path: Path) -> list[tuple]:
+    return list(import_service.iter_statement(path))
+
+
+def _items(path: Path) -> list[tuple]:
+    return [item for _, item, _ in _parsed(path) if item is not None]
+
+
+STATEMENT = [
+    "Выписка по счёту 40817810000000000000",
+    "Период;01.02.2026 — 28.02.2026",
+    "",
+    "Дата платежа;Описание;Сумма операции;Категория;Дата операции",
+    "02.02.2026;Пятёрочка;-1 234,56;Супермаркеты;01.02.2026 12:30:00",
+    "03.02.2026;Зарплата;50 000,00;Пополнения;02.02.2026",
+    "04.02.2026;Кофейня;−350,00;;03.02.2026",
+]
+
+
+def test_header_is_found_below_the_preamble(tmp_path):
+    parsed = _parsed(_csv(tmp_path, STATEMENT))
+    # Номера строк — как в файле; заголовок на 4-й
+    assert [number for number, _, _ in parsed] == [5, 6, 7]
+    (_, first, _), (_, income, _), (_, third, _) = parsed
+    # «Дата операции» точнее «Дата платежа», хотя стоит правее
+    assert first[1:] == (date(2026, 2, 1), IMPORT_DEFAULT_CATEGORY, 1234.56, "Супермаркеты / Пятёрочка")
+    assert income is None
+    assert third[1:] == (date(2026, 2, 3), IMPORT_DEFAULT_CATEGORY, 350.0, "Кофейня")
+
+
+def test_only_debits_are_imported_when_amounts_are_signed(tmp_path):
+    parsed = _parsed(_csv(tmp_path, STATEMENT))
+    # Поступление пропускается без ошибки
+    assert parsed[1] == (6, None, None)
+
+
+def test_all_amounts_are_expenses_without_negative_ones(tmp_path):
+    path = _csv(tmp_path, ["Дата;Сумма;Описание", "01.02.2026;100;а", "02.02.2026;0;ноль", "03.02.2026;250,50;б"])
+    assert [item[3] for item in _items(path)] == [100.0, 250.5]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("350", 350.0),
+    ("120.50", 120.5),
+    ("120,50", 120.5),
+    ("-1 234,56 ₽", -1234.56),
+    ("−99,90", -99.9),
+    ("-1,234.50", -1234.5),
+    ("1.234,50", 1234.5),
+    ("1,234,567", 1234567.0),
+    ("1.234.567", 1234567.0),
+    ("+15", 15.0),
+    (12.5, 12.5),
+    ("сумма", None),
+    ("", None),
+])
+def test_amount_formats(text, expected):
+    assert import_service._parse_amount(text) == expected
+
+
+def test_invalid_rows_are_reported_with_their_numbers(tmp_path):
+    path = _csv(tmp_path, ["Дата;Сумма", "вчера;-10", "01.02.2026;много", "01.02.2026;-5"])
+    parsed = _parsed(path)
+    assert [(number, error is not None) for number, _, error in parsed] == [(2, True), (3, True), (4, False)]
+    assert "вчера" in parsed[0][2]
+
+
+def test_cp1251_comma_separated_csv(tmp_path):
+    path = _csv(tmp_path, ["Дата,Сумма,Комментарий", '01.02.2026,"-1 000,00",Аптека'], encoding="cp1251")
+    assert [item[3:] for item in _items(path)] == [(1000.0, "Аптека")]
+
+
+def test_xlsx_statement(tmp_path):
+    path = tmp_path / "statement.xlsx"
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["Date", "Amount", "Category", "Description"])
+    ws.append([date(2026, 2, 1), -42.5, "ЗП", "перевод"])
+    ws.append([date(2026, 2, 2), 1000, "", "salary"])
+    wb.save(path)
+    # Категория банка совпала с нашей — комментарий без неё
+    assert [item[1:] for item in _items(path)] == [(date(2026, 2, 1), "ЗП", 42.5, "перевод")]
+
+
+@pytest.mark.parametrize("name, content", [
+    ("statement.xlsx", b"not a zip archive"),
+    ("statement.csv", "Заголовок;без;нужных колонок\n1;2;3".encode()),
+    ("statement.txt", b"whatever"),
+])
+def test_unreadable_files_raise_value_error(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_bytes(content)
+    with pytest.raises(ValueError):
+        _parsed(path)
+
+
+def test_xlsx_without_workbook_raises_value_error(tmp_path):
+    import zipfile
+
+    path = tmp_path / "statement.xlsx"
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("readme.txt", "не книга")
+    with pytest.raises(ValueError):
+        _parsed(path)
+
+
+def test_hashes_are_stable_and_distinguish_identical_rows(tmp_path):
+    path = _csv(tmp_path, ["Дата;Сумма;Описание", "01.02.2026;-100;кофе", "01.02.2026;-100;кофе", "02.02.2026;-5;чай"])
+    first = [item[0] for item in _items(path)]
+    assert len(set(first)) == 3
+    assert [item[0] for item in _items(path)] == first
+
+
+@pytest.mark.parametrize("repo", [excel_repo, sqlite_repo], ids=["excel", "sqlite"])
+def test_reimport_skips_rows_loaded_before(tmp_path, tenant, repo):
+    header = "Дата;Сумма;Описание"
+    february = [header, "01.02.2026;-100;кофе", "01.02.2026;-100;кофе", "10.02.2026;-5;чай"]
+    # Следующая выписка пересекается с предыдущей и добавляет одну новую строку
+    overlapping = february + ["15.02.2026;-7;булка"]
+
+    assert repo.import_expenses(_items(_csv(tmp_path, february, name="feb.csv"))) == 3
+    assert repo.import_expenses(_items(_csv(tmp_path, february, name="feb.csv"))) == 0
+    assert repo.import_expenses(_items(_csv(tmp_path, overlapping, name="overlap.csv"))) == 1
+    assert repo.count_expenses("2026_02") == 4
+    assert repo.get_month_total("2026_02") == 212.0
+
+    # Хэши сохраняются: после перезапуска повтор тоже ничего не добавляет
+    repo.close()
+    assert repo.import_expenses(_items(_csv(tmp_path, overlapping, name="overlap.csv"))) == 0
@@ -0,0 +1,142 @@
+"""
+Восстановление хранилища xlsx по журналу: проигрывание после падения,
+оборванная последняя строка, повторное применение уже перенесённых в xlsx
+операций и журнал, дописанный другим процессом.
+"""
+from pathlib import Path
+
+import pytest
+
+from repository.base import get_current_month
+from repository.excel_repo import _ExpenseStore, _row_to_expense
+
+MONTH = get_current_month()
+
+
+def _open(data_dir: Path) -> _ExpenseStore:
+    """Хранилище с файлами в data_dir — как у арендатора, но без общего кэша хранилищ."""
+    return _ExpenseStore(
+        data_dir / "expenses.xlsx",
+        data_dir / "expenses.journal",
+        data_dir / "expenses.lock",
+        data_dir / "archive",
+        data_dir / "expenses.index.json",
+        data_dir / "expenses.imports.json",
+    )
+
+
+def _add(store: _ExpenseStore, expense_id: int, amount: float, comment: str = "") -> None:
+    with store.writing():
+        store.commit({
+            "op": "add", "sheet": MONTH, "id": expense_id, "date": "2026-01-15",
+            "category": "ЗП", "amount": amount, "comment": comment,
+        })
+
+
+def _state(store: _ExpenseStore) -> tuple[list[dict], int, float]:
+    """
+    Записи месяца, число записей и сумма из агрегатов.
+    Записи сравниваются в виде для чтения: после xlsx дата и сумма приходят другими типами.
+    """
+    with store.reading():
+        ws = store.get_sheet(MONTH)
+        rows = [] if ws is None else ws.iter_rows(min_row=2, max_row=store.get_index(MONTH).last_row, values_only=True)
+        expenses = [expense for expense in map(_row_to_expense, rows) if expense is not None]
+        return expenses, store.rollups.month_count(MONTH), store.rollups.month_total(MONTH)
+
+
+@pytest.fixture
+def store(tmp_path: Path):
+    store = _open(tmp_path)
+    yield store
+    store.close()
+
+
+def test_replays_journal_after_crash(store, tmp_path):
+    _add(store, 1, 100.0, "кофе")
+    _add(store, 2, 50.5)
+    with store.writing():
+        store.commit({"op": "update", "sheet": MONTH, "id": 2, "field": "amount", "value": 60.25})
+    expected = _state(store)
+
+    # Падение: xlsx не записан, в журнале все три операции
+    restarted = _open(tmp_path)
+    try:
+        assert _state(restarted) == expected
+        assert restarted.search_index.search("кофе") == [(MONTH, 1)]
+    finally:
+        restarted.close()
+
+
+def test_truncated_last_line_is_cut_off(store, tmp_path):
+    _add(store, 1, 100.0)
+    _add(store, 2, 200.0)
+    journal = tmp_path / "expenses.journal"
+    valid_size = journal.stat().st_size
+    # Процесс упал посреди записи третьей операции
+    with open(journal, "ab") as f:
+        f.write(b'{"op": "add", "sheet": "' + MONTH.encode() + b'", "id": 3, "amo')
+
+    restarted = _open(tmp_path)
+    try:
+        rows, count, total = _state(restarted)
+        assert [expense["id"] for expense in rows] == [1, 2]
+        assert (count, total) == (2, 300.0)
+        assert journal.stat().st_size == valid_size
+
+        # Новая запись дописывается после отрезанного хвоста и читается при следующем запуске
+        _add(restarted, 3, 5.0)
+    finally:
+        restarted.close()
+
+    reopened = _open(tmp_path)
+    try:
+        assert _state(reopened)[1:] == (3, 305.0)
+    finally:
+        reopened.close()
+
+
+def test_reapplying_compacted_journal_is_idempotent(store, tmp_path):
+    _add(store, 1, 100.0, "кофе")
+    _add(store, 2, 200.0, "чай")
+    _add(store, 3, 300.0)
+    with store.writing():
+        store.commit({"op": "update", "sheet": MONTH, "id": 1, "field": "comment", "value": "сок"})
+        store.commit({"op": "delete", "sheet": MONTH, "id": 2})
+    expected = _state(store)
+
+    journal = tmp_path / "expenses.journal"
+    leftover = journal.read_bytes()
+    with store.writing():
+        assert store.flush()
+    # Падение между os.replace книги и очисткой журнала: операции уже в xlsx и ещё в журнале
+    journal.write_bytes(leftover)
+
+    restarted = _open(tmp_path)
+    try:
+        assert _state(restarted) == expected
+        assert restarted.search_index.search("сок") == [(MONTH, 1)]
+        assert restarted.search_index.search("кофе") == []
+        assert restarted.search_index.search("чай") == []
+    finally:
+        restarted.close()
+
+
+def test_catches_up_with_journal_of_another_process(store, tmp_path):
+    other = _open(tmp_path)
+    try:
+        _add(store, 1, 100.0)
+        assert _state(other)[1] == 1
+
+        # Другой процесс дописал журнал — проигрывается только хвост
+        _add(other, 2, 200.0)
+        assert _state(store)[1:] == (2, 300.0)
+
+        # Другой процесс перенёс журнал в xlsx и очистил его — книга перечитывается
+        with other.writing():
+            assert other.flush()
+        _add(store, 3, 300.0)
+        assert _state(other) == _state(store)
+        assert _state(other)[1:] == (3, 600.0)
+    finally:
+        other.close()
@@ -0,0 +1,34 @@
+"""Колоночная таблица месяца: строки совпадают с записями iter_expenses, поиск по ID."""
+from datetime import date
+
+from repository.month_table import MonthTable
+
+EXPENSES = [
+    {"id": 1, "date": date(2026, 2, 1), "category": "ЗП", "amount": 100.5, "comment": "кофе"},
+    # Старая строка с датой произвольным текстом — iter_expenses отдаёт текст как есть
+    {"id": 2, "date": "в начале месяца", "category": "Доп расход", "amount": 7.0, "comment": ""},
+    {"id": 3, "date": date(2026, 2, 10), "category": "ЗП", "amount": 0.1, "comment": "чай"},
+    {"id": 5, "date": date(2026, 2, 20), "category": "ЗП", "amount": 0.2, "comment": ""},
+]
+
+
+def test_rows_match_source_expenses():
+    table = MonthTable.from_expenses(EXPENSES)
+    assert list(table) == EXPENSES
+    assert table.rows(1, 2) == EXPENSES[1:3]
+
+
+def test_find_by_id():
+    table = MonthTable.from_expenses(EXPENSES)
+    assert table.find(2) == EXPENSES[1]
+    assert table.find(5) == EXPENSES[3]
+    assert table.find(4) is None
+
+
+def test_between_keeps_lookup_and_skips_rows_without_date():
+    table = MonthTable.from_expenses(EXPENSES).between(date(2026, 2, 1), date(2026, 2, 10))
+    assert list(table) == [EXPENSES[0], EXPENSES[2]]
+    assert table.find(3) == EXPENSES[2]
+    assert table.find(2) is None
+    assert table.find(5) is None
+    assert table.summary() == {"ЗП": (100.6, 2)}
@@ -0,0 +1,112 @@
+"""
+Агрегаты (rollups) и суммы в копейках: после добавлений, изменений, удалений,
+архивации и возврата месяца из архива они совпадают с полным пересчётом по строкам.
+"""
+from datetime import date, timedelta
+
+import pytest
+
+from repository import excel_repo, sqlite_repo
+from repository.base import get_current_month, get_month_key
+from repository.month_table import to_kopecks
+
+# Суммы, которые во float складываются с ошибкой округления (0.1 + 0.2 != 0.3)
+AMOUNTS = [0.1, 0.2, 0.3, 33.33, 19.99, 1234.56, 0.07, 5.05]
+CATEGORIES = ["ЗП", "Доп расход"]
+
+
+@pytest.fixture(params=[excel_repo, sqlite_repo], ids=["excel", "sqlite"])
+def repo(request, tenant):
+    return request.param
+
+
+def _past_days() -> list[date]:
+    """По дню в каждом из трёх прошлых месяцев и сегодняшний."""
+    first = date.today().replace(day=1)
+    days = []
+    for _ in range(3):
+        first = (first - timedelta(days=1)).replace(day=1)
+        days.append(first + timedelta(days=9))
+    return days + [date.today()]
+
+
+def _import(repo, prefix: str, count: int) -> None:
+    days = _past_days()
+    repo.import_expenses([
+        (f"{prefix}{i}", days[i % len(days)], CATEGORIES[i % 2], AMOUNTS[i % len(AMOUNTS)], f"строка {i}")
+        for i in range(count)
+    ])
+
+
+def _rescan(repo) -> dict[str, dict[str, tuple[int, int]]]:
+    """Разбивка по месяцам и категориям полным проходом по строкам: {месяц: {категория: (копейки, шт.)}}."""
+    result = {}
+    for month in repo.list_months():
+        summary: dict[str, tuple[int, int]] = {}
+        for expense in repo.iter_expenses(month):
+            kopecks, count = summary.get(expense["category"], (0, 0))
+            summary[expense["category"]] = (kopecks + to_kopecks(expense["amount"]), count + 1)
+        if summary:
+            result[month] = summary
+    return result
+
+
+def _assert_matches_rescan(repo) -> None:
+    expected = _rescan(repo)
+    assert expected
+    for month, summary in expected.items():
+        rollup = {category: (to_kopecks(amount), count) for category, (amount, count) in repo.get_month_summary(month).items()}
+        assert rollup == summary, month
+        assert to_kopecks(repo.get_month_total(month)) == sum(kopecks for kopecks, _ in summary.values())
+        assert repo.count_expenses(month) == sum(count for _, count in summary.values())
+        # Колоночная таблица месяца считает те же суммы
+        table = repo.get_month_table(month)
+        assert table.summary_kopecks() == summary
+        assert to_kopecks(table.total()) == sum(kopecks for kopecks, _ in summary.values())
+
+
+def test_rollups_match_rescan_after_every_change(repo):
+    _import(repo, "a", 200)
+    for i in range(20):
+        repo.add_expense(CATEGORIES[i % 2], AMOUNTS[i % len(AMOUNTS)])
+    _assert_matches_rescan(repo)
+
+    past_month = get_month_key(_past_days()[0])
+    current_month = get_current_month()
+    for month in (past_month, current_month):
+        expenses = repo.get_all_expenses(month)
+        for expense in expenses[:10]:
+            assert repo.update_expense_amount(expense["id"], expense["amount"] + 0.1, month)
+        for expense in expenses[10:15]:
+            assert repo.update_expense_category(expense["id"], "Доп расход", month)
+        for expense in expenses[15:25]:
+            assert repo.delete_expense(expense["id"], month)
+    _assert_matches_rescan(repo)
+
+    # Архивация (у SQLite — ничего), затем импорт задним числом возвращает месяц из архива
+    archived = repo.archive_closed_months()
+    assert len(archived) == (3 if repo is excel_repo else 0)
+    _assert_matches_rescan(repo)
+    _import(repo, "b", 40)
+    _assert_matches_rescan(repo)
+    # Импорт вернул все три месяца в книгу — они архивируются снова
+    assert repo.archive_closed_months() == archived
+    _assert_matches_rescan(repo)
+
+    before = {month: repo.get_month_summary(month) for month in repo.list_months()}
+    repo.rebuild_rollups()
+    assert {month: repo.get_month_summary(month) for month in repo.list_months()} == before
+
+    # После перезапуска агрегаты собираются из книги, манифеста архива и базы заново
+    repo.close()
+    assert {month: repo.get_month_summary(month) for month in repo.list_months()} == before
+    _assert_matches_rescan(repo)
+
+
+def test_many_small_amounts_sum_exactly(repo):
+    for _ in range(1000):
+        repo.add_expense("ЗП", 0.1)
+    for expense in repo.get_all_expenses()[:500]:
+        repo.delete_expense(expense["id"])
+    assert repo.get_month_total() == 50.0
+    assert repo.get_month_summary(get_current_month()) == {"ЗП": (50.0, 500)}
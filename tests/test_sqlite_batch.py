@@ -0,0 +1,38 @@
+"""Пачка операций SQLite: при сбое commit агрегаты не должны учитывать откатанные операции."""
+import sqlite3
+
+import pytest
+
+from repository import sqlite_repo
+
+
+class _FailingCommit:
+    """Соединение, у которого commit падает, как при SQLITE_BUSY; остальное — как у настоящего."""
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self._conn = conn
+
+    def commit(self) -> None:
+        raise sqlite3.OperationalError("database is locked")
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def test_failed_commit_rebuilds_rollups(tenant):
+    sqlite_repo.add_expense("ЗП", 100.0)
+    with sqlite_repo._current_db() as db:
+        real_conn = db.conn
+        db.conn = _FailingCommit(real_conn)
+    try:
+        with pytest.raises(sqlite3.OperationalError):
+            with sqlite_repo.batch():
+                sqlite_repo.add_expense("ЗП", 50.0)
+                sqlite_repo.add_expense("Доп расход", 25.0)
+    finally:
+        with sqlite_repo._current_db() as db:
+            db.conn = real_conn
+
+    assert sqlite_repo.count_expenses() == 1
+    assert sqlite_repo.get_month_total() == 100.0
+    assert sqlite_repo.get_month_summary(sqlite_repo.get_current_month()) == {"ЗП": (100.0, 1)}
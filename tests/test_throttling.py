@@ -0,0 +1,94 @@
+"""Ограничение частоты: token bucket пополняется со временем, повтор выполняющейся команды отбрасывается."""
+import asyncio
+from datetime import datetime
+
+import pytest
+from aiogram.types import Chat, Message, User
+
+from middlewares import throttling
+from middlewares.throttling import ThrottlingMiddleware
+
+USER = User(id=1, is_bot=False, first_name="Тест")
+
+
+def _message(text: str) -> Message:
+    return Message(message_id=1, date=datetime.now(), chat=Chat(id=1, type="private"), from_user=USER, text=text)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Управляемое время token bucket'ов (time.monotonic в throttling)."""
+    now = [1000.0]
+    monkeypatch.setattr(throttling.time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def answers(monkeypatch):
+    """Ответы пользователю вместо отправки в Telegram."""
+    sent = []
+
+    async def answer(self, text, **kwargs):
+        sent.append(text)
+
+    monkeypatch.setattr(Message, "answer", answer)
+    return sent
+
+
+def test_bucket_limits_and_refills(clock, answers):
+    middleware = ThrottlingMiddleware(rate=1, capacity=3, costs={"export": 3})
+    handled = []
+
+    async def handler(event, data):
+        handled.append(event.text)
+
+    async def send(text):
+        await middleware(handler, _message(text), {})
+
+    async def main():
+        for i in range(3):
+            await send(f"сообщение {i}")
+        # Ведро пусто: запрос отбрасывается, пользователь предупреждён один раз
+        await send("лишнее")
+        await send("ещё лишнее")
+        assert len(answers) == 1
+
+        clock[0] += 1
+        await send("после секунды")
+        # Дорогая команда ждёт полного ведра
+        clock[0] += 2
+        await send("/export")
+        clock[0] += 3
+        await send("/export")
+
+    asyncio.run(main())
+    assert handled == ["сообщение 0", "сообщение 1", "сообщение 2", "после секунды", "/export"]
+    assert len(answers) == 2
+
+
+def test_duplicate_command_in_flight_is_dropped(clock, answers):
+    middleware = ThrottlingMiddleware(rate=1, capacity=10, costs={})
+    release = None
+    handled = []
+
+    async def handler(event, data):
+        handled.append(event.text)
+        await release.wait()
+
+    async def main():
+        nonlocal release
+        release = asyncio.Event()
+        first = asyncio.ensure_future(middleware(handler, _message("/list"), {}))
+        await asyncio.sleep(0)
+        # Тот же /list, пока первый ещё выполняется, — отбрасывается; другая команда проходит
+        await middleware(handler, _message("/list"), {})
+        other = asyncio.ensure_future(middleware(handler, _message("/stats"), {}))
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(first, other)
+        # После завершения первого тот же /list снова выполняется
+        await middleware(handler, _message("/list"), {})
+
+    asyncio.run(main())
+    assert handled == ["/list", "/stats", "/list"]
+    assert answers == []
@@ -0,0 +1,75 @@
+"""Групповая фиксация: изменения одного тика уходят одной пачкой, ошибка одного не роняет остальные."""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from repository import excel_repo, sqlite_repo
+from services import expense_service
+from services.write_coordinator import WriteCoordinator
+
+
+@pytest.fixture(params=[excel_repo, sqlite_repo], ids=["excel", "sqlite"])
+def repo(request, tenant, monkeypatch):
+    monkeypatch.setattr(expense_service, "repo", request.param)
+    return request.param
+
+
+@pytest.fixture
+def batches(monkeypatch):
+    """Размеры пачек, переданных в run_batch."""
+    sizes = []
+    run_batch = expense_service.run_batch
+
+    def counting(calls, tenant):
+        sizes.append(len(calls))
+        return run_batch(calls, tenant)
+
+    monkeypatch.setattr(expense_service, "run_batch", counting)
+    return sizes
+
+
+def _fail() -> None:
+    raise RuntimeError("сбой одной операции")
+
+
+def test_failing_write_does_not_fail_the_batch(repo, tenant, batches):
+    async def main():
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            coordinator = WriteCoordinator(executor, window=0, max_batch=100)
+            results = await asyncio.gather(
+                coordinator.submit(expense_service.add_expense, "ЗП", 100.0, "первая"),
+                coordinator.submit(expense_service.add_expense, "Нет такой", 1.0),
+                coordinator.submit(_fail),
+                coordinator.submit(expense_service.add_expense, "ЗП", 50.0, "вторая"),
+                return_exceptions=True,
+            )
+            await coordinator.drain()
+        return results
+
+    first, invalid, failed, second = asyncio.run(main())
+
+    assert batches == [4]
+    assert isinstance(invalid, ValueError)
+    assert isinstance(failed, RuntimeError)
+    assert (first, second) == (1, 2)
+    assert [expense["comment"] for expense in repo.get_all_expenses()] == ["первая", "вторая"]
+    assert repo.get_month_total() == 150.0
+
+
+def test_writes_during_a_batch_go_to_the_next_one(repo, tenant, batches):
+    async def main():
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            coordinator = WriteCoordinator(executor, window=0, max_batch=100)
+            first = asyncio.ensure_future(coordinator.submit(expense_service.add_expense, "ЗП", 1.0))
+            # Дожидаемся старта первой пачки, затем отправляем ещё три изменения
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            rest = [coordinator.submit(expense_service.add_expense, "ЗП", 1.0) for _ in range(3)]
+            ids = await asyncio.gather(first, *rest)
+            await coordinator.drain()
+        return ids
+
+    assert sorted(asyncio.run(main())) == [1, 2, 3, 4]
+    assert batches == [1, 3]
+    assert repo.count_expenses() == 4
@@ -0,0 +1,65 @@
+"""
+Перенос данных из data/expenses.xlsx в data/expenses.db.
+
+Каждый лист месяца (например '2026_02') импортируется в таблицу expenses
+с теми же ID. Повторный запуск перезаписывает уже перенесённые записи,
+поэтому миграцию можно безопасно перезапускать. При раздельном учёте
+(TENANT_MODE=chat) так же переносятся данные каждого арендатора в data/tenants/.
+
+Запуск (из корня проекта, при остановленном боте):
+    python -m tools.migrate_to_sqlite
+После миграции включите STORAGE_BACKEND=sqlite в .env.
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from repository import excel_repo, sqlite_repo, tenants  # noqa: E402
+
+
+def migrate() -> int:
+    """Переносит данные всех арендаторов в SQLite. Возвращает общее число записей."""
+    total = 0
+    for tenant in tenants.list_tenants():
+        with tenants.use_tenant(tenant):
+            if tenant != tenants.DEFAULT_TENANT:
+                print(f"Арендатор {tenant}:")
+            total += migrate_tenant()
+
+    # Хранилища арендаторов больше не нужны: сбрасываем и закрываем файлы
+    excel_repo.close()
+    sqlite_repo.close()
+    return total
+
+
+def migrate_tenant() -> int:
+    """Переносит все листы месяцев текущего арендатора в SQLite. Возвращает число записей."""
+    # Сначала переносим в xlsx всё, что ещё лежит в журнале изменений
+    excel_repo.load()
+    excel_repo.flush()
+
+    expenses_file = tenants.get_tenant_dir(tenants.get_tenant()) / excel_repo.EXPENSES_FILE.name
+    if not expenses_file.exists():
+        print("Файл expenses.xlsx не найден — переносить нечего.")
+        return 0
+
+    sqlite_repo.load()
+
+    # Список месяцев — из индекса хранилища (вместе с архивными, они читаются потоково из своих файлов)
+    total = 0
+    for sheet_name in excel_repo.list_months():
+        rows = [
+            (exp["id"], exp["date"], exp["category"], exp["amount"], exp["comment"])
+            for exp in excel_repo.iter_expenses(sheet_name)
+        ]
+        count = sqlite_repo.import_rows(sheet_name, rows)
+        print(f"  {sheet_name}: {count} записей")
+        total += count
+
+    return total
+
+
+if __name__ == "__main__":
+    imported = migrate()
+    print(f"✅ Перенесено записей: {imported}")
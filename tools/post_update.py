@@ -0,0 +1,57 @@
+"""
+Отправка записанных обновлений Telegram на локальный сервер вебхука.
+
+Каждый файл — JSON одного Update (как его присылает Telegram) или список таких
+объектов. Запросы идут с заголовком секрета, как от настоящего Telegram.
+
+Запуск (бот запущен с BOT_MODE=webhook и пустым WEBHOOK_URL):
+    python -m tools.post_update updates/start.json updates/add.json
+    python -m tools.post_update --url http://127.0.0.1:8080/webhook updates/*.json
+"""
+import argparse
+import json
+import sys
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import WEBHOOK_PATH, WEBHOOK_PORT, WEBHOOK_SECRET  # noqa: E402
+
+
+def post_update(url: str, secret: str, update: dict) -> int:
+    """Отправляет одно обновление. Возвращает HTTP-статус ответа."""
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(update).encode("utf-8"),
+        headers={
+            "Content-Type": "application/json",
+            "X-Telegram-Bot-Api-Secret-Token": secret,
+        },
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="+", type=Path, help="JSON-файлы с обновлениями")
+    parser.add_argument("--url", default=f"http://127.0.0.1:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+    parser.add_argument("--secret", default=WEBHOOK_SECRET)
+    args = parser.parse_args()
+
+    for path in args.files:
+        payload = json.loads(path.read_text(encoding="utf-8"))
+        updates = payload if isinstance(payload, list) else [payload]
+        for update in updates:
+            status = post_update(args.url, args.secret, update)
+            print(f"  {path.name} update_id={update.get('update_id')}: HTTP {status}")
+
+
+if __name__ == "__main__":
+    main()